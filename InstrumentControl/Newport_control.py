@@ -8,18 +8,100 @@ Function for control of Newport 850 G actuator. Through the SMC control box.
 edited by thjalfe March 13 2023
 """
 
+import threading
 import time
+from . import tracing
+
+
+class Motion:
+    """
+    Handle of a move started with actuator.move_async or actuator.home_async.
+
+    A background thread polls the controller state (TS) and position (TP) every
+    poll_interval s until the move has ended, so the live position and progress
+    can be read while the move runs, and other instruments can be used at the
+    same time. An error raised by the controller while polling is raised again by
+    wait.
+    """
+
+    def __init__(self, act, start, target, poll_interval):
+        self.act = act
+        self.start = start
+        self.target = target
+        self.poll_interval = poll_interval
+        self.position = start
+        self.error_code = ""
+        self.error = None
+        self.num_polls = 0
+        self.start_time = time.perf_counter()
+        self.end_time = None
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+        self._thread.start()
+
+    def _poll(self):
+        try:
+            while True:
+                status, self.error_code = self.act.get_status()
+                self.position = self.act.get_position()
+                self.num_polls += 1
+                if status != "28":  # 28 is MOVING
+                    break
+                tracing.sleep(self.poll_interval)
+        except Exception as error:
+            self.error = error
+        finally:
+            self.end_time = time.perf_counter()
+            self._done.set()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    @property
+    def progress(self):
+        """Fraction of the move covered, from 0 to 1."""
+        if self.target == self.start:
+            return 1.0 if self.done else 0.0
+        fraction = (self.position - self.start) / (self.target - self.start)
+        return min(1.0, max(0.0, fraction))
+
+    @property
+    def duration(self):
+        """Time in s from the start of the move until it was seen to end."""
+        if self.end_time is None:
+            return None
+        return self.end_time - self.start_time
+
+    def wait(self, timeout=None):
+        """
+        Waits until the move has ended.
 
-# The CLR module provide functions for interacting with the underlying
-# .NET runtime
-# The crl module is part of pythonnet, which needs to be installed
-import clr
+        Parameters
+        ----------
+        timeout : Float, optional
+            Time in s, None to wait indefinitely.
+
+        Returns
+        -------
+        Float: Actual position, or None if the move did not end before the timeout.
+
+        """
+        if not self._done.wait(timeout):
+            print("Warning! Actuator move did not end before the timeout.")
+            return None
+        if self.error is not None:
+            raise self.error
+        return self.position
 
 
 class actuator:
     """Control of actuator."""
 
-    def __init__(self, file_loc, port):
+    # Time in s between the state polls of a move
+    poll_interval = 0.1
+
+    def __init__(self, file_loc, port, SMC=None):
         """
         Parameters.
 
@@ -28,18 +110,32 @@ class actuator:
             File location for Newport.SMC100.CommandInterface.dll.
         port : Integer
             COM port no.
+        SMC : Object, optional
+            Object with the SMC100 command interface to use instead of the
+            one from the DLL, e.g. simulation.SimulatedSMC100.
         """
 
-        # Add reference to assembly and import names from namespace
-        clr.AddReference(file_loc + "Newport.SMC100.CommandInterface.dll")
-        import CommandInterfaceSMC100 as CI
-
         # Instrument Initialization
         self.instrument = "COM" + str(port)
         print("Instrument Key=>", self.instrument)
+        # The SMC100 command interface is used from the Motion poll threads too
+        self._lock = threading.Lock()
+
+        if SMC is not None:
+            self.SMC = tracing.wrap(SMC, self.instrument)
+            return
+
+        # The CLR module provide functions for interacting with the underlying
+        # .NET runtime
+        # The crl module is part of pythonnet, which needs to be installed
+        import clr
+
+        # Add reference to assembly and import names from namespace
+        clr.AddReference(file_loc + "Newport.SMC100.CommandInterface.dll")
+        import CommandInterfaceSMC100 as CI
 
         # create a device instance
-        self.SMC = CI.SMC100()
+        self.SMC = tracing.wrap(CI.SMC100(), self.instrument)
 
     def initialize(self, PSL, NSL):
         """
@@ -80,44 +176,87 @@ class actuator:
         else:
             print("Error=>", errString)
 
-    def move(self, dist):
+    def get_status(self):
         """
-        Moves.
+        Returns the controller state and error code, from TS.
+        """
+        with self._lock:
+            result, error_code, status, errString = self.SMC.TS(1, "", "", "")
+        return status, error_code
+
+    def get_position(self):
+        """
+        Returns the current position in mm, from TP.
+        """
+        with self._lock:
+            result, response, errString = self.SMC.TP(1, 00, "")
+        return response
+
+    def move_async(self, dist, poll_interval=None):
+        """
+        Starts a relative move and returns right away.
 
         Parameters
         ----------
         dist : Float
             Distance in mm.
+        poll_interval : Float, optional
+            Time in s between state polls, default actuator.poll_interval.
 
         Returns
         -------
-        Float: Actual position.
+        Motion: Handle of the move.
 
         """
-        # Move
-        result, errString = self.SMC.PR_Set(1, dist, "")
-        if result == 0:
-            print("Moving")
-        else:
+        start = self.get_position()
+        with self._lock:
+            result, errString = self.SMC.PR_Set(1, dist, "")
+        if result != 0:
             print("Error=>", errString)
+        if poll_interval is None:
+            poll_interval = self.poll_interval
+        return Motion(self, start, start + dist, poll_interval)
 
-        resul, Errorccode, status, errString = self.SMC.TS(1, "", "", "")
-        while status == "28":
-            time.sleep(0.1)
-            resul, Errorccode, status, errString = self.SMC.TS(1, "", "", "")
+    def home_async(self, poll_interval=None):
+        """
+        Starts a move to the 0 position and returns right away.
 
-        if Errorccode == "":
-            print("Moved succesfully")
-        else:
-            print("Error: " + Errorccode)
+        Returns
+        -------
+        Motion: Handle of the move.
 
-        # Get current position
-        result, response, errString = self.SMC.TP(1, 00, "")
-        if result == 0:
-            print("position=>", response)
-        else:
+        """
+        start = self.get_position()
+        with self._lock:
+            result, errString = self.SMC.PA_Set(1, 0, "")
+        if result != 0:
             print("Error=>", errString)
+        if poll_interval is None:
+            poll_interval = self.poll_interval
+        return Motion(self, start, 0, poll_interval)
+
+    def move(self, dist):
+        """
+        Moves.
+
+        Parameters
+        ----------
+        dist : Float
+            Distance in mm.
+
+        Returns
+        -------
+        Float: Actual position.
 
+        """
+        print("Moving")
+        motion = self.move_async(dist)
+        response = motion.wait()
+        if motion.error_code == "":
+            print("Moved succesfully")
+        else:
+            print("Error: " + motion.error_code)
+        print("position=>", response)
         return response
 
     def home(self):
@@ -129,30 +268,14 @@ class actuator:
         Float: Actual position.
 
         """
-        # Move
-        result, errString = self.SMC.PA_Set(1, 0, "")
-        if result == 0:
-            print("Moving")
-        else:
-            print("Error=>", errString)
-
-        resul, Errorccode, status, errString = self.SMC.TS(1, "", "", "")
-        while status == "28":
-            time.sleep(0.1)
-            resul, Errorccode, status, errString = self.SMC.TS(1, "", "", "")
-
-        if Errorccode == "":
+        print("Moving")
+        motion = self.home_async()
+        response = motion.wait()
+        if motion.error_code == "":
             print("Homed succesfully")
         else:
-            print("Error: " + Errorccode)
-
-        # Get current position
-        result, response, errString = self.SMC.TP(1, 00, "")
-        if result == 0:
-            print("position=>", response)
-        else:
-            print("Error=>", errString)
-
+            print("Error: " + motion.error_code)
+        print("position=>", response)
         return response
 
     def close(self):
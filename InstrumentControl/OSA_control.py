@@ -1,10 +1,39 @@
 import numpy as np
-import pyvisa as visa
 import time
 import os
+import weakref
+from . import visa_pool
+from . import tracing
+from .spectrum_store import SpectrumStore
+
+# Fields of the array returned by OSA.acquire. sample is the number of points
+# of the trace, and the times are in s.
+acquisition_dtype = np.dtype(
+    [
+        ("wavelength_start", float),
+        ("wavelength_end", float),
+        ("resolution", float),
+        ("trace", "U1"),
+        ("sample", int),
+        ("order", int),
+        ("configure_time", float),
+        ("sweep_time", float),
+        ("download_time", float),
+        ("wavelengths", object),
+        ("powers", object),
+    ]
+)
 
 
 class OSA:
+    poll_interval_min = 0.002
+    poll_interval_max = 0.05
+    TLS_toggle_delay = 0.5
+    # Last command written for each setting, per session. Kept for as long as
+    # the session is open, so a new OSA on the same instrument only writes the
+    # settings that differ.
+    _settings_cache = weakref.WeakKeyDictionary()
+
     def __init__(
         self,
         wavelength_start,
@@ -17,6 +46,9 @@ class OSA:
         sweep_time=0,
         sample=None,
         GPIB_num=[0, 18],
+        transfer="ascii",
+        sweep_wait="poll",
+        sweep=True,
     ):
         """
         Class for controlling the ANDO AQ6317B OSA.
@@ -30,7 +62,18 @@ class OSA:
             Trace: 'A', 'B', 'C', 'D'
             sweep_time: Not currently used
             sample: number of samples, default is auto
+            transfer: 'ascii' downloads WDAT and LDAT after every sweep,
+                'compact' only downloads LDAT and rebuilds the wavelength axis
+                from the span and the number of points
+            sweep_wait: 'poll' polls SWEEP? with a backoff from poll_interval_min
+                to poll_interval_max, 'srq' waits for the service request the
+                OSA sends at the end of a sweep
+            sweep: if False, the OSA is only configured, and wavelengths and
+                powers are not set until sweep is called
 
+        The settings are only written if they differ from the ones last written
+        to the instrument, also by an earlier OSA object. Call forget_settings
+        after changing settings on the front panel.
         """
         self.device_open = open
         self.wavelength_start = wavelength_start
@@ -42,36 +85,65 @@ class OSA:
         self.trace = Trace
         self.sweep_time = sweep_time
         self.TLS_on = 0
+        self.transfer = transfer
+        self._wavelength_axis = None
+        self.sweep_wait = sweep_wait
+        self.sweep_latency = None
 
-        rm = visa.ResourceManager()
-        self.device = rm.open_resource(f"GPIB{GPIB_num[0]}::{GPIB_num[1]}::INSTR")
+        self.device = visa_pool.open_resource(
+            f"GPIB{GPIB_num[0]}::{GPIB_num[1]}::INSTR"
+        )
         self.device.timeout = 30000
+        self._settings = OSA._settings_cache.setdefault(
+            tracing.unwrap(self.device), {}
+        )
         self.set_span(wavelength_start, wavelength_end)
         self.set_res(resolution)
         if sample is not None:
             self.set_sample(sample)
         self.set_sens(sensitivity)
-        if self.device.query("TLSSYNC?")[0] == str(1):
+        self.set_trace(Trace)
+        if sweep_wait == "srq":
+            self._write_setting("SRQ", "SRQ1")
+        if "TLSSYNC" not in self._settings:
+            self._settings["TLSSYNC"] = "TLSSYNC" + self.device.query("TLSSYNC?")[0]
+        if self._settings["TLSSYNC"] == "TLSSYNC1":
             self.TLS_on = 1
             print("Warning! TLS sync is ON. Spectrum is not saved automatically!")
         else:
             self.TLS_on = 0
-        self.sweep()
+        if sweep:
+            self.sweep()
         self.device_open = True
 
+    def _write_setting(self, key, command):
+        # Writes command unless it is the last command written for key
+        if self._settings.get(key) != command:
+            self.device.write(command)
+            self._settings[key] = command
+
+    def forget_settings(self):
+        """
+        Forgets the settings written to the instrument, so they are all written
+        again the next time they are set.
+        """
+        self._settings.clear()
+
     def set_sweeptype(self, sweeptype):
         self.device.write(sweeptype)
 
     def stop_sweep(self):
         self.device.write("STP")
-        time.sleep(1)
+        self.wait_for_sweep(30)
 
     def set_span(self, wavelength_start, wavelength_end):
-        self.device.write("STAWL" + str(wavelength_start))
-        self.device.write("STPWL" + str(wavelength_end))
+        self._write_setting("STAWL", "STAWL" + str(wavelength_start))
+        self._write_setting("STPWL", "STPWL" + str(wavelength_end))
+        self.wavelength_start = wavelength_start
+        self.wavelength_end = wavelength_end
 
     def set_res(self, resolution):
-        self.device.write("RESLN" + str(resolution))
+        self._write_setting("RESLN", "RESLN" + str(resolution))
         self.resolution = resolution
 
     def set_level(self, level):
@@ -81,57 +153,264 @@ class OSA:
         self.device.write("LSCL" + str(level_scale))
 
     def set_sample(self, sample_numb):
-        self.device.write("SMPL" + str(sample_numb))
+        self._write_setting("SMPL", "SMPL" + str(sample_numb))
         self.sample = sample_numb
 
     def set_sens(self, sensitivity):
-        self.device.write(sensitivity)
+        self._write_setting("sensitivity", sensitivity)
         self.sensitiviy = sensitivity
 
+    def set_trace(self, trace):
+        """
+        Sets the trace ('A'-'D') that sweeps are written to and read from. The
+        previous trace is fixed, so it keeps its data.
+        """
+        previous = self._settings.get("trace")
+        if previous is not None and previous != trace:
+            self._write_setting("mode" + previous, "FIX" + previous)
+        self._write_setting("mode" + trace, "WRT" + trace)
+        self._settings["trace"] = trace
+        self.trace = trace
+
     def set_TLS(self, TLS):
         self.device.write("TLSSYNC" + str(TLS))
+        self._settings["TLSSYNC"] = "TLSSYNC" + str(TLS)
         if TLS == 1:
             self.TLS_on = 1
         if TLS == 0:
             self.TLS_on = 0
 
-    def sweep(self):
+    def sweep(self, download=True):
+        """
+        Sweeps and downloads the trace to wavelengths and powers.
+        Args:
+            download: if False, the trace is not downloaded, so get_spectrum
+                can be called later, e.g. while the next setpoint is being set
+        The settings of this object are written first if another OSA object on
+        the same instrument has changed them.
+        """
+        self.set_span(self.wavelength_start, self.wavelength_end)
+        self.set_res(self.resolution)
+        if self.sample is not None:
+            self.set_sample(self.sample)
+        self.set_sens(self.sensitiviy)
+        self.set_trace(self.trace)
         if self.TLS_on == 1:
             self.set_TLS(0)
-            time.sleep(0.5)
+            tracing.sleep(self.TLS_toggle_delay)
             self.set_TLS(1)
-            time.sleep(0.5)
+            tracing.sleep(self.TLS_toggle_delay)
+        t0 = time.perf_counter()
         self.device.write(self.sweeptype)
         if self.TLS_on == 0:
-            stat = 1
-            while stat != 0:
-                stat = int(self.device.query("SWEEP?")[:1])
-                time.sleep(0.1)
+            if self.sweep_wait == "srq":
+                self.device.wait_for_srq(self.device.timeout)
+                self.device.read_stb()
+            else:
+                self.wait_for_sweep()
             # time.sleep(self.sweep_time)
-            wav = self.device.query_ascii_values(
-                "WDAT" + str(self.trace), container=np.array
-            )
-            power = self.device.query_ascii_values(
-                "LDAT" + str(self.trace), container=np.array
-            )
-            wav = wav[1:]
-            power = power[1:]
-            self.wavelengths = wav
-            self.powers = power
+            self.sweep_latency = time.perf_counter() - t0
+            if download:
+                self.get_spectrum()
+
+    def wait_for_sweep(self, timeout=None):
+        """
+        Polls SWEEP? until the sweep has ended. The poll interval starts at
+        poll_interval_min and doubles up to poll_interval_max, so short sweeps
+        are read out right away and long sweeps are not flooded with queries.
+        Args:
+            timeout: in s, None to wait indefinitely
+        """
+        t0 = time.perf_counter()
+        interval = self.poll_interval_min
+        while int(self.device.query("SWEEP?")[:1]) != 0:
+            if timeout is not None and time.perf_counter() - t0 > timeout:
+                print("Warning! OSA sweep did not end before the timeout.")
+                return
+            tracing.sleep(interval)
+            interval = min(2 * interval, self.poll_interval_max)
 
     def get_spectrum(self):
-        wav = self.device.query_ascii_values(
-            "WDAT" + str(self.trace), container=np.array
+        self.wavelengths, self.powers = self._download(
+            self.trace, self.wavelength_start, self.wavelength_end
         )
-        power = self.device.query_ascii_values(
-            "LDAT" + str(self.trace), container=np.array
+
+    def _download(self, trace, wavelength_start, wavelength_end):
+        # Returns the wavelengths and powers of trace, swept over the given span
+        if self.transfer == "compact":
+            power = self._read_trace("LDAT" + str(trace))
+            wav = self._get_wavelength_axis(
+                len(power), wavelength_start, wavelength_end
+            )
+            return wav, power
+        wav = self.device.query_ascii_values("WDAT" + str(trace), container=np.array)
+        power = self.device.query_ascii_values("LDAT" + str(trace), container=np.array)
+        return wav[1:], power[1:]
+
+    def acquire(self, requests):
+        """
+        Sweeps several spans in one call, each into its own trace.
+        Args:
+            requests: list of (span, resolution, trace), with span a tuple
+                (wavelength_start, wavelength_end) in nm and trace 'A'-'D'. A
+                fourth element sets the number of samples of the request,
+                otherwise the sample of the OSA is used.
+        Returns:
+            structured array of acquisition_dtype with one row per request, in
+            the order of requests. order is the position of the request in the
+            order it was swept in.
+
+        The requests are swept in the order that changes the fewest settings
+        from one sweep to the next. The traces of the requests are fixed while
+        the other requests are swept, and they are downloaded after the last
+        sweep, or before their trace is swept into again. The OSA keeps its own
+        span, resolution, sample and trace, which are set again by the next sweep.
+        """
+        if self.TLS_on == 1:
+            raise ValueError("OSA.acquire cannot wait for sweeps with TLS sync on")
+        requests = [
+            tuple(request) if len(request) > 3 else tuple(request) + (self.sample,)
+            for request in requests
+        ]
+        samples = set(request[3] for request in requests)
+        if None in samples and len(samples) > 1:
+            raise ValueError(
+                "The OSA sample is auto, give the number of samples of every request"
+            )
+        for request in requests:
+            if request[2] not in ("A", "B", "C", "D"):
+                raise ValueError(f"Unknown trace {request[2]}")
+        result = np.zeros(len(requests), dtype=acquisition_dtype)
+        if not requests:
+            return result
+        order = self._plan_acquisition(requests)
+        for trace in set(request[2] for request in requests):
+            if trace != self._settings.get("trace"):
+                self._write_setting("mode" + trace, "FIX" + trace)
+        own_settings = (
+            self.wavelength_start,
+            self.wavelength_end,
+            self.resolution,
+            self.sample,
+            self.trace,
+        )
+        # Trace: index of the request swept into it and not yet downloaded
+        pending = {}
+        for position, index in enumerate(order):
+            (wavelength_start, wavelength_end), resolution, trace = requests[index][:3]
+            if trace in pending:
+                self._download_request(result, pending.pop(trace))
+            t0 = time.perf_counter()
+            self.set_span(wavelength_start, wavelength_end)
+            self.set_res(resolution)
+            if requests[index][3] is not None:
+                self.set_sample(requests[index][3])
+            self.set_trace(trace)
+            t1 = time.perf_counter()
+            self.sweep(download=False)
+            result["wavelength_start"][index] = wavelength_start
+            result["wavelength_end"][index] = wavelength_end
+            result["resolution"][index] = resolution
+            result["trace"][index] = trace
+            result["order"][index] = position
+            result["configure_time"][index] = t1 - t0
+            result["sweep_time"][index] = time.perf_counter() - t1
+            pending[trace] = index
+        for index in pending.values():
+            self._download_request(result, index)
+        (
+            self.wavelength_start,
+            self.wavelength_end,
+            self.resolution,
+            self.sample,
+            self.trace,
+        ) = own_settings
+        self.wavelengths = result["wavelengths"][order[-1]]
+        self.powers = result["powers"][order[-1]]
+        return result
+
+    def _plan_acquisition(self, requests):
+        # Greedy order, the next request is the one changing the fewest settings
+        settings = dict(self._settings)
+        remaining = list(range(len(requests)))
+        order = []
+        while remaining:
+            changes = [
+                len(self._request_settings(requests[i]).items() - settings.items())
+                for i in remaining
+            ]
+            index = remaining.pop(int(np.argmin(changes)))
+            settings.update(self._request_settings(requests[index]))
+            order.append(index)
+        return order
+
+    def _request_settings(self, request):
+        # Setting commands of an acquire request, as stored in _settings
+        (wavelength_start, wavelength_end), resolution, trace = request[:3]
+        settings = {
+            "STAWL": "STAWL" + str(wavelength_start),
+            "STPWL": "STPWL" + str(wavelength_end),
+            "RESLN": "RESLN" + str(resolution),
+            "mode" + trace: "WRT" + trace,
+            "trace": trace,
+        }
+        if request[3] is not None:
+            settings["SMPL"] = "SMPL" + str(request[3])
+        return settings
+
+    def _download_request(self, result, index):
+        t0 = time.perf_counter()
+        wavelengths, powers = self._download(
+            result["trace"][index],
+            result["wavelength_start"][index],
+            result["wavelength_end"][index],
         )
-        wav = wav[1:]
-        power = power[1:]
-        self.wavelengths = wav
-        self.powers = power
+        result["download_time"][index] = time.perf_counter() - t0
+        result["sample"][index] = len(powers)
+        result["wavelengths"][index] = wavelengths
+        result["powers"][index] = powers
+
+    def _read_trace(self, command):
+        """
+        Reads an ASCII trace and parses the raw bytes directly into a float array,
+        without going through a list of Python floats.
+        The first value sent by the OSA is the number of points in the trace.
+        """
+        self.device.write(command)
+        raw = self.device.read_raw()
+        head, _, body = raw.partition(b",")
+        num_points = int(float(head))
+        values = np.fromstring(body, sep=",")
+        if len(values) != num_points:
+            raise ValueError(
+                f"OSA trace has {len(values)} values, the OSA sent {num_points}"
+            )
+        return values
 
-    def save(self, name):
+    def _get_wavelength_axis(self, num_points, wavelength_start, wavelength_end):
+        """
+        Rebuilds the wavelength axis from the span instead of downloading WDAT.
+        The axis is only recomputed when the span or number of points change.
+        """
+        key = (wavelength_start, wavelength_end, num_points)
+        if self._wavelength_axis is None or self._wavelength_axis[0] != key:
+            axis = np.linspace(wavelength_start, wavelength_end, num_points)
+            self._wavelength_axis = (key, axis)
+        return self._wavelength_axis[1].copy()
+
+    def save(self, name, format="csv"):
+        """
+        Saves the last sweep.
+        Args:
+            name: file name without extension
+            format: 'csv' writes the sweep to its own file, adding a suffix
+                if the file already exists. 'hdf5' appends the sweep and the OSA
+                settings to the scan file name.h5, see spectrum_store.SpectrumStore.
+        """
+        if format == "hdf5":
+            with SpectrumStore(name) as store:
+                store.append_osa(self)
+            return
         # self.device.write(self.sweeptype)
         # time.sleep(self.sweep_time)
         # wav = self.device.query_ascii_values('WDAT' + str(self.trace), container=np.array)
@@ -149,4 +428,5 @@ class OSA:
         np.savetxt(os.path.join(name + ".csv"), res, fmt="%f", delimiter=",")
 
     def close(self):
-        self.device.close()
+        self.forget_settings()
+        visa_pool.close_resource(self.device)
@@ -0,0 +1,143 @@
+"""
+Coarse-to-fine alignment of a laser wavelength with an OSA.
+
+The first sweep covers the full span. After each correction the span is narrowed
+around the target according to the remaining error, and the number of samples is
+lowered with it so the sample spacing stays the same. The next correction is
+predicted from the response slope measured between the previous setpoints, and
+the alignment stops as soon as the error is within tolerance.
+"""
+import time
+import numpy as np
+from . import peak_finding
+from . import tracing
+
+
+class WavelengthAligner:
+    """
+    Args:
+        osa: OSA used to measure the wavelength
+        set_wavelength: function setting the wavelength of the source
+        tolerance: in nm, the alignment stops when the error is smaller
+        span: in nm, span of the first sweep
+        sample: number of samples of the first sweep
+        zoom: if False, every sweep uses span and sample
+        min_span: in nm, smallest span to zoom in to
+        min_sample: smallest number of samples
+        coarse_step: in nm, for sources that can only be tuned in coarse steps
+            (santec). Errors smaller than 5 * coarse_step are corrected with a
+            single coarse step, and the alignment stops if a setpoint repeats.
+        max_iterations: maximum number of corrections
+        settle_time: time in s to wait after setting the wavelength
+        peak_method: see peak_finding.find_peak
+    """
+
+    def __init__(
+        self,
+        osa,
+        set_wavelength,
+        tolerance=0.005,
+        span=1,
+        sample=1001,
+        zoom=True,
+        min_span=0.1,
+        min_sample=51,
+        coarse_step=None,
+        max_iterations=20,
+        settle_time=1,
+        peak_method="parabolic",
+    ):
+        self.osa = osa
+        self.set_wavelength = set_wavelength
+        self.tolerance = tolerance
+        self.span = span
+        self.sample = sample
+        self.zoom = zoom
+        self.min_span = min_span
+        self.min_sample = min_sample
+        self.coarse_step = coarse_step
+        self.max_iterations = max_iterations
+        self.settle_time = settle_time
+        self.peak_method = peak_method
+        self.num_sweeps = 0
+        self.sweep_time = 0
+
+    def measure(self, center, span):
+        """
+        Sweeps span around center and returns the peak wavelength, or None if the
+        peak is at the edge of the span.
+        """
+        if self.zoom:
+            sample = int(self.sample * span / self.span)
+            sample = max(self.min_sample, sample)
+        else:
+            sample = self.sample
+        if (self.osa.wavelength_start, self.osa.wavelength_end) != (
+            center - span / 2,
+            center + span / 2,
+        ):
+            self.osa.set_span(center - span / 2, center + span / 2)
+        if self.osa.sample != sample:
+            self.osa.set_sample(sample)
+        t0 = time.perf_counter()
+        self.osa.sweep()
+        self.sweep_time += time.perf_counter() - t0
+        self.num_sweeps += 1
+        index = np.argmax(self.osa.powers)
+        if index == 0 or index == len(self.osa.powers) - 1:
+            return None
+        return peak_finding.find_peak(
+            self.osa.wavelengths, self.osa.powers, self.peak_method
+        )[0]
+
+    def align(self, target, setpoint, measured=None):
+        """
+        Aligns the source to target.
+        Args:
+            target: wavelength in nm
+            setpoint: wavelength the source is currently set to
+            measured: peak wavelength measured at setpoint, None to measure it
+        Returns:
+            measured wavelength, setpoint, number of corrections
+        """
+        span = self.span
+        if measured is None:
+            measured = self.measure(target, span)
+        slope = 1
+        previous = None
+        tried = [setpoint]
+        iterations = 0
+        while measured is not None and abs(measured - target) >= self.tolerance:
+            if iterations == self.max_iterations:
+                print("Warning! Wavelength alignment did not converge.")
+                break
+            error = measured - target
+            if self.coarse_step is not None and abs(error) <= 5 * self.coarse_step:
+                next_setpoint = setpoint - self.coarse_step * np.sign(error)
+            else:
+                next_setpoint = setpoint - error / slope
+            if self.coarse_step is not None and np.any(
+                np.isclose(tried, next_setpoint)
+            ):
+                # Oscillating between coarse steps, the closest one has been found
+                break
+            previous = (setpoint, measured)
+            setpoint = next_setpoint
+            tried.append(setpoint)
+            self.set_wavelength(setpoint)
+            tracing.sleep(self.settle_time)
+            if self.zoom:
+                span = min(self.span, max(self.min_span, 8 * abs(error)))
+            measured = self.measure(target, span)
+            if measured is None and span < self.span:
+                # The line moved outside the zoomed span
+                span = self.span
+                measured = self.measure(target, span)
+            iterations += 1
+            if measured is not None and abs(setpoint - previous[0]) > 0.01:
+                # Measured response of the source, limited to avoid wild predictions
+                slope = (measured - previous[1]) / (setpoint - previous[0])
+                slope = min(2, max(0.5, slope))
+        if measured is None:
+            print("Warning! Laser peak is outside the OSA span.")
+        return measured, setpoint, iterations
@@ -0,0 +1,62 @@
+"""
+Asyncio interface to the instrument classes.
+
+Wrapping an instrument in AsyncInstrument makes all of its methods awaitable, so
+e.g. a Ti:Sapphire move, an OSA sweep and a power meter read can run at the same
+time:
+
+    osa = AsyncInstrument(OSA(1549, 1551))
+    pm = AsyncInstrument(PM())
+    await asyncio.gather(osa.sweep(), pm.read())
+
+The blocking methods run in a worker thread. Every wrapped instrument has its own
+single worker thread, so calls to the same instrument are still executed one at a
+time and in order, while calls to different instruments overlap.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncInstrument:
+    """
+    Makes the methods of an instrument awaitable.
+    Attributes that are not methods (e.g. osa.powers) are returned directly, and
+    should only be read once the call that sets them has been awaited.
+
+    Args:
+        instrument: any instrument object, e.g. OSA, laser, PM or TiSapphire
+    """
+
+    def __init__(self, instrument):
+        self.instrument = instrument
+        self.executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=type(instrument).__name__
+        )
+
+    def __getattr__(self, name):
+        attr = getattr(self.instrument, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def method(*args, **kwargs):
+            return await self.run(attr, *args, **kwargs)
+
+        return method
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Runs func(*args, **kwargs) in the worker thread of this instrument.
+        Useful for functions that use the instrument but are not its methods.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(func, *args, **kwargs)
+        )
+
+    async def close(self):
+        """Closes the instrument and stops the worker thread."""
+        if hasattr(self.instrument, "close"):
+            await self.run(self.instrument.close)
+        self.executor.shutdown()
@@ -0,0 +1,229 @@
+"""
+Calibration models for tunable lasers.
+
+WavelengthCalibration maps wavelengths to the argument a laser has to be given
+to emit them, from a table of measured peaks. The tables are CSV files in
+calibration_data, and are validated, sorted and turned into an interpolator once
+when they are loaded, so mapping a whole scan is a single vectorized call.
+
+MotorCalibration learns the wavelength response of a motor tuned laser (the
+Ti:Sapphire on the Newport SMC100) from OSA confirmed moves, and is kept in a
+CSV file so it is reloaded the next time the laser is used.
+"""
+import os
+import numpy as np
+
+calibration_folder = os.path.join(os.path.dirname(__file__), "calibration_data")
+
+
+class WavelengthCalibration:
+    """
+    Interpolates device arguments from a table of measured peak wavelengths.
+
+    Args:
+        wavelengths: measured peak wavelengths in nm
+        arguments: device argument that gave each peak
+        kind: 'linear', or 'monotone' for a monotone cubic (PCHIP) spline, which
+            is smooth but never overshoots between the table points
+        decimals: the arguments are rounded to this many decimals, None to not round
+
+    The table is sorted by wavelength, and arguments measured at the same
+    wavelength are averaged. Wavelengths outside the table are mapped to the
+    argument of the nearest end, like np.interp.
+    """
+
+    def __init__(self, wavelengths, arguments, kind="linear", decimals=None):
+        wavelengths = np.asarray(wavelengths, dtype=float)
+        arguments = np.asarray(arguments, dtype=float)
+        if wavelengths.shape != arguments.shape or wavelengths.ndim != 1:
+            raise ValueError("wavelengths and arguments must be 1D and of equal length")
+        if not (np.all(np.isfinite(wavelengths)) and np.all(np.isfinite(arguments))):
+            raise ValueError("The calibration table contains non-finite values")
+        order = np.argsort(wavelengths, kind="stable")
+        wavelengths, inverse, counts = np.unique(
+            wavelengths[order], return_inverse=True, return_counts=True
+        )
+        arguments = np.bincount(inverse, weights=arguments[order]) / counts
+        if len(wavelengths) < 2:
+            raise ValueError("The calibration table needs at least two wavelengths")
+        steps = np.diff(arguments)
+        if not (np.all(steps > 0) or np.all(steps < 0)):
+            print(
+                "Warning! The calibration is not monotonic, "
+                "some wavelengths map to the same argument."
+            )
+        if kind not in ("linear", "monotone"):
+            raise ValueError(f"Unknown interpolation kind {kind}")
+        self.wavelengths = wavelengths
+        self.arguments = arguments
+        self.kind = kind
+        self.decimals = decimals
+        self.slopes = steps / np.diff(wavelengths)
+        if kind == "monotone":
+            self.derivatives = _pchip_derivatives(np.diff(wavelengths), self.slopes)
+
+    @classmethod
+    def from_file(cls, path, kind="linear", decimals=None):
+        """
+        Loads a table with the measured wavelength in the first column and the
+        device argument in the second. path can also be the name of a table in
+        calibration_data, e.g. 'santec'.
+        """
+        if not os.path.exists(path):
+            path = os.path.join(calibration_folder, path + ".csv")
+        table = np.loadtxt(path, delimiter=",", ndmin=2)
+        return cls(table[:, 0], table[:, 1], kind, decimals)
+
+    def __call__(self, wavelengths):
+        """Device arguments for wavelengths, a scalar or an array of any shape."""
+        wavelengths = np.clip(wavelengths, self.wavelengths[0], self.wavelengths[-1])
+        i = np.searchsorted(self.wavelengths, wavelengths, side="right") - 1
+        i = np.clip(i, 0, len(self.slopes) - 1)
+        dx = wavelengths - self.wavelengths[i]
+        if self.kind == "linear":
+            arguments = self.arguments[i] + dx * self.slopes[i]
+        else:
+            h = self.wavelengths[i + 1] - self.wavelengths[i]
+            d0 = self.derivatives[i]
+            d1 = self.derivatives[i + 1]
+            # Cubic Hermite polynomial in powers of dx
+            c2 = (3 * self.slopes[i] - 2 * d0 - d1) / h
+            c3 = (d0 + d1 - 2 * self.slopes[i]) / h**2
+            arguments = self.arguments[i] + dx * (d0 + dx * (c2 + dx * c3))
+        if self.decimals is not None:
+            arguments = np.round(arguments, self.decimals)
+        return arguments
+
+
+def _pchip_derivatives(h, slopes):
+    # Fritsch-Carlson derivatives, zero at local extrema to keep the spline monotone
+    if len(slopes) == 1:
+        return np.full(2, slopes[0])
+    derivatives = np.zeros(len(slopes) + 1)
+    same_sign = slopes[:-1] * slopes[1:] > 0
+    w1 = 2 * h[1:] + h[:-1]
+    w2 = h[1:] + 2 * h[:-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        harmonic = (w1 + w2) / (w1 / slopes[:-1] + w2 / slopes[1:])
+    derivatives[1:-1] = np.where(same_sign, harmonic, 0)
+    derivatives[0] = _pchip_end(h[0], h[1], slopes[0], slopes[1])
+    derivatives[-1] = _pchip_end(h[-1], h[-2], slopes[-1], slopes[-2])
+    return derivatives
+
+
+def _pchip_end(h0, h1, m0, m1):
+    # Three point end derivative, limited to keep the spline monotone
+    d = ((2 * h0 + h1) * m0 - h0 * m1) / (h0 + h1)
+    if np.sign(d) != np.sign(m0):
+        return 0
+    if np.sign(m0) != np.sign(m1) and abs(d) > abs(3 * m0):
+        return 3 * m0
+    return d
+
+
+class MotorCalibration:
+    """
+    Records (motor position, measured wavelength, direction of the last move)
+    and fits position = poly(wavelength) + direction * backlash / 2.
+
+    Args:
+        path: CSV file the records are appended to and loaded from, None to
+            only keep them in memory
+        degree: degree of the polynomial
+        default_slope: in mm/nm, used until enough points are recorded
+        max_points: only the most recent points are used for the fit
+    """
+
+    def __init__(self, path=None, degree=2, default_slope=-0.08297, max_points=200):
+        self.path = path
+        self.degree = degree
+        self.default_slope = default_slope
+        self.max_points = max_points
+        self.coefficients = None
+        self.center = 0
+        self.wavelength_range = (0, 0)
+        self.backlash = 0
+        self.records = np.empty((0, 3))
+        if path is not None and os.path.exists(path):
+            records = np.loadtxt(path, delimiter=",", ndmin=2)
+            if records.size:
+                self.records = records
+        self.fit()
+
+    @property
+    def is_fitted(self):
+        return self.coefficients is not None
+
+    def record(self, position, wavelength, direction):
+        """
+        Adds a point measured at position after a move in direction (+1 or -1).
+        """
+        point = np.array([[position, wavelength, np.sign(direction)]])
+        self.records = np.vstack((self.records, point))
+        if self.path is not None:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            with open(self.path, "a") as file:
+                np.savetxt(file, point, delimiter=",")
+        self.fit()
+
+    def fit(self):
+        """
+        Fits the model to the recorded points. The degree is lowered until there
+        are two distinct wavelengths per coefficient above the linear term, and
+        the backlash is only fitted once two points from each direction have been
+        recorded.
+        """
+        records = self.records[-self.max_points :]
+        wavelengths = records[:, 1]
+        directions = records[:, 2]
+        num_distinct = len(np.unique(np.round(wavelengths, 2)))
+        degree = min(self.degree, num_distinct // 2) if num_distinct > 1 else 0
+        if degree < 1:
+            self.coefficients = None
+            self.backlash = 0
+            return
+        both_directions = (
+            np.sum(directions > 0) >= 2
+            and np.sum(directions < 0) >= 2
+            and len(records) > degree + 2
+        )
+        # Fitted around the mean wavelength to keep the powers well conditioned
+        self.center = np.mean(wavelengths)
+        self.wavelength_range = (np.min(wavelengths), np.max(wavelengths))
+        columns = [(wavelengths - self.center) ** k for k in range(degree, -1, -1)]
+        if both_directions:
+            columns.append(directions / 2)
+        solution = np.linalg.lstsq(np.column_stack(columns), records[:, 0], rcond=None)[0]
+        self.coefficients = solution[: degree + 1]
+        self.backlash = solution[-1] if both_directions else 0
+
+    def position(self, wavelength, direction=0):
+        """
+        Motor position in mm giving wavelength when approached from direction.
+        Outside the recorded wavelengths the model is continued linearly.
+        """
+        inside = np.clip(wavelength, *self.wavelength_range)
+        position = np.polyval(self.coefficients, inside - self.center)
+        position = position + (wavelength - inside) * self.slope(inside)
+        return position + direction * self.backlash / 2
+
+    def slope(self, wavelength):
+        """Motor distance per nm at wavelength, in mm/nm."""
+        if not self.is_fitted:
+            return self.default_slope
+        return np.polyval(np.polyder(self.coefficients), wavelength - self.center)
+
+    def move(self, current_wavelength, target_wavelength, last_direction=0):
+        """
+        Predicts the motor move in mm from current_wavelength to target_wavelength.
+        Only the difference of the model is used, so an offset drift of the laser
+        cancels out. last_direction is the direction of the move that reached
+        current_wavelength, used to compensate the backlash on a reversal.
+        """
+        if not self.is_fitted:
+            return (target_wavelength - current_wavelength) * self.default_slope
+        move = self.position(target_wavelength) - self.position(current_wavelength)
+        direction = np.sign(move)
+        return move + (direction - last_direction) * self.backlash / 2
@@ -1,25 +1,68 @@
 # %%
 import numpy as np
-import pyvisa as visa
 import time
 import serial
 from ThorlabsPM100 import ThorlabsPM100
+from . import visa_pool
+from . import tracing
+from .streaming import PowerStream
 
 
 class EDFA:
-    def __init__(self):
-        rm = visa.ResourceManager()
-        self.device = rm.open_resource("GPIB0::5::INSTR")
+    # Limits of the readback poll interval in s, see set_power
+    poll_interval_min = 0.01
+    poll_interval_max = 0.2
+
+    def __init__(self, address="GPIB0::5::INSTR"):
+        self.device = visa_pool.open_resource(address)
         self.device.read_termination = "\x00"
         self.device.write_termination = "\x00"
-        self.power = float(self.device.query("CPU?")[4:]) / 10
+        self.power = self.read_power()
+        # (setpoint, time in s it took to settle) of every set_power
+        self.settle_log = []
+
+    def read_power(self):
+        return float(self.device.query("CPU?")[4:]) / 10
 
-    def set_power(self, power):
+    def set_power(self, power, tolerance=0.1, timeout=5):
+        """
+        Sets the power and polls the readback until it is within tolerance of
+        power. The poll interval starts at poll_interval_min and doubles up to
+        poll_interval_max. The time it took is stored in settle_time and
+        settle_log.
+        Args:
+            power: in dBm
+            tolerance: in dB
+            timeout: in s, a warning is printed if the power has not settled
+        """
         power_str = str(np.round(10 * power, 0))[:-2]
+        t0 = time.perf_counter()
         self.device.write("CPU=" + power_str)
-        time.sleep(1)
-        # print(self.device.query('CPU?'))
-        self.power = float(self.device.query("CPU?")[4:]) / 10
+        interval = self.poll_interval_min
+        self.power = self.read_power()
+        while abs(self.power - power) > tolerance:
+            if time.perf_counter() - t0 > timeout:
+                print("Warning! EDFA power did not settle before the timeout.")
+                break
+            tracing.sleep(interval)
+            interval = min(2 * interval, self.poll_interval_max)
+            self.power = self.read_power()
+        self.settle_time = time.perf_counter() - t0
+        self.settle_log.append((power, self.settle_time))
+
+    def ramp(self, powers, tolerance=0.1, dwell=0, timeout=5):
+        """
+        Steps through powers, waiting for each to settle and then dwell s.
+        tolerance and timeout are passed to set_power.
+        Returns the settle time of every step.
+        """
+        settle_times = np.empty(len(powers))
+        for i, power in enumerate(powers):
+            self.set_power(power, tolerance, timeout)
+            settle_times[i] = self.settle_time
+            if dwell:
+                tracing.sleep(dwell)
+        return settle_times
 
     def turn_off(self):
         self.device.write("K0")
@@ -30,8 +73,7 @@ class EDFA:
 
 class SignalGenerator:
     def __init__(self):
-        rm = visa.ResourceManager()
-        self.device = rm.open_resource("GPIB0::15::INSTR")
+        self.device = visa_pool.open_resource("GPIB0::15::INSTR")
         self.device.read_termination = "\r\n"
         self.device.write_termination = "\r\n"
 
@@ -44,66 +86,336 @@ class SignalGenerator:
     def set_rate(self, rate):
         self.device.write("TR 0," + str(rate))
 
-    def check_RATE_led(self):
-        stat_array = np.array([])
-        for indx in range(100):
-            status = int(self.device.query("IS 4"))
-            time.sleep(0.01)
-            stat_array = np.append(stat_array, status)
-        check = np.sum(stat_array)
-        return check
+    def monitor_RATE_led(self, num_samples=100, interval=0.01, early_exit=0):
+        """
+        Samples the RATE LED (IS 4) into a preallocated buffer. The samples are
+        timed against a fixed schedule, so the query time is not added to the
+        interval, and interval=0 queries back to back.
+        Args:
+            num_samples: maximum number of samples
+            interval: time in s between samples
+            early_exit: if > 0, sampling stops after this many samples if they
+                are all equal, i.e. the LED is steadily on or off
+        Returns:
+            dict with the samples and their times, the duty cycle (fraction of
+            samples with the LED on), the number of on/off transitions and the
+            samples per second
+        """
+        samples = np.zeros(num_samples, dtype=np.int8)
+        times = np.zeros(num_samples)
+        t0 = time.perf_counter()
+        n = 0
+        while n < num_samples:
+            delay = t0 + n * interval - time.perf_counter()
+            if delay > 0:
+                tracing.sleep(delay)
+            samples[n] = int(self.device.query("IS 4"))
+            times[n] = time.perf_counter()
+            n += 1
+            if n == early_exit and np.all(samples[:n] == samples[0]):
+                break
+        samples = samples[:n]
+        times = times[:n]
+        return {
+            "samples": samples,
+            "times": times,
+            "duty_cycle": np.mean(samples),
+            "transitions": int(np.count_nonzero(np.diff(samples))),
+            "rate": n / (times[-1] - t0) if times[-1] > t0 else np.inf,
+        }
+
+    def check_RATE_led(self, num_samples=100, interval=0.01, early_exit=0):
+        """
+        Returns the number of samples with the RATE LED on out of num_samples,
+        see monitor_RATE_led. With early_exit the count is scaled to num_samples.
+        """
+        stats = self.monitor_RATE_led(num_samples, interval, early_exit)
+        return stats["duty_cycle"] * num_samples
 
 
 class oscilloscope:
     def __init__(self):
-        rm = visa.ResourceManager()
-        self.device = rm.open_resource("GPIB0::7::INSTR")
+        self.device = visa_pool.open_resource("GPIB0::7::INSTR")
         self.device.read_termination = "\n"
         self.device.write_termination = "\n"
         self.device.timeout = 30000
+        # Parsed WFMOutpre? per channel, cleared when the scales change
+        self.preambles = {}
+        self.source = None
+        self.encoding_set = False
+        self.round_trips = 0
+        self.acquisition_round_trips = 0
+
+    def write(self, command):
+        self.device.write(command)
+        self.round_trips += 1
+
+    def query(self, command):
+        self.round_trips += 1
+        return self.device.query(command)
+
+    def saveWaveform(self, channel, raw=False):
+        """
+        Reads the waveform of a channel.
+        Args:
+            channel: 1-4
+            raw: if True, the int16 samples are returned together with the scale
+                factors from WFMOutpre?, instead of time and voltage arrays
+        Returns:
+            time_val, voltage
+            or samples, scale if raw is True. scale_waveform(samples, scale)
+            converts them to time_val, voltage.
+        """
+        start = self.round_trips
+        samples, scale = self.read_curve(channel)
+        self.acquisition_round_trips = self.round_trips - start
+        if raw:
+            return samples, scale
+        return self.scale_waveform(samples, scale)
+
+    def capture(self, channels, single=True, raw=False, combined=False):
+        """
+        Captures several channels from the same trigger.
+        Args:
+            channels: list of channels, e.g. [1, 2, 3, 4]
+            single: if True, a single acquisition is started and waited for,
+                otherwise the waveforms currently on the screen are read
+            raw: if True, the int16 samples are returned together with a list of
+                the scale factors of each channel
+            combined: if True, all channels are set as data source at once and
+                read with a single CURVe? query. Only for scopes that support
+                several sources in :DATA:SOURCE. Otherwise every channel is read
+                like with saveWaveform, and only the acquisition is shared.
+        Returns:
+            time_val, voltages with one row of voltages per channel
+            or samples, scales if raw is True
+        The number of commands sent is stored in acquisition_round_trips.
+        """
+        start = self.round_trips
+        if single:
+            self.singleAcq()
+            self.query("*OPC?")
+        if combined:
+            curves = self.read_curves(channels)
+        else:
+            curves = [self.read_curve(channel) for channel in channels]
+        samples = np.stack([curve[0] for curve in curves])
+        scales = [curve[1] for curve in curves]
+        self.acquisition_round_trips = self.round_trips - start
+        if raw:
+            return samples, scales
+        time_val = self.scale_waveform(samples[0], scales[0])[0]
+        y_reference = np.array([[scale["y_reference"]] for scale in scales])
+        y_increment = np.array([[scale["y_increment"]] for scale in scales])
+        y_origin = np.array([[scale["y_origin"]] for scale in scales])
+        voltages = (samples - y_reference) * y_increment + y_origin
+        return time_val, voltages
+
+    def read_curves(self, channels):
+        """
+        Reads the raw samples of several channels with one CURVe? query.
+        """
+        channels = list(channels)
+        if not self.encoding_set:
+            self.write(":data:encdg sribinary")
+            self.encoding_set = True
+        for channel in channels:
+            if channel not in self.preambles:
+                self.read_preamble(channel)
+        source = tuple(channels)
+        if self.source != source:
+            self.write(":DATA:SOURCE " + ",".join("CH" + str(ch) for ch in channels))
+            self.source = source
+        self.write("CURVe?")
+        block = self.read_blocks(len(channels))
+        curves = []
+        offset = 0
+        for channel in channels:
+            scale = self.preambles[channel]
+            data, offset = parse_block(block, offset, return_end=True)
+            dtype = ">i2" if scale["byte_order"] == "MSB" else "<i2"
+            curves.append((np.frombuffer(data, dtype=dtype), scale))
+        return curves
 
-    def saveWaveform(self, channel):
-        self.device.write(":DATA:SOURCE CH" + str(channel))
-        self.device.write(":data:encdg sribinary")
-        self.device.write("CURVe?")
-
-        raw = self.device.read_raw()
-        # print(len(raw))
-        # print(len(raw[13:-1]))
-        waveform = np.fromstring(raw[13:-1], dtype=np.int16)
-        # waveform = self.device.query_binary_values('CURVe?', datatype='b', is_big_endian=True)
-        settings = self.device.query("WFMOutpre?").split(";")
-        x_increment = float(settings[9].split(" ")[-1])
-        x_origin = float(settings[10].split(" ")[-1])
-
-        y_increment = float(settings[13].split(" ")[-1])
-        y_origin = float(settings[15].split(" ")[-1])
-        y_reference = float(settings[14].split(" ")[-1])
-
-        voltage = np.zeros(len(waveform))
-        time_val = np.zeros(len(waveform))
-        for i in range(len(waveform)):
-            # assumes time is shared
-            time_val[i] = x_origin + (i * x_increment)
-            voltage[i] = ((waveform[i] - y_reference) * y_increment) + y_origin
+    def read_curve(self, channel):
+        """
+        Reads the raw samples of a channel and its scale factors.
+        The data source and encoding are only sent when they change, and the
+        preamble is only queried the first time a channel is read after its
+        scales have changed.
+        """
+        if self.source != channel:
+            self.write(":DATA:SOURCE CH" + str(channel))
+            self.source = channel
+        if not self.encoding_set:
+            self.write(":data:encdg sribinary")
+            self.encoding_set = True
+        self.write("CURVe?")
+        block = self.read_blocks()
+        scale = self.preambles.get(channel)
+        if scale is None:
+            scale = self.read_preamble(channel)
+        # The samples are a view into the received block, not a copy
+        dtype = ">i2" if scale["byte_order"] == "MSB" else "<i2"
+        samples = np.frombuffer(parse_block(block), dtype=dtype)
+        return samples, scale
+
+    def read_blocks(self, num_blocks=1):
+        """
+        Reads a reply of num_blocks binary blocks. A read stops at the first
+        termination character, which can also be a byte of the binary data, so
+        the reply is read until it holds the lengths given in the block headers.
+        """
+        chunks = [self.device.read_raw()]
+        size = len(chunks[0])
+        raw = chunks[0]
+        while True:
+            end = 0
+            for _ in range(num_blocks):
+                end = block_end(raw, end)
+                if end > len(raw):
+                    break
+            if end == len(raw):
+                # The last data byte was a termination character, so the read
+                # stopped before the real one, which is still to be read
+                self.device.read_raw()
+            if end <= len(raw):
+                return raw
+            while size < end:
+                chunk = self.device.read_raw()
+                if not chunk:
+                    raise ValueError(
+                        f"Binary block reply ended after {size} of {end} bytes"
+                    )
+                chunks.append(chunk)
+                size += len(chunk)
+            raw = b"".join(chunks)
+
+    def read_preamble(self, channel):
+        """Queries and caches the scale factors of a channel."""
+        if self.source != channel:
+            self.write(":DATA:SOURCE CH" + str(channel))
+            self.source = channel
+        scale = self.parse_preamble(self.query("WFMOutpre?"))
+        self.preambles[channel] = scale
+        return scale
+
+    @staticmethod
+    def parse_preamble(preamble):
+        settings = preamble.split(";")
+        return {
+            "byte_order": settings[4].split(" ")[-1],
+            "x_increment": float(settings[9].split(" ")[-1]),
+            "x_origin": float(settings[10].split(" ")[-1]),
+            "y_increment": float(settings[13].split(" ")[-1]),
+            "y_reference": float(settings[14].split(" ")[-1]),
+            "y_origin": float(settings[15].split(" ")[-1]),
+        }
+
+    @staticmethod
+    def scale_waveform(samples, scale):
+        """
+        Converts raw samples to time and voltage arrays using the scale factors
+        returned by saveWaveform(channel, raw=True).
+        """
+        # assumes time is shared
+        time_val = scale["x_origin"] + np.arange(len(samples)) * scale["x_increment"]
+        voltage = (samples - scale["y_reference"]) * scale["y_increment"]
+        voltage += scale["y_origin"]
         return time_val, voltage
 
+    def invalidate_preamble(self, channel=None):
+        """
+        Forgets the cached scale factors of a channel, or of all channels if
+        channel is None. Needed if the scales are changed on the front panel.
+        """
+        if channel is None:
+            self.preambles.clear()
+        else:
+            self.preambles.pop(channel, None)
+
+    def set_vertical_scale(self, channel, scale):
+        # scale: V/div
+        self.write(":CH" + str(channel) + ":SCALE " + str(scale))
+        self.invalidate_preamble(channel)
+
+    def set_vertical_position(self, channel, position):
+        # position: divisions
+        self.write(":CH" + str(channel) + ":POSITION " + str(position))
+        self.invalidate_preamble(channel)
+
+    def set_horizontal_scale(self, scale):
+        # scale: s/div
+        self.write(":HORIZONTAL:SCALE " + str(scale))
+        self.invalidate_preamble()
+
+    def set_record_length(self, record_length):
+        self.write(":HORIZONTAL:RECORDLENGTH " + str(record_length))
+        self.invalidate_preamble()
+
     def trigger(self, channel):
-        self.device.write(":DATA:SOURCE CH" + str(channel))
-        self.device.write(":TRIGGER:B:EDGE:SLOPE RISE")
+        self.write(":DATA:SOURCE CH" + str(channel))
+        self.source = channel
+        self.write(":TRIGGER:B:EDGE:SLOPE RISE")
 
     def singleAcq(self):
-        self.device.write(":ACQuire:STOPAFTER SEQUENCE")
-        self.device.write(":ACQuire:NUMACq 1")
-        self.device.write(":ACQuire:STATE 1")
+        self.write(":ACQuire:STOPAFTER SEQUENCE")
+        self.write(":ACQuire:NUMACq 1")
+        self.write(":ACQuire:STATE 1")
 
     def repeatAcq(self):
-        self.device.write(":ACQuire:STOPAFTER RUNSTOP")
-        self.device.write(":ACQuire:REPEt 1")
-        self.device.write(":ACQuire:STATE 1")
+        self.write(":ACQuire:STOPAFTER RUNSTOP")
+        self.write(":ACQuire:REPEt 1")
+        self.write(":ACQuire:STATE 1")
 
     def stopAcq(self):
-        self.device.write("ACQuire:STATE 0")
+        self.write("ACQuire:STATE 0")
+
+
+def parse_block(raw, offset=0, return_end=False):
+    """
+    Returns the data of an IEEE 488.2 binary block (#<n><length><data>) as a
+    memoryview, without copying it.
+    Args:
+        raw: bytes received from the instrument
+        offset: position in raw to start looking for the block
+        return_end: if True, the position after the block is also returned, so
+            several consecutive blocks can be parsed
+    """
+    start = raw.index(b"#", offset)
+    num_digits = int(raw[start + 1 : start + 2])
+    if num_digits == 0:
+        # Indefinite length block, the data runs until the termination character
+        data = memoryview(raw)[start + 2 : -1]
+        end = len(raw)
+    else:
+        end = block_end(raw, offset)
+        if end > len(raw):
+            raise ValueError(
+                f"Binary block is incomplete, it ends at byte {end} of a "
+                f"{len(raw)} byte reply"
+            )
+        data = memoryview(raw)[start + 2 + num_digits : end]
+    if return_end:
+        return data, end
+    return data
+
+
+def block_end(raw, offset=0):
+    """
+    Returns the position after the first binary block in raw from offset, as
+    given by its header. It is beyond len(raw) if the block is incomplete.
+    """
+    start = raw.find(b"#", offset)
+    if start < 0 or start + 2 > len(raw):
+        return len(raw) + 1
+    num_digits = int(raw[start + 1 : start + 2])
+    if num_digits == 0:
+        return len(raw)
+    if start + 2 + num_digits > len(raw):
+        return len(raw) + 1
+    num_bytes = int(raw[start + 2 : start + 2 + num_digits])
+    return start + 2 + num_digits + num_bytes
 
 
 class piezo:
@@ -114,22 +426,43 @@ class piezo:
         timeout=1,
         stage1=[0, 0, 0],
         stage2=[0, 0, 0],
+        ser=None,
     ):
-        # Establish serial connection
-        self.ser = serial.Serial()
-        self.ser.port = port
-        self.ser.baudrate = baudrate
-        self.ser.timeout = timeout
+        # ser: serial port object to use instead of opening port,
+        # e.g. simulation.SimulatedPiezo
+        if ser is not None:
+            self.ser = ser
+        else:
+            # Establish serial connection
+            self.ser = serial.Serial()
+            self.ser.port = port
+            self.ser.baudrate = baudrate
+            self.ser.timeout = timeout
+        self.ser = tracing.wrap(self.ser, port)
         if self.ser.is_open is False:
             self.ser.open()
-        self.stage1 = stage1
-        self.stage2 = stage2
-        self.set_duty(1, "X", stage1[0])
-        self.set_duty(1, "Y", stage1[1])
-        self.set_duty(1, "Z", stage1[2])
-        self.set_duty(2, "X", stage2[0])
-        self.set_duty(2, "Y", stage2[1])
-        self.set_duty(2, "Z", stage2[2])
+        # Duty cycles of stage 1 and 2 (rows) X, Y and Z (columns)
+        self.duty = np.zeros((2, 3))
+        self.set_duties(np.array([stage1, stage2]))
+
+    # If True, the messages of set_duties are sent in one write, joined by
+    # message_separator. Only enable once the controller firmware is confirmed
+    # to parse several messages in one write, by default every message is its
+    # own write (without a settle in between).
+    batch_writes = False
+    # Written between the messages of a batch, the messages are self delimiting
+    # as each starts with the dimension letter
+    message_separator = b""
+    # Time in s the piezo drivers need to settle after a write
+    settle_time = 0.05
+
+    @property
+    def stage1(self):
+        return self.duty[0]
+
+    @property
+    def stage2(self):
+        return self.duty[1]
 
     def close(self):
         self.ser.close()
@@ -139,64 +472,178 @@ class piezo:
 
     def set_stage(self, stage_no, configuration):
         # configuration: [duty_x, duty_y, duty_z]
-        self.set_duty(stage_no, "X", configuration[0])
-        self.set_duty(stage_no, "Y", configuration[1])
-        self.set_duty(stage_no, "Z", configuration[2])
+        self.set_duties(
+            {(stage_no, dim): configuration[i] for i, dim in enumerate("XYZ")}
+        )
 
     def set_duty(self, stage_no, dimension, duty_cycle, sleep=True):
-        if duty_cycle < 0:
-            duty_cycle = 0
-            print("Duty cycle must be between 0 and 1! Input changed to 0.")
-        if duty_cycle > 1:
-            duty_cycle = 1
-            print("Duty cycle must be between 0 and 1! Input changed to 1.")
         # voltage: 0-5 V
         # dimension: 'X', 'Y' or 'Z'
         # stage_no: '1' or '2'
-        stage_no = str(stage_no)
-        pwm_byte = duty_cycle * 255
-        msg = dimension + stage_no + str(int(pwm_byte))
-        msg = msg.encode("ascii")
-        self.ser.write(msg)
-        if stage_no == str(1):
-            if dimension == "X":
-                self.stage1[0] = duty_cycle
-            if dimension == "Y":
-                self.stage1[1] = duty_cycle
-            if dimension == "Z":
-                self.stage1[2] = duty_cycle
-        if stage_no == str(2):
-            if dimension == "X":
-                self.stage2[0] = duty_cycle
-            if dimension == "Y":
-                self.stage2[1] = duty_cycle
-            if dimension == "Z":
-                self.stage2[2] = duty_cycle
+        self.set_duties({(stage_no, dimension): duty_cycle}, sleep)
+
+    def set_duties(self, duties, sleep=True):
+        """
+        Sets any number of axes on both stages, and settles once. The messages
+        are written in one serial write if batch_writes is True.
+        Args:
+            duties: dict of {(stage_no, dimension): duty_cycle}, or a 2x3 array
+                with the duty cycles of stage 1 and 2 X, Y, Z. In both, NaN keeps
+                an axis as it is.
+            sleep: if True, waits settle_time after the write
+        """
+        if isinstance(duties, dict):
+            items = duties.items()
+        else:
+            duties = np.asarray(duties, dtype=float)
+            items = [
+                ((stage_no, dim), duties[stage_no - 1, i])
+                for stage_no in (1, 2)
+                for i, dim in enumerate("XYZ")
+                if not np.isnan(duties[stage_no - 1, i])
+            ]
+        messages = []
+        for (stage_no, dimension), duty_cycle in items:
+            if np.isnan(duty_cycle):
+                continue
+            if duty_cycle < 0:
+                duty_cycle = 0
+                print("Duty cycle must be between 0 and 1! Input changed to 0.")
+            if duty_cycle > 1:
+                duty_cycle = 1
+                print("Duty cycle must be between 0 and 1! Input changed to 1.")
+            pwm_byte = duty_cycle * 255
+            messages.append(dimension + str(stage_no) + str(int(pwm_byte)))
+            self.duty[int(stage_no) - 1, "XYZ".index(dimension)] = duty_cycle
+        if not messages:
+            return
+        if self.batch_writes:
+            separator = self.message_separator.decode("ascii")
+            self.ser.write(separator.join(messages).encode("ascii"))
+        else:
+            for message in messages:
+                self.ser.write(message.encode("ascii"))
         if sleep:
-            time.sleep(0.05)
+            tracing.sleep(self.settle_time)
 
-    def optimize(self):
-        opt_PM = PM()
-        prev_power = opt_PM.read()
+    def get_duty(self, stage_no, dimension):
+        return self.duty[int(stage_no) - 1, "XYZ".index(dimension)]
+
+    def optimize(
+        self,
+        power_meter=None,
+        axes=None,
+        step=0.05,
+        min_step=1 / 255,
+        settle_time=0.005,
+        tolerance=0.001,
+        max_reads=1000,
+    ):
+        """
+        Maximizes the power on a power meter with a pattern search over the duty
+        cycles. Each axis is stepped by +-step in turn, and a step that increases
+        the power is repeated as long as the power keeps increasing. When a round
+        over all axes increases the power by less than tolerance (relative), the
+        step is halved, and the search stops when it is below min_step.
+        Args:
+            power_meter: PM, a new one is opened if None
+            axes: list of (stage_no, dimension) to optimize, default all six
+            step: initial duty cycle step
+            min_step: smallest step, default the duty cycle resolution
+            settle_time: time in s to wait after a write before reading
+            tolerance: relative power increase below which the step is halved
+            max_reads: the search stops after this many power readings
+        Returns:
+            the optimized power in dBm. The number of readings, the time it took
+            and the power are also stored in optimize_stats.
+        """
+        if power_meter is None:
+            power_meter = PM()
+        if axes is None:
+            axes = [(stage_no, dim) for stage_no in (1, 2) for dim in "XYZ"]
+        t0 = time.perf_counter()
+        num_reads = 0
+
+        def measure():
+            nonlocal num_reads
+            tracing.sleep(settle_time)
+            num_reads += 1
+            return power_meter.measure()
+
+        best = measure()
+        while step >= min_step and num_reads < max_reads:
+            round_start = best
+            for stage_no, dim in axes:
+                current = self.get_duty(stage_no, dim)
+                for direction in (1, -1):
+                    improved = False
+                    trial = min(1, max(0, current + direction * step))
+                    while trial != current and num_reads < max_reads:
+                        self.set_duty(stage_no, dim, trial, sleep=False)
+                        power = measure()
+                        if power <= best:
+                            break
+                        best = power
+                        current = trial
+                        improved = True
+                        trial = min(1, max(0, current + direction * step))
+                    if self.get_duty(stage_no, dim) != current:
+                        # Back to the best duty cycle
+                        self.set_duty(stage_no, dim, current, sleep=False)
+                    if improved:
+                        break
+            if best - round_start <= tolerance * abs(round_start):
+                step /= 2
+        tracing.sleep(settle_time)
+        self.optimize_stats = {
+            "reads": num_reads,
+            "time": time.perf_counter() - t0,
+            "power": power_meter.to_dBm(best),
+        }
+        return self.optimize_stats["power"]
 
 
 class PM:
     def __init__(self):
-        rm = visa.ResourceManager()
-        if "USB0::0x1313::0x8078::P0034465::INSTR" in rm.list_resources():
-            self.device = rm.open_resource(
+        resources = visa_pool.get_resource_manager().list_resources()
+        if "USB0::0x1313::0x8078::P0034465::INSTR" in resources:
+            self.device = visa_pool.open_resource(
                 "USB0::0x1313::0x8078::P0034465::INSTR", timeout=1
             )
-        elif "USB0::0x1313::0x8078::P0009779::INSTR" in rm.list_resources():
-            self.device = rm.open_resource(
+        elif "USB0::0x1313::0x8078::P0009779::INSTR" in resources:
+            self.device = visa_pool.open_resource(
                 "USB0::0x1313::0x8078::P0009779::INSTR", timeout=1
             )
         self.PM = ThorlabsPM100(inst=self.device)
+        self.averages = int(self.PM.sense.average.count)
 
     def read(self, scale="dBm", sleep=True):
         if sleep:
-            time.sleep(0.1)
+            tracing.sleep(0.1)
         if scale == "dBm":
             return 10 * np.log10(self.PM.read * 1e3)
         if scale == "W":
             return self.PM.read
+
+    def set_averages(self, count):
+        """Sets the number of samples averaged per reading."""
+        self.PM.sense.average.count = count
+        self.averages = count
+
+    def measure(self):
+        """Starts a measurement and returns it in W, without the sleep of read."""
+        return self.PM.read
+
+    def stream(self, capacity=100000, interval=0, callback=None):
+        """
+        Starts reading continuously in a background thread, see
+        streaming.PowerStream. The meter should not be used otherwise until the
+        stream is stopped.
+        """
+        return PowerStream(self, capacity, interval, callback)
+
+    @staticmethod
+    def to_dBm(watts):
+        """Converts a power or an array of powers in W to dBm."""
+        with np.errstate(divide="ignore"):
+            return 10 * np.log10(np.asarray(watts) * 1e3)
@@ -1,507 +1,291 @@
 import numpy as np
-import pyvisa as visa
 import time
+import os
 from pylablib.devices import Thorlabs
 import copy
-from InstrumentClass.OSA_control import OSA
+from .OSA_control import OSA
+from . import visa_pool
+from . import tracing
+from . import peak_finding
+from .alignment import WavelengthAligner
+from .calibration import MotorCalibration, WavelengthCalibration
+
+TiSa_calibration_file = os.path.join(
+    os.path.expanduser("~"), "InstrumentControl", "TiSa_calibration.csv"
+)
 
 
 class laser:
-    # Calibration data for the different lasers
-    self_pos_array = np.array(
-        [
-            196140,
-            198654,
-            201166,
-            203678,
-            206191,
-            208703,
-            211215,
-            213728,
-            216240,
-            218752,
-            221265,
-            223777,
-            226289,
-            228801,
-            231314,
-            233826,
-            236339,
-            238850,
-            241363,
-            243875,
-            246387,
-            248900,
-            251412,
-            253925,
-            256436,
-            258949,
-            261461,
-            263974,
-            266486,
-            268998,
-            271510,
-            274022,
-            276535,
-            279048,
-            281559,
-            284072,
-            286584,
-            289096,
-            291608,
-            294121,
-            296633,
-            299145,
-            301658,
-            304170,
-            306682,
-            309194,
-            311707,
-            314219,
-            316731,
-            319245,
-            321756,
-            324269,
-            326781,
-            329293,
-            331805,
-            334317,
-            336830,
-            339342,
-            341854,
-            344366,
-            346879,
-            349391,
-            351903,
-            354417,
-            356928,
-            359440,
-            361952,
-            364465,
-            366977,
-            369489,
-            372002,
-        ]
-    )
-
-    actual_peaks_thorlabs = np.array(
-        [
-            1510.63,
-            1511.99,
-            1513.17,
-            1514.22,
-            1515.41,
-            1516.51,
-            1517.65,
-            1518.75,
-            1519.93,
-            1521.2,
-            1522.44,
-            1523.76,
-            1525.28,
-            1526.56,
-            1527.61,
-            1528.33,
-            1529.39,
-            1530.53,
-            1531.65,
-            1532.7,
-            1533.79,
-            1534.91,
-            1536.11,
-            1537.3,
-            1538.58,
-            1540.0,
-            1541.32,
-            1542.53,
-            1543.3,
-            1544.28,
-            1545.34,
-            1546.45,
-            1547.52,
-            1548.62,
-            1549.65,
-            1550.8,
-            1552.05,
-            1553.28,
-            1554.49,
-            1555.68,
-            1557.03,
-            1557.83,
-            1558.79,
-            1560.03,
-            1561.09,
-            1561.99,
-            1563.19,
-            1564.31,
-            1565.26,
-            1566.35,
-            1567.47,
-            1568.57,
-            1569.83,
-            1571.07,
-            1572.33,
-            1573.37,
-            1574.38,
-            1575.22,
-            1576.29,
-            1577.35,
-            1578.4,
-            1579.32,
-            1580.49,
-            1581.6,
-            1582.74,
-            1583.84,
-            1584.94,
-            1586.05,
-            1587.08,
-            1588.21,
-            1589.21,
-        ]
-    )
-
-    wavelength_array_santec = np.array(
-        [
-            1.521,
-            1.522,
-            1.523,
-            1.524,
-            1.525,
-            1.526,
-            1.527,
-            1.528,
-            1.529,
-            1.53,
-            1.531,
-            1.532,
-            1.533,
-            1.534,
-            1.535,
-            1.536,
-            1.537,
-            1.538,
-            1.539,
-            1.54,
-            1.541,
-            1.542,
-            1.543,
-            1.544,
-            1.545,
-            1.546,
-            1.547,
-            1.548,
-            1.549,
-            1.55,
-            1.551,
-            1.552,
-            1.553,
-            1.554,
-            1.555,
-            1.556,
-            1.557,
-            1.558,
-            1.559,
-            1.56,
-            1.561,
-            1.562,
-            1.563,
-            1.564,
-            1.565,
-            1.566,
-            1.567,
-            1.568,
-            1.569,
-            1.57,
-            1.571,
-            1.572,
-            1.573,
-            1.574,
-            1.575,
-            1.576,
-            1.577,
-            1.578,
-            1.579,
-            1.58,
-            1.581,
-        ]
-    )
-
-    actual_peaks_santec = np.array(
-        [
-            1521.015,
-            1522.18,
-            1523.31,
-            1524.44,
-            1525.515,
-            1526.593,
-            1526.885,
-            1528.02,
-            1529.243,
-            1530.385,
-            1531.468,
-            1532.573,
-            1533.698,
-            1534.77,
-            1535.158,
-            1536.308,
-            1537.42,
-            1538.48,
-            1539.595,
-            1540.695,
-            1541.12,
-            1542.238,
-            1543.38,
-            1544.408,
-            1545.55,
-            1546.675,
-            1547.198,
-            1548.235,
-            1549.365,
-            1550.468,
-            1551.54,
-            1552.045,
-            1553.09,
-            1554.288,
-            1555.373,
-            1556.513,
-            1557.6,
-            1558.683,
-            1559.27,
-            1560.27,
-            1561.378,
-            1562.51,
-            1563.548,
-            1564.645,
-            1565.163,
-            1566.3,
-            1567.463,
-            1568.505,
-            1569.57,
-            1570.263,
-            1571.29,
-            1572.323,
-            1573.45,
-            1574.52,
-            1575.178,
-            1576.198,
-            1577.278,
-            1578.355,
-            1579.495,
-            1580.178,
-            1581.26,
-        ]
-    )
-
-    wavelength_array_ando = np.array(
-        [
-            1521.0,
-            1522.0,
-            1523.0,
-            1524.0,
-            1525.0,
-            1526.0,
-            1527.0,
-            1528.0,
-            1529.0,
-            1530.0,
-            1531.0,
-            1532.0,
-            1533.0,
-            1534.0,
-            1535.0,
-            1536.0,
-            1537.0,
-            1538.0,
-            1539.0,
-            1540.0,
-            1541.0,
-            1542.0,
-            1543.0,
-            1544.0,
-            1545.0,
-            1546.0,
-            1547.0,
-            1548.0,
-            1549.0,
-            1550.0,
-            1551.0,
-            1552.0,
-            1553.0,
-            1554.0,
-            1555.0,
-            1556.0,
-            1557.0,
-            1558.0,
-            1559.0,
-            1560.0,
-            1561.0,
-            1562.0,
-            1563.0,
-            1564.0,
-            1565.0,
-            1566.0,
-            1567.0,
-            1568.0,
-            1569.0,
-            1570.0,
-            1571.0,
-            1572.0,
-            1573.0,
-            1574.0,
-            1575.0,
-            1576.0,
-            1577.0,
-            1578.0,
-            1579.0,
-            1580.0,
-            1581.0,
-        ]
-    )
-
-    actual_peaks_ando = np.array(
-        [
-            1521.045,
-            1522.045,
-            1523.045,
-            1524.043,
-            1525.038,
-            1526.04,
-            1527.038,
-            1528.035,
-            1529.035,
-            1530.035,
-            1531.033,
-            1532.033,
-            1533.033,
-            1534.033,
-            1535.03,
-            1536.035,
-            1537.038,
-            1538.035,
-            1539.033,
-            1540.038,
-            1541.035,
-            1542.03,
-            1543.028,
-            1544.028,
-            1545.023,
-            1546.023,
-            1547.023,
-            1548.023,
-            1549.023,
-            1550.028,
-            1551.028,
-            1552.023,
-            1553.025,
-            1554.025,
-            1555.028,
-            1556.028,
-            1557.028,
-            1558.03,
-            1559.02,
-            1560.025,
-            1561.025,
-            1562.023,
-            1563.025,
-            1564.025,
-            1565.025,
-            1566.025,
-            1567.03,
-            1568.033,
-            1569.033,
-            1570.03,
-            1571.033,
-            1572.03,
-            1573.03,
-            1574.03,
-            1575.033,
-            1576.033,
-            1577.038,
-            1578.035,
-            1579.033,
-            1580.043,
-            1581.043,
-        ]
-    )
+    # Calibration table in calibration_data of each laser type, and the number of
+    # decimals its device argument is rounded to
+    calibration_tables = {
+        "thorlabs": ("thorlabs", 0),
+        "santec": ("santec", 4),
+        "ando": ("ando", 3),
+        "ando2": ("ando", 3),
+    }
+    # Tables that have been loaded, shared by all lasers
+    _calibrations = {}
+    # Query answered once a new wavelength has been reached, used by
+    # wait_for_tuning. *OPC? only replies when the tuning has completed.
+    tuning_queries = {
+        "santec": "*OPC?",
+        "ando": "*OPC?",
+        "ando2": "*OPC?",
+        "agilent": "*OPC?",
+    }
+    # Time in s the laser needs to reach a new wavelength after the write, for
+    # the types without a tuning query. The thorlabs waits for its motor in
+    # set_wavelength.
+    tuning_times = {
+        "thorlabs": 0,
+        "santec": 0.1,
+        "ando": 0.1,
+        "ando2": 0.1,
+        "agilent": 0.1,
+    }
 
     def __init__(
-        self, type, target_wavelength, power="default", wl_interp=False, GPIB_num=0
+        self,
+        type,
+        target_wavelength,
+        power="default",
+        wl_interp=False,
+        GPIB_num=0,
+        calibration=None,
+        calibration_kind="linear",
+        motor=None,
     ):
+        """
+        Args:
+            calibration, calibration_kind: see set_calibration
+            motor: Kinesis motor of the thorlabs laser to use instead of opening
+                the stage, e.g. simulation.SimulatedKinesisMotor
+        """
         self.type = type
         self.target_wavelength = target_wavelength
         self.actual_wavelength = 0
         self.wl_interp = wl_interp
-        rm = visa.ResourceManager()
+        self.sweep_end = 0
+        self.set_calibration(calibration, calibration_kind)
 
         if power == "default":
             if type == "santec":
-                self.power = 115
+                power = 115
             elif type == "ando" or self.type == "ando2":
-                self.power = 6
+                power = 6
             elif type == "agilent":
-                self.power = 0
+                power = 0
 
         if self.type == "thorlabs":
-            self.device = Thorlabs.KinesisMotor("27000677")
+            if motor is None:
+                motor = Thorlabs.KinesisMotor("27000677")
+            self.device = tracing.wrap(motor, "27000677")
             self.device.home()
             self.device.wait_for_home()
         if self.type == "santec":
-            self.device = rm.open_resource(f"GPIB{GPIB_num}::3::INSTR")
+            self.device = visa_pool.open_resource(f"GPIB{GPIB_num}::3::INSTR")
         if self.type == "ando":
-            self.device = rm.open_resource(f"GPIB{GPIB_num}::24::INSTR")
+            self.device = visa_pool.open_resource(f"GPIB{GPIB_num}::24::INSTR")
         if self.type == "ando2":
-            self.device = rm.open_resource(f"GPIB{GPIB_num}::23::INSTR")
+            self.device = visa_pool.open_resource(f"GPIB{GPIB_num}::23::INSTR")
         if self.type == "agilent":
-            self.device = rm.open_resource(f"GPIB{GPIB_num}::10::INSTR")
+            self.device = visa_pool.open_resource(f"GPIB{GPIB_num}::10::INSTR")
         self.set_wavelength(target_wavelength)
         self.set_power(power)
 
-    def set_wavelength(self, wavelength):
+    def set_calibration(self, calibration=None, kind="linear"):
         """
-        Sets the wavelength using the calibration data given in the start of the class.
+        Sets the calibration used to map wavelengths to device arguments.
+        Args:
+            calibration: WavelengthCalibration, a CSV file or the name of a table
+                in calibration_data. None for the table of the laser type.
+            kind: interpolation of the table, 'linear' or 'monotone'
         """
-        if self.type == "thorlabs":
-            self.wavelength_device_argument = np.round(
-                np.interp(
-                    wavelength, laser.actual_peaks_thorlabs, laser.self_pos_array
-                ),
-                0,
+        if isinstance(calibration, WavelengthCalibration):
+            self.calibration = calibration
+            return
+        if self.type not in laser.calibration_tables:
+            self.calibration = None
+            return
+        table, decimals = laser.calibration_tables[self.type]
+        if calibration is not None:
+            table = calibration
+        key = (table, kind, decimals)
+        if key not in laser._calibrations:
+            laser._calibrations[key] = WavelengthCalibration.from_file(
+                table, kind, decimals
             )
+        self.calibration = laser._calibrations[key]
+
+    def plan_wavelengths(self, wavelengths):
+        """
+        Returns the device arguments for wavelengths, a scalar or an array, e.g.
+        all the setpoints of a scan at once. They can be passed to set_wavelength
+        as device_argument.
+        """
+        if self.calibration is None or (
+            self.type != "thorlabs" and not self.wl_interp
+        ):
+            if np.ndim(wavelengths) == 0:
+                return wavelengths
+            return np.asarray(wavelengths)
+        return self.calibration(wavelengths)
+
+    def set_wavelength(self, wavelength, device_argument=None):
+        """
+        Sets the wavelength using the calibration of the laser.
+        Args:
+            wavelength: in nm
+            device_argument: argument from plan_wavelengths, None to compute it
+        """
+        if device_argument is None:
+            device_argument = self.plan_wavelengths(wavelength)
+        self.wavelength_device_argument = device_argument
+        if self.type == "thorlabs":
             self.device.move_to(self.wavelength_device_argument)
             self.device.wait_move()
-            self.target_wavelength = wavelength
         if self.type == "santec":
-            if self.wl_interp:
-                self.wavelength_device_argument = np.round(
-                    np.interp(
-                        wavelength,
-                        laser.actual_peaks_santec,
-                        laser.wavelength_array_santec,
-                    ),
-                    4,
-                )
-            else:
-                self.wavelength_device_argument = wavelength
             self.device.write("WA:" + str(self.wavelength_device_argument))
-            self.target_wavelength = wavelength
         if self.type == "ando" or self.type == "ando2":
-            if self.wl_interp:
-                self.wavelength_device_argument = np.round(
-                    np.interp(
-                        wavelength, laser.actual_peaks_ando, laser.wavelength_array_ando
-                    ),
-                    3,
-                )
-            else:
-                self.wavelength_device_argument = wavelength
             self.device.write("TWL" + str(self.wavelength_device_argument))
-            self.target_wavelength = wavelength
         if self.type == "agilent":
-            self.wavelength_device_argument = wavelength
             self.device.write(
                 "SOURCE1:CHAN1:WAV " + str(self.wavelength_device_argument) + "NM"
             )
-            self.target_wavelength = wavelength
+        self.target_wavelength = wavelength
+
+    def wait_for_tuning(self):
+        """
+        Waits until the laser has reached the wavelength of the last
+        set_wavelength, by the query in tuning_queries, or for the time in
+        tuning_times if the laser type has no query.
+        """
+        query = self.tuning_queries.get(self.type)
+        if query is not None:
+            self.device.query(query)
+            return
+        tuning_time = self.tuning_times.get(self.type, 0.1)
+        if tuning_time:
+            tracing.sleep(tuning_time)
+
+    def sweep_list(self, wavelengths, dwell, wait=True, hardware=True, on_step=None):
+        """
+        Steps the laser through wavelengths, staying dwell s at each.
+        If the device arguments are increasing and equally spaced (within 1 %),
+        the agilent and santec do the sweep themselves as a stepped sweep, and
+        the agilent outputs a trigger at every step, so the OSA or power meter
+        can be step triggered without a write from the host per point.
+        Otherwise the steps are written from a host loop timed against a fixed
+        schedule, so the write latency does not add up over the sweep.
+        Args:
+            wavelengths: in nm
+            dwell: time in s at each wavelength
+            wait: if False, a hardware sweep returns as soon as it is started,
+                see wait_for_sweep
+            hardware: False to always use the host loop
+            on_step: function called with (index, wavelength) once each step is
+                set, which needs the host loop
+        Returns:
+            time.perf_counter() of every step, for a hardware sweep as scheduled
+        """
+        wavelengths = np.asarray(wavelengths, dtype=float)
+        arguments = self.plan_wavelengths(wavelengths)
+        if hardware and on_step is None and self._can_sweep(arguments):
+            times = self._start_sweep(arguments, dwell)
+            if wait:
+                self.wait_for_sweep()
+        else:
+            times = self._host_sweep(wavelengths, arguments, dwell, on_step)
+        self.wavelength_device_argument = arguments[-1]
+        self.target_wavelength = wavelengths[-1]
+        return times
+
+    def _can_sweep(self, arguments):
+        if self.type not in ("agilent", "santec") or len(arguments) < 2:
+            return False
+        steps = np.diff(arguments)
+        return steps[0] > 0 and np.allclose(steps, steps[0], rtol=0.01, atol=0)
+
+    def _start_sweep(self, arguments, dwell):
+        start = arguments[0]
+        stop = arguments[-1]
+        step = (stop - start) / (len(arguments) - 1)
+        if self.type == "agilent":
+            prefix = "SOURCE1:CHAN1:WAV:SWE:"
+            self.device.write(prefix + "MODE STEP")
+            self.device.write(prefix + "REP ONEW")
+            self.device.write(prefix + "CYCL 1")
+            self.device.write(prefix + "STAR " + str(start) + "NM")
+            self.device.write(prefix + "STOP " + str(stop) + "NM")
+            self.device.write(prefix + "STEP " + str(step) + "NM")
+            self.device.write(prefix + "DWEL " + str(dwell) + "S")
+            self.device.write("TRIG1:OUTP STF")  # Trigger when a step is finished
+            t0 = time.perf_counter()
+            self.device.write(prefix + "STAT STAR")
+        if self.type == "santec":
+            # Start, stop, step and step time of a stepped one way sweep
+            self.device.write("SS:" + str(start))
+            self.device.write("SE:" + str(stop))
+            self.device.write("WW:" + str(step))
+            self.device.write("SA:" + str(dwell))
+            self.device.write("SM:0")
+            t0 = time.perf_counter()
+            self.device.write("SG")
+        self.sweep_end = t0 + len(arguments) * dwell
+        return t0 + dwell * np.arange(len(arguments))
+
+    def _host_sweep(self, wavelengths, arguments, dwell, on_step):
+        times = np.empty(len(arguments))
+        next_step = time.perf_counter()
+        for i, argument in enumerate(arguments):
+            delay = next_step - time.perf_counter()
+            if delay > 0:
+                tracing.sleep(delay)
+            self.set_wavelength(wavelengths[i], argument)
+            times[i] = time.perf_counter()
+            if self.type == "thorlabs":
+                # The dwell starts when the motor has arrived
+                next_step = times[i] + dwell
+            else:
+                next_step += dwell
+            if on_step is not None:
+                on_step(i, wavelengths[i])
+        self.sweep_end = next_step
+        return times
+
+    def wait_for_sweep(self, timeout=None):
+        """
+        Waits until a sweep started by sweep_list has ended. The agilent is
+        polled for its sweep state, the other lasers are waited for until the
+        end of the dwell of the last step.
+        Args:
+            timeout: in s, None to wait indefinitely
+        """
+        t0 = time.perf_counter()
+        if self.type == "agilent":
+            interval = 0.002
+            while int(float(self.device.query("SOURCE1:CHAN1:WAV:SWE:STAT?"))) != 0:
+                if timeout is not None and time.perf_counter() - t0 > timeout:
+                    print("Warning! Laser sweep did not end before the timeout.")
+                    return
+                tracing.sleep(interval)
+                interval = min(2 * interval, 0.05)
+            return
+        delay = self.sweep_end - t0
+        if timeout is not None and delay > timeout:
+            tracing.sleep(timeout)
+            print("Warning! Laser sweep did not end before the timeout.")
+            return
+        if delay > 0:
+            tracing.sleep(delay)
+
+    def stop_sweep(self):
+        if self.type == "agilent":
+            self.device.write("SOURCE1:CHAN1:WAV:SWE:STAT STOP")
+        if self.type == "santec":
+            self.device.write("SQ")
+        self.sweep_end = time.perf_counter()
 
     def set_power(self, power):
         if self.type == "thorlabs":
@@ -525,9 +309,35 @@ class laser:
             else:
                 print("Power must be between -10 and 6")
 
-    def adjust_wavelength(self, res=0.01, sens='SMID', OSA_GPIB_num=[0, 18]):
+    def adjust_wavelength(
+        self,
+        res=0.01,
+        sens="SMID",
+        OSA_GPIB_num=[0, 18],
+        sample=1001,
+        peak_method="parabolic",
+        settle_time=1,
+        min_snr=10,
+        zoom=True,
+        tolerance=None,
+    ):
         """
         Adjusts the wavelength to the target wavelength using the OSA.
+        Args:
+            res: OSA resolution in nm
+            sens: OSA sensitivity
+            OSA_GPIB_num: GPIB board and address of the OSA
+            sample: number of samples in the 1 nm alignment sweep. The peak is
+                interpolated between samples, so it does not need to be fine.
+            peak_method: see peak_finding.find_peak
+            settle_time: time in s to wait after setting the wavelength
+            min_snr: a warning is printed if the peak is less than this many dB
+                above the noise floor
+            zoom: if True, the span and number of samples are reduced as the
+                error shrinks, see alignment.WavelengthAligner
+            tolerance: in nm, default is 0.005 nm, and 0.1 nm for the santec
+        The number of sweeps and the time spent sweeping are stored in
+        alignment_stats.
         """
         wavelength_target = copy.copy(self.target_wavelength)
         align_osa = OSA(
@@ -535,48 +345,53 @@ class laser:
             self.target_wavelength + 0.5,
             resolution=res,
             sensitivity=sens,
+            sample=sample,
             GPIB_num=OSA_GPIB_num,
+            transfer="compact",
         )  # ,sweep_time=5)
-        align_osa.set_sample(10001)
-        peak = np.argmax(align_osa.powers)
-        align_peak = align_osa.wavelengths[peak]
-        error = align_peak - wavelength_target
-        if (
-            self.type == "thorlabs"
-            or self.type == "ando"
-            or self.type == "agilent"
-            or self.type == "ando2"
-        ):
-            while abs(error) >= 0.005:
-                self.set_wavelength(self.target_wavelength - error)
-                time.sleep(1)
-                align_osa.sweep()
-                peak = np.argmax(align_osa.powers)
-                align_peak = align_osa.wavelengths[peak]
-                error = align_peak - wavelength_target
-
+        if peak_finding.snr(align_osa.powers) < min_snr:
+            print("Warning! Laser peak is close to the noise floor of the OSA.")
+        align_peak = peak_finding.find_peak(
+            align_osa.wavelengths, align_osa.powers, peak_method
+        )[0]
         if self.type == "santec":
-            set_wl_list = []
-            while abs(error) >= 0.1:
-                if np.abs(error) <= 0.5:
-                    self.set_wavelength(self.target_wavelength - 0.1 * np.sign(error))
-                else:
-                    self.set_wavelength(self.target_wavelength - error)
-                time.sleep(1)
-                align_osa.sweep()
-                peak = np.argmax(align_osa.powers)
-                align_peak = align_osa.wavelengths[peak]
-                error = align_peak - wavelength_target
-                if self.target_wavelength in set_wl_list:
-                    break
-                else:
-                    set_wl_list = np.append(set_wl_list, self.target_wavelength)
-                    # print(error_list)
+            # The santec only tunes in coarse steps, so it is stepped by 0.1 nm
+            # close to the target and stopped when it oscillates between steps
+            coarse_step = 0.1
+            default_tolerance = 0.1
+        else:
+            coarse_step = None
+            default_tolerance = 0.005
+        aligner = WavelengthAligner(
+            align_osa,
+            self.set_wavelength,
+            tolerance=default_tolerance if tolerance is None else tolerance,
+            span=1,
+            sample=sample,
+            zoom=zoom,
+            min_span=max(0.1, 10 * res),
+            coarse_step=coarse_step,
+            settle_time=settle_time,
+            peak_method=peak_method,
+        )
+        measured, setpoint, iterations = aligner.align(
+            wavelength_target, self.target_wavelength, align_peak
+        )
+        if measured is not None:
+            align_peak = measured
+        self.alignment_stats = {
+            "sweeps": aligner.num_sweeps + 1,
+            "sweep_time": aligner.sweep_time,
+            "corrections": iterations,
+        }
         self.target_wavelength = wavelength_target
         self.actual_wavelength = align_peak
 
     def close(self):
-        self.device.close()
+        if self.type == "thorlabs":
+            self.device.close()
+        else:
+            visa_pool.close_resource(self.device)
 
     def toggle_laser(self):
         if self.type == "ando" or self.type == "ando2":
@@ -595,7 +410,17 @@ class TiSapphire:
     The Ti Sa laser is controlled externally by a Newport SMC100 motor, so it has a different class.
     """
 
-    def __init__(self, com_port, NSL=10, PSL=10):
+    def __init__(
+        self, com_port, NSL=10, PSL=10, calibration_file=TiSa_calibration_file, SMC=None
+    ):
+        """
+        Args:
+            com_port: COM port of the SMC100
+            NSL, PSL: negative and positive software limits in mm
+            calibration_file: CSV file with the OSA confirmed moves, which the
+                motor calibration is fitted to. None to not keep the calibration.
+            SMC: SMC100 command interface to use instead of the DLL, e.g. a simulation
+        """
         from .Newport_control import actuator
 
         # Set up parameters for Ti Sa control, this file is installed automatically when the Newport SMC100 software is installed
@@ -605,69 +430,144 @@ class TiSapphire:
             + "v4.0_2.0.0.3__d9d722840772240b/"
         )
 
-        self.act = actuator(SMC_file_loc, com_port)
+        self.act = actuator(SMC_file_loc, com_port, SMC=SMC)
         self.act.initialize(PSL, NSL)
+        # dist_1nm = -0.0678  # LGN measured response for 1 nm
+        dist_1nm = -0.08297  # Thjalfe measured response for 1 nm (960-990 nm, R^2 = 0.99974)
+        self.calibration = MotorCalibration(calibration_file, default_slope=dist_1nm)
+        # Direction of the last move, used for the backlash compensation
+        self.last_direction = 0
+        # Last wavelength measured with the OSA, or expected after delta_wl_nm
+        self.wavelength = None
+        self._moved = False
+
+    def move_mm(self, dist, wait=True):
+        """
+        Moves the motor by dist mm. If wait is False, returns the
+        Newport_control.Motion of the move right away, or None if dist is 0.
+        """
+        if dist == 0:
+            return None
+        self.last_direction = np.sign(dist)
+        self._moved = True
+        if wait:
+            self.act.move(dist)
+            return None
+        return self.act.move_async(dist)
 
-    def delta_wl_nm(self, del_wl):
+    def delta_wl_nm(self, del_wl, wait=True):
         """
         Moves the Ti Sa laser by a certain number of nanometers.
+        The move is predicted from the motor calibration if the current wavelength is known.
+        See move_mm for wait.
         """
-        # dist_1nm = -0.0678  # LGN measured response for 1 nm
-        dist_1nm = -0.08297  # Thjalfe measured response for 1 nm (960-990 nm, R^2 = 0.99974)
-        self.act.move(del_wl * dist_1nm)
+        if self.wavelength is None:
+            return self.move_mm(
+                del_wl * self.calibration.slope(self.calibration.center), wait
+            )
+        motion = self.move_mm(
+            self.calibration.move(
+                self.wavelength, self.wavelength + del_wl, self.last_direction
+            ),
+            wait,
+        )
+        self.wavelength = self.wavelength + del_wl
+        return motion
 
     def delta_wl_arb(self, del_wl):
         """
         Moves the motor by del_wl mm, which is the Newport SMC100's native unit, but gives arbitrary response from Ti Sa.
         """
-        self.act.move(del_wl)
+        self.move_mm(del_wl)
+        self.wavelength = None
 
     def get_pos(self):
         result, response, errString = self.act.SMC.TP(1, 00, "")
         return response
 
+    def measure_wavelength(self, osa, peak_method="parabolic"):
+        """
+        Finds the Ti Sa peak in the last OSA sweep, and records it in the motor
+        calibration if the laser has moved since the last measurement.
+        """
+        self.wavelength = peak_finding.find_peak(
+            osa.wavelengths, osa.powers, peak_method
+        )[0]
+        if self._moved:
+            self.calibration.record(
+                float(self.get_pos()), self.wavelength, self.last_direction
+            )
+            self._moved = False
+        return self.wavelength
+
+    @staticmethod
+    def line_visible(osa):
+        """True if the Ti Sa is visible in the last OSA sweep, and not at its edge."""
+        index = np.argmax(osa.powers)
+        return osa.powers[index] > -65 and 0 < index < len(osa.powers) - 1
+
+    def find_line(self, osa, target_wl, peak_method="parabolic"):
+        """
+        Keeps expanding the sweep around target_wl until the Ti Sa is visible,
+        and returns its wavelength.
+        """
+        counter = 1
+        while not self.line_visible(osa):
+            counter += 1
+            osa.set_span(target_wl - 10 * counter, target_wl + 10 * counter)
+            osa.sweep()
+            self._num_sweeps += 1
+        return self.measure_wavelength(osa, peak_method), counter
+
     def set_wavelength(
-        self, target_wl, error_tolerance=0.1, OSA_GPIB_num=[0, 18], res=0.05
+        self,
+        target_wl,
+        error_tolerance=0.1,
+        OSA_GPIB_num=[0, 18],
+        res=0.05,
+        peak_method="parabolic",
+        settle_time=2,
     ):
         """
         Sets the wavelength of the TiSa laser.
         Args:
             target_wl: self explanatory
             error_tolerance: Error tolerated from the OSA to target wl
+            peak_method: see peak_finding.find_peak
+            settle_time: time in s to wait after a rough step
 
+        Every OSA confirmed move is added to the motor calibration, which is used
+        to predict the next move. The number of moves and sweeps are stored in
+        tuning_stats.
         """
         osa = OSA(target_wl - 10, target_wl + 10, resolution=res, GPIB_num=OSA_GPIB_num)
-        peak_val = np.max(osa.powers)
-        counter = 1
-        while peak_val < -65:  # Keeps expanding sweep size until TiSa is visible
-            counter += 1
-            osa = OSA(
-                target_wl - 10 * counter,
-                target_wl + 10 * counter,
-                resolution=res,
-                GPIB_num=OSA_GPIB_num,
-            )
-            peak_val = np.max(osa.powers)
-        wl_cur = osa.wavelengths[np.argmax(osa.powers)]
+        self._num_sweeps = 1
+        num_moves = 0
+        wl_cur, counter = self.find_line(osa, target_wl, peak_method)
         nm_diff = target_wl - wl_cur
         if counter > 1:  # If TiSa started far from target, do one rough step first
             self.delta_wl_nm(nm_diff)
-            time.sleep(2)
+            num_moves += 1
+            tracing.sleep(settle_time)
             osa.sweep()
-            wl_cur = osa.wavelengths[np.argmax(osa.powers)]
+            self._num_sweeps += 1
+            wl_cur = self.find_line(osa, target_wl, peak_method)[0]
             nm_diff = target_wl - wl_cur
         while np.abs(nm_diff) > error_tolerance:
-            self.delta_wl_nm(nm_diff)
+            # The OSA span is set while the motor moves
+            motion = self.delta_wl_nm(nm_diff, wait=False)
+            num_moves += 1
             if np.abs(nm_diff) > 0.5:
                 if nm_diff > 0:
-                    osa = OSA(
-                        wl_cur, wl_cur + 2 * nm_diff, resolution=res, GPIB_num=OSA_GPIB_num
-                    )
+                    osa.set_span(wl_cur, wl_cur + 2 * nm_diff)
                 else:
-                    osa = OSA(
-                        wl_cur + 2 * nm_diff, wl_cur, resolution=res, GPIB_num=OSA_GPIB_num
-                    )
+                    osa.set_span(wl_cur + 2 * nm_diff, wl_cur)
             else:
-                osa = OSA(wl_cur - 0.5, wl_cur + 0.5, resolution=res, GPIB_num=OSA_GPIB_num)
-            wl_cur = osa.wavelengths[np.argmax(osa.powers)]
+                osa.set_span(wl_cur - 0.5, wl_cur + 0.5)
+            if motion is not None:
+                motion.wait()
+            osa.sweep()
+            self._num_sweeps += 1
+            wl_cur = self.find_line(osa, target_wl, peak_method)[0]
             nm_diff = target_wl - wl_cur
+        self.tuning_stats = {"moves": num_moves, "sweeps": self._num_sweeps}
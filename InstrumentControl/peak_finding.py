@@ -0,0 +1,101 @@
+"""
+Peak finding on OSA spectra with sub-sample accuracy.
+
+np.argmax on a trace is only accurate to one sample, so a 1 nm span needs
+thousands of samples to locate a laser line to a few pm. Interpolating around
+the maximum gives the same accuracy from a much coarser sweep.
+"""
+import numpy as np
+
+
+def find_peak(wavelengths, powers, method="parabolic", window_dB=3):
+    """
+    Finds the wavelength and power of the highest peak.
+    Args:
+        wavelengths: in nm, equally spaced
+        powers: in dBm
+        method: 'argmax' (one sample accuracy), 'parabolic' (vertex of a parabola
+            through the maximum and its two neighbours, in dB), or 'centroid'
+            (power weighted mean wavelength of the points within window_dB of the
+            maximum, in linear power)
+        window_dB: width of the centroid window below the maximum
+    Returns:
+        peak_wavelength, peak_power
+    """
+    wavelengths = np.asarray(wavelengths)
+    powers = np.asarray(powers)
+    i = int(np.argmax(powers))
+    if method == "argmax" or i == 0 or i == len(powers) - 1:
+        return wavelengths[i], powers[i]
+    if method == "parabolic":
+        left, center, right = powers[i - 1], powers[i], powers[i + 1]
+        curvature = left - 2 * center + right
+        if curvature == 0:
+            return wavelengths[i], center
+        offset = 0.5 * (left - right) / curvature
+        step = wavelengths[i + 1] - wavelengths[i]
+        peak_power = center - 0.25 * (left - right) * offset
+        return wavelengths[i] + offset * step, peak_power
+    if method == "centroid":
+        # Contiguous region around the maximum that is within window_dB of it
+        above = powers >= powers[i] - window_dB
+        start = i
+        while start > 0 and above[start - 1]:
+            start -= 1
+        end = i + 1
+        while end < len(powers) and above[end]:
+            end += 1
+        linear = 10 ** (powers[start:end] / 10)
+        return np.sum(wavelengths[start:end] * linear) / np.sum(linear), powers[i]
+    raise ValueError(f"Unknown peak finding method {method}")
+
+
+def noise_floor(powers):
+    """Estimates the noise floor in dBm as the median of the trace."""
+    return np.median(powers)
+
+
+def snr(powers):
+    """Signal to noise ratio in dB of the highest peak over the noise floor."""
+    return np.max(powers) - noise_floor(powers)
+
+
+def find_peaks(
+    wavelengths, powers, min_snr=10, min_separation=0, max_peaks=None, method="parabolic"
+):
+    """
+    Finds all peaks at least min_snr dB above the noise floor.
+    Args:
+        wavelengths: in nm, equally spaced
+        powers: in dBm
+        min_snr: in dB
+        min_separation: in nm, of two peaks only the highest is kept if they are closer
+        max_peaks: maximum number of peaks returned, None for all
+        method: method used to refine each peak, see find_peak
+    Returns:
+        peak_wavelengths, peak_powers sorted by decreasing power
+    """
+    wavelengths = np.asarray(wavelengths)
+    powers = np.asarray(powers)
+    threshold = noise_floor(powers) + min_snr
+    middle = powers[1:-1]
+    is_peak = (middle > powers[:-2]) & (middle >= powers[2:]) & (middle >= threshold)
+    indices = np.nonzero(is_peak)[0] + 1
+    indices = indices[np.argsort(powers[indices])[::-1]]
+    kept = []
+    for index in indices:
+        if all(
+            abs(wavelengths[index] - wavelengths[other]) >= min_separation
+            for other in kept
+        ):
+            kept.append(index)
+            if max_peaks is not None and len(kept) == max_peaks:
+                break
+    peak_wavelengths = np.empty(len(kept))
+    peak_powers = np.empty(len(kept))
+    for n, index in enumerate(kept):
+        # Refine each peak on its own three points
+        peak_wavelengths[n], peak_powers[n] = find_peak(
+            wavelengths[index - 1 : index + 2], powers[index - 1 : index + 2], method
+        )
+    return peak_wavelengths, peak_powers
@@ -0,0 +1,138 @@
+"""
+Scan engine that steps actuators through a list of setpoints and yields the
+measured data at every point.
+
+Every detector measurement is split in two: acquire, which has to happen while the
+actuators are at the setpoint (e.g. an OSA sweep), and read, which only downloads
+the result (e.g. the OSA trace). The move to the next setpoint is started in a
+worker thread as soon as acquire is done, so it overlaps with read and with
+whatever the caller does with the yielded point.
+"""
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from . import tracing
+
+ScanPoint = namedtuple("ScanPoint", ["index", "setpoint", "data", "timestamp"])
+
+
+class Detector:
+    """
+    Args:
+        name: key of the detector's data in ScanPoint.data
+        acquire: function measuring at the current setpoint
+        read: function returning the data of the last acquire. If None, the
+            return value of acquire is used.
+    """
+
+    def __init__(self, name, acquire, read=None):
+        self.name = name
+        self.acquire = acquire
+        self.read = read
+
+
+def osa_detector(osa, name="osa"):
+    """Detector sweeping an OSA and returning (wavelengths, powers)."""
+
+    def read():
+        osa.get_spectrum()
+        return osa.wavelengths, osa.powers
+
+    return Detector(name, lambda: osa.sweep(download=False), read)
+
+
+def pm_detector(power_meter, name="pm"):
+    """Detector reading a PM in W."""
+    return Detector(name, power_meter.measure)
+
+
+class MemorySink:
+    """
+    Keeps all scan points in memory.
+    stack(name) returns the data of one detector stacked to an array with one row
+    per point.
+    """
+
+    def __init__(self):
+        self.points = []
+
+    def __call__(self, point):
+        self.points.append(point)
+
+    def stack(self, name):
+        return np.stack([np.asarray(point.data[name]) for point in self.points])
+
+
+class Scan:
+    """
+    Args:
+        setpoints: list of setpoints. With several actuators, each setpoint is a
+            sequence with one value per actuator.
+        actuators: list of functions moving to a setpoint, e.g. laser.set_wavelength
+        detectors: list of Detector
+        sinks: list of functions that are called with every ScanPoint, e.g. MemorySink()
+        overlap: if False, every point is moved to, acquired and read in turn
+        settle_time: time in s to wait after a move before acquiring
+    """
+
+    def __init__(
+        self, setpoints, actuators, detectors, sinks=[], overlap=True, settle_time=0
+    ):
+        self.setpoints = list(setpoints)
+        self.actuators = list(actuators)
+        self.detectors = list(detectors)
+        self.sinks = list(sinks)
+        self.overlap = overlap
+        self.settle_time = settle_time
+        self.num_points = 0
+        self.elapsed = 0
+        self.points_per_minute = 0
+
+    def move_to(self, setpoint):
+        if len(self.actuators) == 1:
+            self.actuators[0](setpoint)
+        else:
+            for actuator, value in zip(self.actuators, setpoint):
+                actuator(value)
+        if self.settle_time:
+            tracing.sleep(self.settle_time)
+
+    def run(self):
+        """
+        Generator yielding a ScanPoint for every setpoint.
+        Throughput is updated in points_per_minute while the scan runs.
+        """
+        self.num_points = 0
+        t0 = time.perf_counter()
+        executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            if self.setpoints:
+                move = executor.submit(self.move_to, self.setpoints[0])
+            for index, setpoint in enumerate(self.setpoints):
+                move.result()
+                results = [detector.acquire() for detector in self.detectors]
+                has_next = index + 1 < len(self.setpoints)
+                if self.overlap and has_next:
+                    move = executor.submit(self.move_to, self.setpoints[index + 1])
+                data = {}
+                for detector, result in zip(self.detectors, results):
+                    data[detector.name] = (
+                        result if detector.read is None else detector.read()
+                    )
+                if not self.overlap and has_next:
+                    move = executor.submit(self.move_to, self.setpoints[index + 1])
+                    move.result()
+                point = ScanPoint(index, setpoint, data, time.time())
+                for sink in self.sinks:
+                    sink(point)
+                self.num_points += 1
+                self.elapsed = time.perf_counter() - t0
+                self.points_per_minute = 60 * self.num_points / self.elapsed
+                yield point
+        finally:
+            # A pending move is finished, also if the scan is stopped early
+            executor.shutdown(wait=True)
+
+    def __iter__(self):
+        return self.run()
@@ -0,0 +1,951 @@
+"""
+Simulated instruments, used to test and benchmark the instrument classes without
+hardware.
+
+The simulated sessions mimic the parts of a pyvisa resource that the instrument
+classes use (write, query, read_raw, query_ascii_values, close) and count the
+number of calls and bytes moved over the bus. They are handed to the instrument
+classes by installing a SimulatedResourceManager in visa_pool, and the serial
+and motor devices are passed to the classes directly (piezo ser=,
+actuator/TiSapphire SMC=, laser motor=). SimulatedBench connects one of each:
+
+    bench = SimulatedBench(latency=0.001).install()
+    osa = OSA(1549, 1551)
+    tunable_laser = laser("ando", 1550)
+
+The noise of every simulated instrument comes from a seeded generator, so a run
+gives the same results every time.
+"""
+import os
+import re
+import time
+import numpy as np
+from . import visa_pool
+from .calibration import calibration_folder
+
+
+class SimulatedSession:
+    """
+    Stand-in for a pyvisa resource.
+    Subclasses implement respond(message), which returns the reply to a query or
+    None if the message is a plain write.
+
+    Args:
+        resource_name: VISA resource string the session is registered under
+        latency: time in s added to every write
+        bytes_per_second: bus throughput used to delay reads, None for no delay
+    """
+
+    termination = b"\r\n"
+
+    def __init__(self, resource_name, latency=0, bytes_per_second=None):
+        self.resource_name = resource_name
+        self.latency = latency
+        self.bytes_per_second = bytes_per_second
+        self.timeout = 2000
+        self.read_termination = None
+        self.write_termination = None
+        self.closed = False
+        self._reply = b""
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.num_writes = 0
+        self.num_reads = 0
+        self.bytes_written = 0
+        self.bytes_read = 0
+
+    def respond(self, message):
+        return None
+
+    def write(self, message):
+        self.num_writes += 1
+        self.bytes_written += len(message)
+        if self.latency:
+            time.sleep(self.latency)
+        reply = self.respond(message)
+        if reply is not None:
+            if isinstance(reply, str):
+                reply = reply.encode("ascii")
+            self._reply = reply + self.termination
+
+    def read_raw(self):
+        reply = self._reply
+        self._reply = b""
+        self.num_reads += 1
+        self.bytes_read += len(reply)
+        if self.bytes_per_second:
+            time.sleep(len(reply) / self.bytes_per_second)
+        return reply
+
+    def read(self):
+        return self.read_raw().decode("ascii").rstrip(self.termination.decode())
+
+    def query(self, message):
+        self.write(message)
+        return self.read()
+
+    def query_ascii_values(self, message, converter="f", separator=",", container=list):
+        # Same parsing as pyvisa.util.from_ascii_block
+        data = self.query(message)
+        return container([float(value) for value in data.split(separator)])
+
+    def close(self):
+        self.closed = True
+
+
+class SimulatedOSA(SimulatedSession):
+    """
+    Simulated ANDO AQ6317B, showing a single laser line on top of a noise floor.
+    A sweep is written to the traces in write mode (WRTA, trace A at start), and
+    the traces set to fixed (FIXA) keep their data.
+
+    Args:
+        peak_wavelength: wavelength of the laser line in nm
+        peak_power: peak power of the laser line in dBm
+        noise_floor: noise floor in dBm
+        sweep_duration: time in s that SWEEP? reports a sweep as running
+        time_per_sample: time in s added to sweep_duration for every sample
+        seed: seed for the noise on the trace
+    """
+
+    auto_sample = 1001
+
+    def __init__(
+        self,
+        resource_name="GPIB0::18::INSTR",
+        peak_wavelength=1550,
+        peak_power=-10,
+        noise_floor=-80,
+        sweep_duration=0,
+        time_per_sample=0,
+        seed=0,
+        **kwargs,
+    ):
+        super().__init__(resource_name, **kwargs)
+        self.time_per_sample = time_per_sample
+        self.peak_wavelength = peak_wavelength
+        self.peak_power = peak_power
+        self.noise_floor = noise_floor
+        self.sweep_duration = sweep_duration
+        self.rng = np.random.default_rng(seed)
+        self.wavelength_start = 1500
+        self.wavelength_end = 1600
+        self.resolution = 1
+        self.sample = None
+        self.sensitivity = "SMID"
+        self.TLS_sync = 0
+        self.num_sweeps = 0
+        self.sweep_end_time = 0
+        self.trace_modes = {"A": "WRT", "B": "FIX", "C": "FIX", "D": "FIX"}
+        # WDAT and LDAT replies of every trace
+        self.traces = {}
+        self.SRQ_enabled = False
+
+    def spectrum(self):
+        """Returns the wavelengths and levels the OSA would measure now."""
+        num_points = self.sample if self.sample else self.auto_sample
+        wavelengths = np.linspace(self.wavelength_start, self.wavelength_end, num_points)
+        half_width = max(self.resolution, 0.01) / 2
+        detuning = (wavelengths - self.peak_wavelength) / half_width
+        line = 10 ** (self.peak_power / 10) / (1 + detuning**2)
+        noise = 10 ** (
+            (self.noise_floor + self.rng.normal(0, 1, num_points)) / 10
+        )
+        return wavelengths, 10 * np.log10(line + noise)
+
+    def respond(self, message):
+        if message in ("SGL", "RPT"):
+            self.num_sweeps += 1
+            wavelengths, levels = self.spectrum()
+            self.sweep_end_time = (
+                time.perf_counter()
+                + self.sweep_duration
+                + self.time_per_sample * len(wavelengths)
+            )
+            data = {
+                "WDAT": _format_trace(wavelengths, "%.3f"),
+                "LDAT": _format_trace(levels, "%.2f"),
+            }
+            for trace, mode in self.trace_modes.items():
+                if mode == "WRT":
+                    self.traces[trace] = data
+        elif message.startswith("SRQ"):
+            self.SRQ_enabled = message == "SRQ1"
+        elif message == "STP":
+            self.sweep_end_time = 0
+        elif message == "SWEEP?":
+            return "1" if time.perf_counter() < self.sweep_end_time else "0"
+        elif message == "TLSSYNC?":
+            return str(self.TLS_sync)
+        elif message.startswith("TLSSYNC"):
+            self.TLS_sync = int(message[7:])
+        elif message.startswith("STAWL"):
+            self.wavelength_start = float(message[5:])
+        elif message.startswith("STPWL"):
+            self.wavelength_end = float(message[5:])
+        elif message.startswith("RESLN"):
+            self.resolution = float(message[5:])
+        elif message.startswith("SMPL"):
+            self.sample = int(message[4:])
+        elif message in ("SNHD", "SNAT", "SMID", "SHI1", "SHI2", "SHI3"):
+            self.sensitivity = message
+        elif message[:3] in ("WRT", "FIX", "BLK") and message[3:] in self.trace_modes:
+            self.trace_modes[message[3:]] = message[:3]
+            if message[:3] == "BLK":
+                self.traces.pop(message[3:], None)
+        elif message[:4] in ("WDAT", "LDAT"):
+            return self.traces.get(message[4:5] or "A", {}).get(message[:4], "0")
+        return None
+
+    def wait_for_srq(self, timeout=25000):
+        # timeout in ms, like pyvisa
+        if not self.SRQ_enabled:
+            raise TimeoutError("SRQ is not enabled")
+        remaining = self.sweep_end_time - time.perf_counter()
+        if remaining > timeout / 1000:
+            raise TimeoutError("Timeout while waiting for SRQ")
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def read_stb(self):
+        return 1 if time.perf_counter() >= self.sweep_end_time else 0
+
+
+class SimulatedLaser(SimulatedSession):
+    """
+    Simulated tunable laser understanding the ando, santec and agilent commands,
+    including the stepped sweeps of the santec and agilent.
+    The emitted wavelength is the set wavelength plus offset, and is shown as the
+    line on a simulated OSA.
+
+    Args:
+        offset: difference between emitted and set wavelength in nm
+        slope: change of the emitted wavelength per nm change of the set wavelength
+        osa: SimulatedOSA showing the laser line, or None
+        tuning_time: time in s after a wavelength write during which the laser
+            still emits the previous wavelength. *OPC? replies once it has passed.
+    """
+
+    def __init__(
+        self,
+        resource_name="GPIB0::24::INSTR",
+        offset=0,
+        slope=1,
+        osa=None,
+        tuning_time=0,
+        **kwargs,
+    ):
+        super().__init__(resource_name, **kwargs)
+        self.offset = offset
+        self.slope = slope
+        self.osa = osa
+        self.tuning_time = tuning_time
+        self.wavelength = None
+        self.previous_wavelength = None
+        self.power = None
+        self.on = 1
+        self.num_wavelength_writes = 0
+        # perf_counter() and wavelength of every wavelength write
+        self.wavelength_log = []
+        self.sweep_settings = {}
+        self.sweep_start = None
+        self.num_sweeps = 0
+
+    def set_wavelength(self, wavelength):
+        if wavelength < 10:
+            wavelength = 1000 * wavelength  # santec wavelengths can be given in um
+        self.previous_wavelength = self.wavelength
+        self.wavelength = wavelength
+        self.num_wavelength_writes += 1
+        self.wavelength_log.append((time.perf_counter(), wavelength))
+        if self.osa is not None:
+            self.osa.peak_wavelength = self.emitted_wavelength()
+
+    def sweeping(self):
+        """True while a stepped sweep is running, also updates the wavelength."""
+        if self.sweep_start is None:
+            return False
+        settings = self.sweep_settings
+        span = settings["stop"] - settings["start"]
+        num_steps = int(round(span / settings["step"])) + 1
+        step = int((time.perf_counter() - self.sweep_start) / settings["dwell"])
+        wavelength = settings["start"] + min(step, num_steps - 1) * settings["step"]
+        self.wavelength = 1000 * wavelength if wavelength < 10 else wavelength
+        if step >= num_steps:
+            self.sweep_start = None
+            return False
+        return True
+
+    def emitted_wavelength(self):
+        self.sweeping()
+        wavelength = self.wavelength
+        if (
+            self.previous_wavelength is not None
+            and self.wavelength_log
+            and time.perf_counter() < self.wavelength_log[-1][0] + self.tuning_time
+        ):
+            wavelength = self.previous_wavelength
+        return 1550 + self.slope * (wavelength - 1550) + self.offset
+
+    def respond(self, message):
+        if message.startswith("TWL"):
+            self.set_wavelength(float(message[3:]))
+        elif message.startswith("WA:"):
+            self.set_wavelength(float(message[3:]))
+        elif message.startswith("SOURCE1:CHAN1:WAV "):
+            self.set_wavelength(float(message[18:].rstrip("NM")))
+        elif message.startswith("SOURCE1:CHAN1:WAV:SWE:"):
+            return self.respond_sweep(message[22:])
+        elif message[:3] in ("SS:", "SE:", "WW:", "SA:"):
+            key = {"SS:": "start", "SE:": "stop", "WW:": "step", "SA:": "dwell"}
+            self.sweep_settings[key[message[:3]]] = float(message[3:])
+        elif message == "SG":
+            self.start_sweep()
+        elif message == "SQ":
+            self.sweep_start = None
+        elif message.startswith("TPDB"):
+            self.power = float(message[4:])
+        elif message.startswith("CU:"):
+            self.power = float(message[3:])
+        elif message.startswith("SOURCE1:CHAN1:POW "):
+            self.power = float(message[18:])
+        elif message == "*OPC?":
+            # The reply is held back until the tuning has completed
+            if self.wavelength_log:
+                tuned = self.wavelength_log[-1][0] + self.tuning_time
+                delay = tuned - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            return "1"
+        elif message == "L?":
+            return str(self.on)
+        elif message in ("L0", "L1"):
+            self.on = int(message[1])
+        return None
+
+    def respond_sweep(self, command):
+        # Agilent SOURCE1:CHAN1:WAV:SWE: commands
+        key = {"STAR": "start", "STOP": "stop", "STEP": "step", "DWEL": "dwell"}
+        name, _, value = command.partition(" ")
+        if name == "STAT?":
+            return "+1" if self.sweeping() else "+0"
+        if name == "STAT":
+            if value == "STAR":
+                self.start_sweep()
+            else:
+                self.sweep_start = None
+        elif name in key:
+            self.sweep_settings[key[name]] = float(value.rstrip("NMS"))
+        return None
+
+    def start_sweep(self):
+        self.sweep_start = time.perf_counter()
+        self.num_sweeps += 1
+
+
+class SimulatedPowerMeter(SimulatedSession):
+    """
+    Simulated Thorlabs PM100, understanding the commands ThorlabsPM100 sends for
+    READ?, INIT, FETCh? and the average count.
+
+    Args:
+        power: power in W reaching the meter at full transmission
+        transmission: function giving the transmission at a wavelength in nm
+        laser: SimulatedLaser whose emitted wavelength is measured
+        coupling: SimulatedPiezo whose coupling efficiency scales the power
+        sample_time: time in s per averaged sample
+        noise: relative standard deviation of a single sample
+    """
+
+    def __init__(
+        self,
+        resource_name="USB0::0x1313::0x8078::P0034465::INSTR",
+        power=1e-3,
+        transmission=None,
+        laser=None,
+        coupling=None,
+        sample_time=0.003,
+        noise=0,
+        seed=0,
+        **kwargs,
+    ):
+        super().__init__(resource_name, **kwargs)
+        self.power = power
+        self.transmission = transmission
+        self.laser = laser
+        self.coupling = coupling
+        self.sample_time = sample_time
+        self.noise = noise
+        self.rng = np.random.default_rng(seed)
+        self.averages = 1
+        self.measurement_start = None
+        self.measurement = None
+        self.num_measurements = 0
+        # Measurements during which the laser wavelength was written, or the
+        # laser was still tuning
+        self.num_disturbed = 0
+
+    def measured_power(self):
+        power = self.power
+        if self.laser is not None and self.transmission is not None:
+            power = power * self.transmission(self.laser.emitted_wavelength())
+        if self.coupling is not None:
+            power = power * self.coupling.efficiency()
+        noise = self.rng.normal(0, self.noise / np.sqrt(self.averages))
+        return power * (1 + noise)
+
+    def finish_measurement(self):
+        end = self.measurement_start + self.averages * self.sample_time
+        delay = end - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        if self.laser is not None and any(
+            self.measurement_start < t + self.laser.tuning_time and t < end
+            for t, _ in self.laser.wavelength_log[-2:]
+        ):
+            self.num_disturbed += 1
+        self.num_measurements += 1
+        return repr(float(self.measurement))
+
+    def start_measurement(self):
+        self.measurement_start = time.perf_counter()
+        # The wavelength is constant during the measurement, see num_disturbed
+        self.measurement = self.measured_power()
+
+    def respond(self, message):
+        command, _, value = message.upper().partition(" ")
+        if command == "SENSE:AVERAGE:COUNT":
+            self.averages = int(value)
+        elif command == "SENSE:AVERAGE:COUNT?":
+            return str(self.averages)
+        elif command == "INITIATE:IMMEDIATE":
+            self.start_measurement()
+        elif command == "FETCH?":
+            return self.finish_measurement()
+        elif command == "READ?":
+            self.start_measurement()
+            return self.finish_measurement()
+        return None
+
+
+class SimulatedEDFA(SimulatedSession):
+    """
+    Simulated EDFA answering CPU? with its output power, which approaches the
+    CPU= setpoint exponentially.
+
+    Args:
+        power: initial power in dBm
+        time_constant: in s, of the approach to a new setpoint
+    """
+
+    def __init__(
+        self, resource_name="GPIB0::5::INSTR", power=10, time_constant=0.1, **kwargs
+    ):
+        super().__init__(resource_name, **kwargs)
+        self.setpoint = power
+        self.start_power = power
+        self.set_time = time.perf_counter()
+        self.time_constant = time_constant
+
+    def output_power(self):
+        elapsed = time.perf_counter() - self.set_time
+        decay = np.exp(-elapsed / self.time_constant)
+        return self.setpoint + (self.start_power - self.setpoint) * decay
+
+    def respond(self, message):
+        if message.startswith("CPU="):
+            self.start_power = self.output_power()
+            self.setpoint = int(message[4:]) / 10
+            self.set_time = time.perf_counter()
+        elif message == "CPU?":
+            return f"CPU={round(10 * self.output_power()):d}"
+        return None
+
+
+class SimulatedSignalGenerator(SimulatedSession):
+    """
+    Simulated SRS DG535 delay generator, answering IS 4 with the state of the
+    RATE LED, which blinks with the given period and duty cycle.
+
+    Args:
+        rate_duty_cycle: fraction of the time the RATE LED is on
+        blink_period: in s
+    """
+
+    def __init__(
+        self,
+        resource_name="GPIB0::15::INSTR",
+        rate_duty_cycle=0,
+        blink_period=0.1,
+        **kwargs,
+    ):
+        super().__init__(resource_name, **kwargs)
+        self.rate_duty_cycle = rate_duty_cycle
+        self.blink_period = blink_period
+        self.t0 = time.perf_counter()
+
+    def respond(self, message):
+        if message == "IS 4":
+            phase = (time.perf_counter() - self.t0) / self.blink_period % 1
+            return "1" if phase < self.rate_duty_cycle else "0"
+        return None
+
+
+class SimulatedOscilloscope(SimulatedSession):
+    """
+    Simulated Tektronix oscilloscope, returning a noisy sine on every channel.
+    CURVe? replies with int16 binary blocks, or with text in ASCII encoding.
+
+    Args:
+        num_points: record length
+        x_increment: sample interval in s
+        y_increment: volts per digitizer level
+        seed: seed for the noise on the waveforms
+    """
+
+    termination = b"\n"
+
+    def __init__(
+        self,
+        resource_name="GPIB0::7::INSTR",
+        num_points=10000,
+        x_increment=1e-9,
+        y_increment=1e-4,
+        seed=0,
+        **kwargs,
+    ):
+        super().__init__(resource_name, **kwargs)
+        self.num_points = num_points
+        self.x_increment = x_increment
+        self.y_increment = y_increment
+        self.rng = np.random.default_rng(seed)
+        self.source = 1
+        self.sources = [1]
+        self.encoding = "SRIBINARY"
+        self.num_acquisitions = 0
+        self.vertical_scale = {}
+        self._position = 0
+
+    def write(self, message):
+        super().write(message)
+        # Position in the reply of the next read
+        self._position = 0
+
+    def read_raw(self):
+        # Like a VISA read with a termination character, a read stops after the
+        # first termination byte, also if it is part of the binary data
+        if self.read_termination:
+            terminator = self.read_termination.encode("ascii")
+            index = self._reply.find(terminator, self._position)
+            if 0 <= index < len(self._reply) - 1:
+                chunk = self._reply[self._position : index + 1]
+                self._position = index + 1
+                self.num_reads += 1
+                self.bytes_read += len(chunk)
+                return chunk
+            self._reply = self._reply[self._position :]
+            self._position = 0
+        return super().read_raw()
+
+    def samples(self, channel):
+        """Returns the digitizer levels of a channel as int16."""
+        phase = 2 * np.pi * np.arange(self.num_points) / 1000 + channel
+        levels = 10000 * np.sin(phase) + self.rng.normal(0, 50, self.num_points)
+        return levels.astype(np.int16)
+
+    def respond(self, message):
+        command = message.upper()
+        if command.startswith(":DATA:SOURCE "):
+            sources = [int(source[2:]) for source in command[13:].split(",")]
+            self.source = sources[0]
+            self.sources = sources
+        elif command.startswith(":DATA:ENCDG "):
+            self.encoding = command[12:]
+        elif command.startswith(":ACQUIRE:STATE 1"):
+            self.num_acquisitions += 1
+        elif command == "*OPC?":
+            return "1"
+        elif command.startswith(":CH") and ":SCALE " in command:
+            channel, scale = command[3:].split(":SCALE ")
+            self.vertical_scale[int(channel)] = float(scale)
+        elif command.startswith(":HORIZONTAL:SCALE "):
+            self.x_increment = float(command[18:]) * 10 / self.num_points
+        elif command.startswith(":HORIZONTAL:RECORDLENGTH "):
+            self.num_points = int(command[25:])
+        elif command == "CURVE?":
+            if self.encoding.startswith("ASC"):
+                return ";".join(
+                    ",".join(str(level) for level in self.samples(source))
+                    for source in self.sources
+                )
+            # One block per source, separated by ;
+            dtype = "<i2" if self.encoding == "SRIBINARY" else ">i2"
+            blocks = []
+            for source in self.sources:
+                data = self.samples(source).astype(dtype).tobytes()
+                length = str(len(data)).encode("ascii")
+                blocks.append(b"#" + str(len(length)).encode("ascii") + length + data)
+            return b";".join(blocks)
+        elif command == "WFMOUTPRE?":
+            byte_order = "LSB" if self.encoding == "SRIBINARY" else "MSB"
+            return ";".join(
+                [
+                    "2",
+                    "16",
+                    "ASC" if self.encoding.startswith("ASC") else "BIN",
+                    "RI",
+                    byte_order,
+                    f'"Ch{self.source}, DC coupling"',
+                    str(self.num_points),
+                    "Y",
+                    '"s"',
+                    f"{self.x_increment:.6E}",
+                    "0.0E+0",
+                    "0",
+                    '"V"',
+                    f"{self.y_increment * self.vertical_scale.get(self.source, 1):.6E}",
+                    "0.0E+0",
+                    "0.0E+0",
+                ]
+            )
+        return None
+
+
+class SimulatedPiezo:
+    """
+    Simulated piezo controller on a serial port, with the pyserial methods piezo
+    uses. Messages are a dimension (X, Y, Z), a stage number (1, 2) and the
+    duty cycle * 255, e.g. b"X1128". The fiber coupling efficiency is a Gaussian
+    of the distance of the six duty cycles from an optimum.
+
+    Args:
+        optimum: duty cycles of stage 1 X, Y, Z and stage 2 X, Y, Z with the
+            highest coupling
+        widths: duty cycle change reducing the coupling to 1/e, per axis
+        write_time: time in s a write takes
+    """
+
+    message_pattern = re.compile(rb"([XYZ])([12])(\d+)")
+
+    def __init__(
+        self,
+        optimum=(0.55, 0.45, 0.5, 0.5, 0.6, 0.4),
+        widths=(0.08, 0.08, 0.3, 0.08, 0.08, 0.3),
+        write_time=0,
+    ):
+        self.optimum = np.asarray(optimum, dtype=float)
+        self.widths = np.asarray(widths, dtype=float)
+        self.write_time = write_time
+        self.duty = np.zeros(6)
+        self.is_open = False
+        self.num_writes = 0
+        self.num_messages = 0
+        self.stream = b""
+
+    def open(self):
+        self.is_open = True
+
+    def close(self):
+        self.is_open = False
+
+    def write(self, data):
+        self.num_writes += 1
+        self.stream += data
+        if self.write_time:
+            time.sleep(self.write_time)
+        for dim, stage_no, value in self.message_pattern.findall(data):
+            axis = 3 * (int(stage_no) - 1) + "XYZ".index(dim.decode())
+            self.duty[axis] = int(value) / 255
+            self.num_messages += 1
+        return len(data)
+
+    def inWaiting(self):
+        return 0
+
+    def read(self, size=1):
+        return b""
+
+    def efficiency(self):
+        return np.exp(-np.sum(((self.duty - self.optimum) / self.widths) ** 2))
+
+
+class SimulatedSMC100:
+    """
+    Simulated Newport SMC100 command interface, with the call signatures that
+    CommandInterfaceSMC100.SMC100 has through pythonnet (out parameters are
+    returned). Can be passed to Newport_control.actuator as SMC.
+
+    Args:
+        velocity: in mm/s
+        backlash: in mm, the motor output lags the commanded position by half
+            of it in the direction of the last move
+        wavelength: function giving the Ti:Sapphire wavelength in nm at a motor
+            output position, or None
+        osa: SimulatedOSA showing the Ti:Sapphire line
+        latency: time in s added to every call
+    """
+
+    def __init__(self, velocity=1, backlash=0, wavelength=None, osa=None, latency=0):
+        self.velocity = velocity
+        self.backlash = backlash
+        self.wavelength = wavelength
+        self.osa = osa
+        self.latency = latency
+        self.start_position = 0
+        self.target_position = 0
+        self.move_start = 0
+        self.move_end = 0
+        self.direction = 0
+        self.num_calls = 0
+        self.num_moves = 0
+        self.is_open = False
+
+    def position(self):
+        """Commanded position in mm at this moment."""
+        now = time.perf_counter()
+        if now >= self.move_end:
+            return self.target_position
+        fraction = (now - self.move_start) / (self.move_end - self.move_start)
+        return self.start_position + fraction * (
+            self.target_position - self.start_position
+        )
+
+    def output_position(self):
+        return self.position() - self.direction * self.backlash / 2
+
+    def emitted_wavelength(self):
+        return self.wavelength(self.output_position())
+
+    def _call(self):
+        self.num_calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _move_to(self, position):
+        self.start_position = self.position()
+        self.target_position = position
+        if position != self.start_position:
+            self.direction = 1 if position > self.start_position else -1
+        self.move_start = time.perf_counter()
+        duration = abs(position - self.start_position) / self.velocity
+        self.move_end = self.move_start + duration
+        self.num_moves += 1
+        if self.osa is not None and self.wavelength is not None:
+            # The line is shown at its final wavelength, sweeps are done after moves
+            self.osa.peak_wavelength = self.wavelength(
+                position - self.direction * self.backlash / 2
+            )
+
+    def OpenInstrument(self, instrument):
+        self._call()
+        self.is_open = True
+        return 0
+
+    def CloseInstrument(self):
+        self._call()
+        self.is_open = False
+        return 0
+
+    def OR(self, address, errString):
+        self._call()
+        self._move_to(0)
+        return 0, ""
+
+    def SR_Set(self, address, limit, errString):
+        self._call()
+        return 0, ""
+
+    def SL_Set(self, address, limit, errString):
+        self._call()
+        return 0, ""
+
+    def PR_Set(self, address, distance, errString):
+        self._call()
+        self._move_to(self.position() + distance)
+        return 0, ""
+
+    def PA_Set(self, address, position, errString):
+        self._call()
+        self._move_to(position)
+        return 0, ""
+
+    def TS(self, address, errorCode, status, errString):
+        self._call()
+        moving = time.perf_counter() < self.move_end
+        # 28 is MOVING, 33 is READY from REFERENCED
+        return 0, "", "28" if moving else "33", ""
+
+    def TP(self, address, position, errString):
+        self._call()
+        return 0, self.position(), ""
+
+
+class SimulatedKinesisMotor:
+    """
+    Simulated Thorlabs Kinesis stage of the thorlabs laser, with the pylablib
+    KinesisMotor methods laser uses. Can be passed to laser as motor.
+
+    Args:
+        velocity: in steps/s
+        wavelength: function giving the emitted wavelength in nm at a position,
+            None to invert the thorlabs calibration table
+        osa: SimulatedOSA showing the laser line
+        latency: time in s added to every call
+    """
+
+    def __init__(self, velocity=200000, wavelength=None, osa=None, latency=0):
+        if wavelength is None:
+            path = os.path.join(calibration_folder, "thorlabs.csv")
+            table = np.loadtxt(path, delimiter=",", ndmin=2)
+            order = np.argsort(table[:, 1])
+            positions, wavelengths = table[order, 1], table[order, 0]
+
+            def wavelength(position):
+                return np.interp(position, positions, wavelengths)
+
+        self.velocity = velocity
+        self.wavelength = wavelength
+        self.osa = osa
+        self.latency = latency
+        self.start_position = 0
+        self.target_position = 0
+        self.move_start = 0
+        self.move_end = 0
+        self.num_calls = 0
+        self.num_moves = 0
+
+    def _call(self):
+        self.num_calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def get_position(self):
+        self._call()
+        now = time.perf_counter()
+        if now >= self.move_end:
+            return self.target_position
+        fraction = (now - self.move_start) / (self.move_end - self.move_start)
+        return round(
+            self.start_position
+            + fraction * (self.target_position - self.start_position)
+        )
+
+    def emitted_wavelength(self):
+        return self.wavelength(self.target_position)
+
+    def is_moving(self):
+        self._call()
+        return time.perf_counter() < self.move_end
+
+    def move_to(self, position):
+        self.start_position = self.get_position()
+        self.target_position = int(position)
+        self.move_start = time.perf_counter()
+        duration = abs(self.target_position - self.start_position) / self.velocity
+        self.move_end = self.move_start + duration
+        self.num_moves += 1
+        if self.osa is not None:
+            self.osa.peak_wavelength = self.emitted_wavelength()
+
+    def home(self):
+        self.move_to(0)
+
+    def wait_move(self):
+        self._call()
+        delay = self.move_end - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    wait_for_home = wait_move
+
+    def stop(self):
+        self.target_position = self.get_position()
+        self.move_end = 0
+
+    def close(self):
+        self._call()
+
+
+class SimulatedResourceManager:
+    """
+    Stand-in for pyvisa.ResourceManager that hands out registered simulated sessions.
+
+    Args:
+        open_latency: time in s it takes to open a session
+    """
+
+    def __init__(self, open_latency=0):
+        self.sessions = {}
+        self.open_latency = open_latency
+        self.num_opens = 0
+
+    def register(self, session):
+        self.sessions[session.resource_name] = session
+        return session
+
+    def list_resources(self, query="?*::INSTR"):
+        return tuple(self.sessions)
+
+    def open_resource(self, resource_name, **kwargs):
+        self.num_opens += 1
+        if self.open_latency:
+            time.sleep(self.open_latency)
+        session = self.sessions[resource_name]
+        session.closed = False
+        for key, value in kwargs.items():
+            setattr(session, key, value)
+        return session
+
+    def close(self):
+        for session in self.sessions.values():
+            session.close()
+
+
+def _format_trace(values, fmt):
+    # The ANDO sends the number of points first, followed by the data
+    return ",".join([str(len(values))] + [fmt % value for value in values])
+
+
+class SimulatedBench:
+    """
+    One of each simulated instrument at the default addresses of the instrument
+    classes, connected like on the setup: the laser line is shown on the OSA,
+    and the PM measures the laser through transmission.
+
+    Args:
+        latency: time in s added to every write or call of every instrument
+        transmission: function giving the transmission at a wavelength in nm,
+            None for full transmission
+        seed: seed for the noise of the OSA, PM and oscilloscope
+
+    The instruments are attributes, e.g. bench.osa, and can be reconfigured
+    before the instrument classes are constructed. Set
+    bench.power_meter.coupling = bench.piezo to let the piezo duty cycles
+    scale the measured power.
+    """
+
+    def __init__(self, latency=0, transmission=None, seed=0):
+        self.resource_manager = SimulatedResourceManager()
+        register = self.resource_manager.register
+        self.osa = register(SimulatedOSA(latency=latency, seed=seed))
+        self.laser = register(SimulatedLaser(osa=self.osa, latency=latency))
+        self.power_meter = register(
+            SimulatedPowerMeter(
+                transmission=transmission,
+                laser=self.laser,
+                latency=latency,
+                seed=seed,
+            )
+        )
+        self.edfa = register(SimulatedEDFA(latency=latency))
+        self.signal_generator = register(SimulatedSignalGenerator(latency=latency))
+        self.oscilloscope = register(SimulatedOscilloscope(latency=latency, seed=seed))
+        self.piezo = SimulatedPiezo(write_time=latency)
+        self.smc = SimulatedSMC100(latency=latency)
+        self.kinesis = SimulatedKinesisMotor(osa=self.osa, latency=latency)
+
+    def install(self):
+        """Makes visa_pool hand out the simulated sessions. Returns the bench."""
+        visa_pool.set_resource_manager(self.resource_manager)
+        return self
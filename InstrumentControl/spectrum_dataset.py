@@ -0,0 +1,141 @@
+"""
+Lazy reader for scans saved with OSA.save, as a folder of CSV files or as an HDF5
+spectrum store.
+
+The first time a scan is opened, its spectra are converted to a (sweep x
+wavelength) .npy file next to it. After that the scan is opened by memory-mapping
+that file, so opening takes about the same time no matter how many sweeps the scan
+has, and only the sweeps and wavelengths that are used are read from disk. The
+conversion is redone if the source files change.
+"""
+import glob
+import json
+import os
+import re
+import numpy as np
+
+
+class SpectrumDataset:
+    """
+    Args:
+        path: folder with one CSV file per sweep, or an HDF5 file from SpectrumStore
+        pattern: glob pattern of the CSV files in the folder
+        noise_floor: in dBm. If given, powers below it are masked in the arrays
+            returned by sel and indexing.
+
+    Example, plotting sweeps 10-20 between 979 and 981 nm:
+        data = SpectrumDataset("test_data/", noise_floor=-100)
+        wavelengths, powers = data.sel(slice(10, 20), (979, 981))
+        plt.plot(wavelengths, powers.T)
+    """
+
+    def __init__(self, path, pattern="*.csv", noise_floor=None):
+        self.path = path
+        self.noise_floor = noise_floor
+        if os.path.isdir(path):
+            self.sources = sorted(
+                glob.glob(os.path.join(path, pattern)), key=_natural_key
+            )
+            cache_prefix = os.path.join(path, "spectra_cache")
+        else:
+            self.sources = [path]
+            cache_prefix = os.path.splitext(path)[0]
+        self.cache_files = {
+            "powers": cache_prefix + ".powers.npy",
+            "wavelengths": cache_prefix + ".wavelengths.npy",
+            "sources": cache_prefix + ".sources.json",
+        }
+        if not self._cache_is_valid():
+            self._convert()
+        self.wavelengths = np.load(self.cache_files["wavelengths"])
+        self.powers = np.load(self.cache_files["powers"], mmap_mode="r")
+
+    @property
+    def shape(self):
+        return self.powers.shape
+
+    def __len__(self):
+        return self.powers.shape[0]
+
+    def __getitem__(self, sweeps):
+        return self._mask(self.powers[sweeps])
+
+    def sel(self, sweeps=slice(None), wavelength_range=None):
+        """
+        Selects sweeps and a wavelength range without copying the data.
+        Args:
+            sweeps: index, slice or list of sweep indices
+            wavelength_range: (start, end) in nm, None for all wavelengths
+        Returns:
+            wavelengths, powers
+        """
+        if wavelength_range is None:
+            columns = slice(None)
+        else:
+            start = np.searchsorted(self.wavelengths, wavelength_range[0])
+            end = np.searchsorted(self.wavelengths, wavelength_range[1], side="right")
+            columns = slice(start, end)
+        return self.wavelengths[columns], self._mask(self.powers[sweeps, columns])
+
+    def _mask(self, powers):
+        if self.noise_floor is None:
+            return powers
+        # copy=False keeps the data a view of the memory map, only the mask is new
+        return np.ma.masked_where(powers < self.noise_floor, powers, copy=False)
+
+    def _source_info(self):
+        return [
+            [source, os.path.getmtime(source), os.path.getsize(source)]
+            for source in self.sources
+        ]
+
+    def _cache_is_valid(self):
+        if not all(os.path.exists(file) for file in self.cache_files.values()):
+            return False
+        with open(self.cache_files["sources"]) as file:
+            return json.load(file) == self._source_info()
+
+    def _convert(self):
+        if not self.sources:
+            raise FileNotFoundError(f"No spectra found in {self.path}")
+        if os.path.splitext(self.sources[0])[1] in (".h5", ".hdf5"):
+            from .spectrum_store import SpectrumStore
+
+            with SpectrumStore(self.sources[0], mode="r") as store:
+                wavelengths = store.wavelengths[:]
+                powers = np.lib.format.open_memmap(
+                    self.cache_files["powers"], mode="w+", shape=store.powers.shape
+                )
+                store.powers.read_direct(powers)
+        else:
+            first = np.loadtxt(self.sources[0], delimiter=",")
+            wavelengths = first[:, 0]
+            powers = np.lib.format.open_memmap(
+                self.cache_files["powers"],
+                mode="w+",
+                shape=(len(self.sources), len(wavelengths)),
+            )
+            powers[0] = first[:, 1]
+            for i, source in enumerate(self.sources[1:], start=1):
+                data = np.loadtxt(source, delimiter=",")
+                if len(data) != len(wavelengths):
+                    raise ValueError(
+                        f"{source} has {len(data)} points, "
+                        f"but {self.sources[0]} has {len(wavelengths)}"
+                    )
+                # The files are written with 6 decimals, see OSA.save
+                if not np.allclose(data[:, 0], wavelengths, rtol=0, atol=1e-6):
+                    raise ValueError(
+                        f"{source} has other wavelengths than {self.sources[0]}"
+                    )
+                powers[i] = data[:, 1]
+        powers.flush()
+        del powers
+        np.save(self.cache_files["wavelengths"], wavelengths)
+        with open(self.cache_files["sources"], "w") as file:
+            json.dump(self._source_info(), file)
+
+
+def _natural_key(name):
+    # Sorts test_2.csv before test_10.csv
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", name)]
@@ -0,0 +1,143 @@
+"""
+Appendable HDF5 store for OSA spectra, with one file per scan.
+
+The wavelength axis is stored once, the powers of every sweep are appended as a
+row of a chunked (sweep x wavelength) dataset, and the OSA settings of every
+sweep are stored alongside in the settings dataset, with one record per sweep.
+"""
+import os
+import time
+import h5py
+import numpy as np
+
+settings_dtype = np.dtype(
+    [
+        ("timestamp", "f8"),
+        ("wavelength_start", "f8"),
+        ("wavelength_end", "f8"),
+        ("resolution", "f8"),
+        ("sample", "i8"),
+        ("sensitivity", "S4"),
+        ("trace", "S1"),
+    ]
+)
+
+
+class SpectrumStore:
+    """
+    Args:
+        path: file name, .h5 is added if it has no extension
+        mode: 'a' to create or append, 'r' to read only
+        chunk_sweeps: number of sweeps per chunk of the powers dataset
+
+    The datasets are read lazily, e.g. store.powers[10:20] only reads those sweeps
+    from disk.
+    """
+
+    def __init__(self, path, mode="a", chunk_sweeps=64):
+        if os.path.splitext(path)[1] == "":
+            path = path + ".h5"
+        self.path = path
+        self.chunk_sweeps = chunk_sweeps
+        self.file = h5py.File(path, mode)
+        self._wavelengths = None
+
+    @property
+    def wavelengths(self):
+        return self.file["wavelengths"]
+
+    @property
+    def powers(self):
+        return self.file["powers"]
+
+    @property
+    def settings(self):
+        return self.file["settings"]
+
+    def __len__(self):
+        if "powers" not in self.file:
+            return 0
+        return self.file["powers"].shape[0]
+
+    def append(self, wavelengths, powers, **settings):
+        """
+        Appends one sweep.
+        Args:
+            wavelengths: wavelength axis, must be the same for every sweep in the store
+            powers: powers of the sweep
+            settings: OSA settings of the sweep, see settings_dtype
+        """
+        powers = np.asarray(powers, dtype=float)
+        if "powers" not in self.file:
+            self.file.create_dataset("wavelengths", data=np.asarray(wavelengths))
+            self.file.create_dataset(
+                "powers",
+                shape=(0, len(powers)),
+                maxshape=(None, len(powers)),
+                chunks=(self.chunk_sweeps, len(powers)),
+                dtype="f8",
+            )
+            self.file.create_dataset(
+                "settings",
+                shape=(0,),
+                maxshape=(None,),
+                chunks=(self.chunk_sweeps,),
+                dtype=settings_dtype,
+            )
+        if self._wavelengths is None:
+            self._wavelengths = self.wavelengths[:]
+        # Absolute tolerance in nm, well below the sample spacing of any sweep
+        if len(wavelengths) != len(self._wavelengths) or not np.allclose(
+            wavelengths, self._wavelengths, rtol=0, atol=1e-6
+        ):
+            raise ValueError(
+                "The wavelength axis differs from the one in the store, "
+                "spectra with a different span must go in a new store."
+            )
+        index = len(self)
+        self.powers.resize(index + 1, axis=0)
+        self.powers[index] = powers
+        settings.setdefault("timestamp", time.time())
+        record = np.zeros((), dtype=settings_dtype)
+        for key, value in settings.items():
+            if value is not None:
+                record[key] = value
+        self.settings.resize(index + 1, axis=0)
+        self.settings[index] = record
+
+    def append_osa(self, osa):
+        """Appends the last sweep of an OSA together with its settings."""
+        self.append(
+            osa.wavelengths,
+            osa.powers,
+            wavelength_start=osa.wavelength_start,
+            wavelength_end=osa.wavelength_end,
+            resolution=osa.resolution,
+            sample=osa.sample,
+            sensitivity=osa.sensitiviy,
+            trace=osa.trace,
+        )
+
+    def sink(self, name="osa"):
+        """
+        Returns a sink for scan.Scan appending the (wavelengths, powers) of the
+        detector called name.
+        """
+
+        def append_point(point):
+            wavelengths, powers = point.data[name]
+            self.append(wavelengths, powers)
+
+        return append_point
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
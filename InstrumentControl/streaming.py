@@ -0,0 +1,180 @@
+"""
+Continuous power meter readout in a background thread.
+
+PowerStream reads a PM as fast as it answers (or at a fixed interval) into a
+preallocated ring buffer of timestamps and powers, so monitoring is limited by
+the meter's averaging and the bus round trip instead of the 0.1 s sleep of
+PM.read. The buffer can be read while the stream runs:
+
+    with PowerStream(pm, capacity=100000) as stream:
+        time.sleep(10)
+        times, watts = stream.latest(1000)
+        times, watts = stream.averaged(0.1)  # mean over 0.1 s bins
+
+and every reading can be handled as it arrives with a callback, or by iterating
+over the stream.
+"""
+import threading
+import time
+import numpy as np
+
+
+class PowerStream:
+    """
+    Args:
+        power_meter: instrument_class.PM
+        capacity: number of readings kept in the buffer
+        interval: time in s between readings, 0 to read as fast as possible
+        callback: function called with (timestamp, watts) of every reading, from
+            the stream thread, so it should return quickly
+        start: if True, the stream is started right away
+
+    Timestamps are time.perf_counter() at the end of each reading, and the
+    powers are in W.
+    """
+
+    def __init__(
+        self, power_meter, capacity=100000, interval=0, callback=None, start=True
+    ):
+        self.power_meter = power_meter
+        self.capacity = capacity
+        self.interval = interval
+        self.callback = callback
+        self.times = np.empty(capacity)
+        self.watts = np.empty(capacity)
+        # Total number of readings, the latest is at (count - 1) % capacity
+        self.count = 0
+        self.error = None
+        self._new_reading = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        if start:
+            self.start()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="PowerStream", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        next_reading = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                if self.interval:
+                    delay = next_reading - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    next_reading += self.interval
+                watts = self.power_meter.measure()
+                timestamp = time.perf_counter()
+                with self._new_reading:
+                    index = self.count % self.capacity
+                    self.times[index] = timestamp
+                    self.watts[index] = watts
+                    self.count += 1
+                    self._new_reading.notify_all()
+                if self.callback is not None:
+                    self.callback(timestamp, watts)
+        except Exception as error:
+            # Kept so the stream can be stopped and the error inspected
+            self.error = error
+            print("Warning! Power meter stream stopped:", error)
+        finally:
+            with self._new_reading:
+                self._new_reading.notify_all()
+
+    def latest(self, n=None):
+        """
+        Returns copies of the timestamps and powers of the last n readings in
+        order, or of all readings in the buffer if n is None.
+        """
+        with self._new_reading:
+            available = min(self.count, self.capacity)
+            n = available if n is None else min(n, available)
+            indices = np.arange(self.count - n, self.count) % self.capacity
+            return self.times[indices], self.watts[indices]
+
+    def decimated(self, factor, n=None):
+        """
+        Like latest, but every factor consecutive readings are averaged into one.
+        Readings that do not fill a block of factor are left out.
+        """
+        times, watts = self.latest(n)
+        num_blocks = len(times) // factor
+        start = len(times) - num_blocks * factor
+        times = times[start:].reshape(num_blocks, factor).mean(axis=1)
+        watts = watts[start:].reshape(num_blocks, factor).mean(axis=1)
+        return times, watts
+
+    def averaged(self, period, n=None):
+        """
+        Averages the readings over consecutive periods of period s, starting from
+        the oldest reading. Returns the center time, mean power and number of
+        readings of every period that has readings.
+        """
+        times, watts = self.latest(n)
+        if len(times) == 0:
+            return times, watts, np.zeros(0, dtype=int)
+        bins = ((times - times[0]) // period).astype(int)
+        counts = np.bincount(bins)
+        sums = np.bincount(bins, weights=watts)
+        has_readings = counts > 0
+        centers = times[0] + (np.arange(len(counts)) + 0.5) * period
+        return (
+            centers[has_readings],
+            sums[has_readings] / counts[has_readings],
+            counts[has_readings],
+        )
+
+    def rate(self, n=None):
+        """Readings per second over the last n readings."""
+        times = self.latest(n)[0]
+        if len(times) < 2:
+            return 0
+        return (len(times) - 1) / (times[-1] - times[0])
+
+    def jitter(self, n=None):
+        """Standard deviation in s of the time between the last n readings."""
+        times = self.latest(n)[0]
+        if len(times) < 3:
+            return 0
+        return np.std(np.diff(times))
+
+    def __iter__(self):
+        """
+        Yields (timestamp, watts) of every new reading until the stream is
+        stopped. Readings overwritten before they were yielded are skipped.
+        """
+        position = self.count
+        while True:
+            with self._new_reading:
+                while position == self.count and self.running:
+                    self._new_reading.wait()
+                if position == self.count:
+                    return
+                if self.count - position > self.capacity:
+                    print("Warning! Stream iteration fell behind, readings skipped.")
+                    position = self.count - self.capacity
+                index = position % self.capacity
+                reading = self.times[index], self.watts[index]
+            position += 1
+            yield reading
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
@@ -0,0 +1,306 @@
+"""
+Opt-in tracing of instrument I/O and sleeps.
+
+When tracing is enabled, every session handed out by visa_pool, the SMC100 of
+the Newport actuator, the piezo serial port and the Thorlabs motor are wrapped
+in a proxy that records each call. The instrument modules sleep with
+tracing.sleep, which records the sleep and the function that slept. Records go
+into a preallocated ring buffer, with the command strings stored once in a
+table, so tracing adds a few microseconds per call.
+
+    tracer = tracing.enable()
+    laser = laser("ando", 1550)  # instruments must be created after enable
+    with tracer.step("alignment"):
+        laser.adjust_wavelength()
+    tracer.print_summary()
+    tracer.save_folded("scan.folded")  # for flamegraph.pl or speedscope
+    tracing.disable()
+
+Numbers in commands are replaced by #, so e.g. every TWL1550.12 is counted as
+TWL#.
+"""
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+
+kinds = ("write", "read", "query", "call", "sleep")
+_number = re.compile(r"[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?")
+_active = None
+
+
+class Tracer:
+    """
+    Ring buffer of traced calls.
+
+    Args:
+        capacity: number of records kept, older records are overwritten
+    """
+
+    def __init__(self, capacity=100000):
+        self.capacity = capacity
+        self.start = np.zeros(capacity)
+        self.duration = np.zeros(capacity)
+        self.kind = np.zeros(capacity, dtype=np.int8)
+        self.target = np.zeros(capacity, dtype=np.int32)
+        self.command = np.zeros(capacity, dtype=np.int32)
+        self.nbytes = np.zeros(capacity, dtype=np.int64)
+        self.step_id = np.zeros(capacity, dtype=np.int32)
+        # Total number of records, the latest is at (count - 1) % capacity
+        self.count = 0
+        self.strings = []
+        self._string_ids = {}
+        self._steps = []
+        self._step = self._intern("")
+        self._lock = threading.Lock()
+
+    def _intern(self, string):
+        string_id = self._string_ids.get(string)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.strings.append(string)
+            self._string_ids[string] = string_id
+        return string_id
+
+    @contextmanager
+    def step(self, name):
+        """Records the calls made inside the with block under step name."""
+        previous = self._step
+        self._steps.append(name)
+        self._step = self._intern(";".join(self._steps))
+        try:
+            yield self
+        finally:
+            self._steps.pop()
+            self._step = previous
+
+    def record(self, kind, target, command, start, duration, nbytes=0):
+        with self._lock:
+            i = self.count % self.capacity
+            self.start[i] = start
+            self.duration[i] = duration
+            self.kind[i] = kind
+            self.target[i] = self._intern(target)
+            self.command[i] = self._intern(command)
+            self.nbytes[i] = nbytes
+            self.step_id[i] = self._step
+            self.count += 1
+
+    def clear(self):
+        with self._lock:
+            self.count = 0
+
+    def records(self):
+        """Returns the records in the buffer as a dict of arrays, oldest first."""
+        with self._lock:
+            n = min(self.count, self.capacity)
+            indices = np.arange(self.count - n, self.count) % self.capacity
+            strings = np.array(self.strings, dtype=object)
+            return {
+                "start": self.start[indices],
+                "duration": self.duration[indices],
+                "kind": np.array(kinds, dtype=object)[self.kind[indices]],
+                "target": strings[self.target[indices]],
+                "command": strings[self.command[indices]],
+                "bytes": self.nbytes[indices],
+                "step": strings[self.step_id[indices]],
+            }
+
+    def summary(self):
+        """
+        Returns a list of (step, target, command, kind, count, total time in s,
+        bytes), sorted by total time.
+        """
+        with self._lock:
+            n = min(self.count, self.capacity)
+            indices = np.arange(self.count - n, self.count) % self.capacity
+            keys = np.stack(
+                (
+                    self.step_id[indices],
+                    self.target[indices],
+                    self.command[indices],
+                    self.kind[indices],
+                ),
+                axis=1,
+            )
+            durations = self.duration[indices]
+            nbytes = self.nbytes[indices]
+            strings = list(self.strings)
+        if n == 0:
+            return []
+        unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        counts = np.bincount(inverse)
+        times = np.bincount(inverse, weights=durations)
+        total_bytes = np.bincount(inverse, weights=nbytes)
+        rows = [
+            (
+                strings[step],
+                strings[target],
+                strings[command],
+                kinds[kind],
+                int(counts[i]),
+                times[i],
+                int(total_bytes[i]),
+            )
+            for i, (step, target, command, kind) in enumerate(unique)
+        ]
+        rows.sort(key=lambda row: row[5], reverse=True)
+        return rows
+
+    def print_summary(self, limit=30):
+        """Prints the total time per step, and the calls that took the most time."""
+        rows = self.summary()
+        step_times = {}
+        for row in rows:
+            step_times[row[0]] = step_times.get(row[0], 0) + row[5]
+        print(f"{'step':<30} {'time (s)':>10}")
+        for step, total in sorted(step_times.items(), key=lambda item: -item[1]):
+            print(f"{step or '-':<30} {total:10.3f}")
+        print()
+        print(
+            f"{'step':<20} {'target':<24} {'command':<16} {'kind':<6} "
+            f"{'count':>7} {'time (s)':>9} {'bytes':>10}"
+        )
+        for step, target, command, kind, count, total, nbytes in rows[:limit]:
+            print(
+                f"{step or '-':<20.20} {target:<24.24} {command:<16.16} {kind:<6} "
+                f"{count:7d} {total:9.3f} {nbytes:10d}"
+            )
+
+    def folded(self):
+        """
+        Returns the summary as folded stacks, one 'step;target;command value'
+        line per call type with the total time in microseconds, the input format
+        of flamegraph.pl and speedscope.
+        """
+        lines = []
+        for step, target, command, kind, count, total, nbytes in self.summary():
+            frames = step.split(";") if step else []
+            frames += [target, command]
+            lines.append(";".join(frames) + f" {int(round(total * 1e6))}")
+        return "\n".join(lines)
+
+    def save_folded(self, path):
+        with open(path, "w") as file:
+            file.write(self.folded() + "\n")
+
+
+class TracedProxy:
+    """
+    Forwards all attribute access to obj, and records the calls of its methods
+    in tracer. write/query/read calls are recorded with their command and bytes,
+    other methods with their name. The bytes of query_ascii_values and
+    query_binary_values replies are the size of the returned values, as the
+    text of the reply is not seen by the proxy.
+    """
+
+    def __init__(self, obj, tracer, name):
+        object.__setattr__(self, "wrapped", obj)
+        object.__setattr__(self, "_tracer", tracer)
+        object.__setattr__(self, "_name", name)
+
+    def __getattr__(self, attr):
+        value = getattr(self.wrapped, attr)
+        if not callable(value):
+            return value
+        tracer = self._tracer
+        name = self._name
+
+        def traced(*args, **kwargs):
+            start = time.perf_counter()
+            result = value(*args, **kwargs)
+            duration = time.perf_counter() - start
+            message = args[0] if args and isinstance(args[0], (str, bytes)) else None
+            if attr in ("write", "query") and message is not None:
+                if isinstance(message, bytes):
+                    message = message.decode("ascii", "replace")
+                nbytes = len(message)
+                if isinstance(result, (str, bytes)):
+                    nbytes += len(result)
+                kind = 0 if attr == "write" else 2
+                command = _number.sub("#", message.strip())[:32]
+            elif attr.startswith("query") and message is not None:
+                nbytes = len(message) + _size(result)
+                kind = 2
+                command = _number.sub("#", message.strip())[:32]
+            elif attr.startswith("read") and isinstance(result, (str, bytes)):
+                nbytes = len(result)
+                kind = 1
+                command = attr
+            else:
+                nbytes = 0
+                kind = 3
+                command = attr
+            tracer.record(kind, name, command, start, duration, nbytes)
+            return result
+
+        return traced
+
+    def __setattr__(self, attr, value):
+        setattr(self.wrapped, attr, value)
+
+
+def enable(capacity=100000, tracer=None):
+    """
+    Starts tracing the instruments created from now on. Returns the Tracer.
+    """
+    global _active
+    if tracer is None:
+        tracer = Tracer(capacity)
+    _active = tracer
+    return tracer
+
+
+def disable():
+    """
+    Stops tracing. Instruments created while tracing keep their proxies, which
+    keep recording into the tracer.
+    """
+    global _active
+    _active = None
+
+
+def sleep(seconds):
+    """time.sleep, recorded with the name of the calling function if tracing is on."""
+    tracer = _active
+    if tracer is None:
+        time.sleep(seconds)
+        return
+    caller = sys._getframe(1).f_code.co_name
+    start = time.perf_counter()
+    time.sleep(seconds)
+    tracer.record(4, "sleep", caller, start, time.perf_counter() - start)
+
+
+def active():
+    """Returns the Tracer in use, or None if tracing is off."""
+    return _active
+
+
+def wrap(obj, name):
+    """Returns obj wrapped in a TracedProxy if tracing is on, otherwise obj."""
+    if _active is None or isinstance(obj, TracedProxy):
+        return obj
+    return TracedProxy(obj, _active, name)
+
+
+def unwrap(obj):
+    """Returns the object inside a TracedProxy, or obj itself."""
+    if isinstance(obj, TracedProxy):
+        return obj.wrapped
+    return obj
+
+
+def _size(values):
+    # Size in bytes of the values returned by a query
+    if isinstance(values, (str, bytes)):
+        return len(values)
+    if isinstance(values, np.ndarray):
+        return values.nbytes
+    try:
+        return len(values) * 8
+    except TypeError:
+        return 0
@@ -0,0 +1,55 @@
+"""
+Transmission spectra measured by stepping a tunable laser and reading a PM.
+
+The laser setpoints are planned in one call before the scan, every point is one
+laser write and one READ? round trip without the fixed sleep of PM.read, and the
+readings are kept in W and converted to dBm once at the end.
+"""
+import time
+from collections import namedtuple
+import numpy as np
+from . import tracing
+
+TransmissionSpectrum = namedtuple(
+    "TransmissionSpectrum",
+    ["wavelengths", "watts", "dBm", "timestamps", "points_per_second"],
+)
+
+
+def transmission_spectrum(
+    tunable_laser, power_meter, wavelengths, settle_time=None, averages=None
+):
+    """
+    Measures the power at every wavelength.
+    Args:
+        tunable_laser: laser_control.laser
+        power_meter: instrument_class.PM
+        wavelengths: in nm
+        settle_time: time in s to wait after setting the wavelength, None to
+            wait until the laser reports that it has tuned, see
+            laser.wait_for_tuning
+        averages: number of samples the meter averages per point, None to keep
+            its setting
+    Returns:
+        TransmissionSpectrum with the powers in W and dBm, the time.perf_counter()
+        each reading was started, and the measured points per second
+    """
+    wavelengths = np.asarray(wavelengths, dtype=float)
+    arguments = tunable_laser.plan_wavelengths(wavelengths)
+    if averages is not None:
+        power_meter.set_averages(averages)
+    watts = np.empty(len(wavelengths))
+    timestamps = np.empty(len(wavelengths))
+    t0 = time.perf_counter()
+    for i, wavelength in enumerate(wavelengths):
+        tunable_laser.set_wavelength(wavelength, arguments[i])
+        if settle_time is None:
+            tunable_laser.wait_for_tuning()
+        elif settle_time:
+            tracing.sleep(settle_time)
+        timestamps[i] = time.perf_counter()
+        watts[i] = power_meter.measure()
+    points_per_second = len(wavelengths) / (time.perf_counter() - t0)
+    return TransmissionSpectrum(
+        wavelengths, watts, power_meter.to_dBm(watts), timestamps, points_per_second
+    )
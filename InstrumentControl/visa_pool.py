@@ -0,0 +1,121 @@
+"""
+Process-wide VISA resource manager and session pool shared by all instrument classes.
+
+Opening a GPIB session is slow compared to a single write, so sessions are kept
+open and handed back when the same resource string is opened again. Every
+open_resource counts as a holder of the session, and close_resource only closes
+it when the last holder releases it. Instrument objects can also be cached with
+shared_instrument, so scan loops can reuse a configured instrument instead of
+constructing a new one on every step.
+"""
+import threading
+import pyvisa as visa
+from . import tracing
+
+_lock = threading.RLock()
+_resource_manager = None
+_sessions = {}
+# Number of holders of each pooled session, by resource name
+_holders = {}
+_instruments = {}
+num_opens = 0
+
+
+def get_resource_manager(visa_library=""):
+    """
+    Returns the shared ResourceManager, creating it on first use.
+    Args:
+        visa_library: path to the VISA library, only used when the manager is created
+    """
+    global _resource_manager
+    with _lock:
+        if _resource_manager is None:
+            _resource_manager = visa.ResourceManager(visa_library)
+        return _resource_manager
+
+
+def set_resource_manager(resource_manager):
+    """
+    Replaces the shared ResourceManager, e.g. with a simulated one.
+    All pooled sessions and cached instruments are dropped.
+    """
+    global _resource_manager
+    with _lock:
+        close_all()
+        _resource_manager = resource_manager
+
+
+def open_resource(resource_name, **kwargs):
+    """
+    Returns the open session for resource_name, opening it only if it is not in the pool.
+    Keyword arguments are passed to open_resource, or set as attributes on a pooled session.
+    If tracing is enabled the session is returned wrapped in a tracing proxy.
+    """
+    global num_opens
+    with _lock:
+        session = _sessions.get(resource_name)
+        if session is None:
+            session = get_resource_manager().open_resource(resource_name, **kwargs)
+            _sessions[resource_name] = session
+            num_opens += 1
+        else:
+            for key, value in kwargs.items():
+                setattr(session, key, value)
+        _holders[resource_name] = _holders.get(resource_name, 0) + 1
+        return tracing.wrap(session, resource_name)
+
+
+def close_resource(session):
+    """
+    Releases a session opened with open_resource. The session is only closed, and
+    removed together with any instrument using it from the pool, when no other
+    holder is left. Each open_resource call must be released at most once.
+    """
+    session = tracing.unwrap(session)
+    with _lock:
+        for name, pooled in list(_sessions.items()):
+            if pooled is session:
+                _holders[name] -= 1
+                if _holders[name] > 0:
+                    return
+                del _sessions[name]
+                del _holders[name]
+        for key, instrument in list(_instruments.items()):
+            if tracing.unwrap(getattr(instrument, "device", None)) is session:
+                del _instruments[key]
+        session.close()
+
+
+def close_all():
+    """Closes all pooled sessions and forgets all cached instruments."""
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+        _holders.clear()
+        _instruments.clear()
+
+
+def shared_instrument(cls, *args, **kwargs):
+    """
+    Returns a cached instance of cls constructed with the same arguments,
+    constructing it on first use.
+    A cached instrument is returned as it is, without being configured again,
+    so e.g. a cached OSA has to be swept explicitly to get a new trace.
+    """
+    key = (cls, _freeze(args), _freeze(kwargs))
+    with _lock:
+        instrument = _instruments.get(key)
+        if instrument is None:
+            instrument = cls(*args, **kwargs)
+            _instruments[key] = instrument
+        return instrument
+
+
+def _freeze(value):
+    # Makes list arguments such as GPIB_num=[0, 18] usable as a cache key
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
@@ -0,0 +1,50 @@
+"""
+Compares laser.adjust_wavelength with a fixed 1 nm span and with zoomed sweeps,
+on a simulated laser whose wavelength is off by an offset and tunes with a slope
+different from 1, and a simulated OSA whose sweep time grows with the samples.
+"""
+import time
+import numpy as np
+
+from InstrumentControl import visa_pool
+from InstrumentControl.laser_control import laser
+from InstrumentControl.simulation import (
+    SimulatedLaser,
+    SimulatedOSA,
+    SimulatedResourceManager,
+)
+
+targets = np.linspace(1540, 1560, 5)
+settings = [
+    ("ando", "GPIB0::24::INSTR", 10001, False),
+    ("ando", "GPIB0::24::INSTR", 1001, False),
+    ("ando", "GPIB0::24::INSTR", 1001, True),
+    ("santec", "GPIB0::3::INSTR", 1001, False),
+    ("santec", "GPIB0::3::INSTR", 1001, True),
+]
+
+for laser_type, address, sample, zoom in settings:
+    rm = SimulatedResourceManager()
+    osa = rm.register(SimulatedOSA(sweep_duration=0.02, time_per_sample=20e-6))
+    sim_laser = rm.register(
+        SimulatedLaser(address, offset=0.15, slope=1.02, osa=osa)
+    )
+    visa_pool.set_resource_manager(rm)
+    tunable_laser = laser(laser_type, targets[0])
+    sweeps = 0
+    sweep_time = 0
+    errors = []
+    t0 = time.perf_counter()
+    for target in targets:
+        tunable_laser.set_wavelength(target)
+        tunable_laser.adjust_wavelength(sample=sample, zoom=zoom, settle_time=0)
+        sweeps += tunable_laser.alignment_stats["sweeps"]
+        sweep_time += tunable_laser.alignment_stats["sweep_time"]
+        errors.append(sim_laser.emitted_wavelength() - target)
+    t_alignment = (time.perf_counter() - t0) / len(targets)
+    print(
+        f"{laser_type:>6}, {sample:>5} samples, zoom={zoom!s:>5}: "
+        f"{sweeps / len(targets):4.1f} sweeps, "
+        f"{t_alignment * 1e3:6.1f} ms/alignment, "
+        f"max error {np.max(np.abs(errors)) * 1e3:6.2f} pm"
+    )
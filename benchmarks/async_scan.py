@@ -0,0 +1,69 @@
+"""
+Compares a serial laser + OSA scan with an asyncio scan that sets the next laser
+wavelength while the previous trace is downloading, on simulated instruments.
+"""
+import asyncio
+import time
+import numpy as np
+
+from InstrumentControl import visa_pool
+from InstrumentControl.async_control import AsyncInstrument
+from InstrumentControl.laser_control import laser
+from InstrumentControl.OSA_control import OSA
+from InstrumentControl.simulation import (
+    SimulatedOSA,
+    SimulatedResourceManager,
+    SimulatedSession,
+)
+
+wavelengths = np.linspace(1549.5, 1550.5, 10)
+laser_latency = 0.1  # time for the laser to settle after a write
+sweep_duration = 0.1
+bytes_per_second = 200e3
+
+
+def setup():
+    rm = SimulatedResourceManager()
+    rm.register(
+        SimulatedOSA(sweep_duration=sweep_duration, bytes_per_second=bytes_per_second)
+    )
+    laser_session = rm.register(SimulatedSession("GPIB0::24::INSTR"))
+    visa_pool.set_resource_manager(rm)
+    tunable_laser = laser("ando", wavelengths[0])
+    osa = OSA(1549, 1551, sample=5001)
+    laser_session.latency = laser_latency
+    return tunable_laser, osa
+
+
+def serial_scan(tunable_laser, osa):
+    spectra = []
+    for wavelength in wavelengths:
+        tunable_laser.set_wavelength(wavelength)
+        osa.sweep()
+        spectra.append(osa.powers)
+    return spectra
+
+
+async def async_scan(tunable_laser, osa):
+    tunable_laser = AsyncInstrument(tunable_laser)
+    osa = AsyncInstrument(osa)
+    spectra = []
+    await tunable_laser.set_wavelength(wavelengths[0])
+    for i in range(len(wavelengths)):
+        await osa.sweep(download=False)
+        steps = [osa.get_spectrum()]
+        if i + 1 < len(wavelengths):
+            steps.append(tunable_laser.set_wavelength(wavelengths[i + 1]))
+        await asyncio.gather(*steps)
+        spectra.append(osa.powers)
+    return spectra
+
+
+t0 = time.perf_counter()
+serial_scan(*setup())
+t_serial = time.perf_counter() - t0
+t0 = time.perf_counter()
+asyncio.run(async_scan(*setup()))
+t_async = time.perf_counter() - t0
+print(f"serial: {t_serial / len(wavelengths) * 1e3:6.1f} ms/point")
+print(f" async: {t_async / len(wavelengths) * 1e3:6.1f} ms/point")
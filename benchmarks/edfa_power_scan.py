@@ -0,0 +1,48 @@
+"""
+Compares an EDFA power scan with the fixed 1 s sleep of the old set_power with
+the readback polling of set_power, on a simulated EDFA (0.1 s time constant,
+2 ms per query), and runs the same scan with a PM through the scan engine.
+"""
+import time
+import numpy as np
+
+from InstrumentControl import visa_pool
+from InstrumentControl.instrument_class import EDFA, PM
+from InstrumentControl.scan import MemorySink, Scan, pm_detector
+from InstrumentControl.simulation import (
+    SimulatedEDFA,
+    SimulatedPowerMeter,
+    SimulatedResourceManager,
+)
+
+powers = np.arange(10, 20.5, 1)
+
+rm = SimulatedResourceManager()
+sim_edfa = rm.register(SimulatedEDFA(power=powers[0], latency=0.002))
+sim_pm = rm.register(SimulatedPowerMeter(latency=0.001))
+visa_pool.set_resource_manager(rm)
+edfa = EDFA()
+power_meter = PM()
+
+t0 = time.perf_counter()
+for power in powers:
+    edfa.device.write("CPU=" + str(np.round(10 * power, 0))[:-2])
+    time.sleep(1)
+    edfa.power = edfa.read_power()
+print(f"fixed 1 s sleep:  {(time.perf_counter() - t0) / len(powers):6.3f} s/step")
+
+edfa.set_power(powers[0])
+settle_times = edfa.ramp(powers[1:])
+print(
+    f"readback polling: {np.mean(settle_times):6.3f} s/step "
+    f"(settle times {np.min(settle_times):.3f}-{np.max(settle_times):.3f} s)"
+)
+assert abs(sim_edfa.output_power() - powers[-1]) <= 0.1
+
+edfa.set_power(powers[0])
+sink = MemorySink()
+scan = Scan(powers, [edfa.set_power], [pm_detector(power_meter)], sinks=[sink])
+for point in scan:
+    pass
+assert sink.stack("pm").shape == (len(powers),)
+print(f"scan with PM:     {60 / scan.points_per_minute:6.3f} s/step")
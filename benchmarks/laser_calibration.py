@@ -0,0 +1,42 @@
+"""
+Compares mapping the setpoints of a scan to device arguments one wavelength at a
+time with np.interp, as laser.set_wavelength used to, with a single call to
+laser.plan_wavelengths, for the linear and the monotone spline calibration.
+"""
+import os
+import time
+import numpy as np
+
+from InstrumentControl import visa_pool
+from InstrumentControl.calibration import calibration_folder
+from InstrumentControl.laser_control import laser
+from InstrumentControl.simulation import SimulatedLaser, SimulatedResourceManager
+
+table = np.loadtxt(os.path.join(calibration_folder, "ando.csv"), delimiter=",")
+wavelengths = np.linspace(1525, 1575, 100001)
+
+rm = SimulatedResourceManager()
+rm.register(SimulatedLaser("GPIB0::24::INSTR"))
+visa_pool.set_resource_manager(rm)
+ando = laser("ando", 1550, wl_interp=True)
+
+t0 = time.perf_counter()
+scalar = [np.round(np.interp(wl, table[:, 0], table[:, 1]), 3) for wl in wavelengths]
+t_scalar = time.perf_counter() - t0
+
+t0 = time.perf_counter()
+planned = ando.plan_wavelengths(wavelengths)
+t_planned = time.perf_counter() - t0
+assert np.array_equal(planned, scalar)
+
+ando.set_calibration(kind="monotone")
+t0 = time.perf_counter()
+monotone = ando.plan_wavelengths(wavelengths)
+t_monotone = time.perf_counter() - t0
+assert np.all(np.diff(monotone) >= 0)
+
+n = len(wavelengths)
+print(f"np.interp per wavelength: {t_scalar / n * 1e6:6.2f} us/setpoint")
+print(f"plan_wavelengths, linear: {t_planned / n * 1e6:6.2f} us/setpoint")
+print(f"plan_wavelengths, spline: {t_monotone / n * 1e6:6.2f} us/setpoint")
+print(f"spline - linear: max {np.max(np.abs(monotone - planned)) * 1e3:.1f} pm")
@@ -0,0 +1,58 @@
+"""
+Compares stepping a simulated laser through a list of wavelengths with a
+set_wavelength + time.sleep(dwell) loop, with the host loop of laser.sweep_list,
+and with the stepped sweep of the agilent. Every write takes 2 ms.
+"""
+import time
+import numpy as np
+
+from InstrumentControl import visa_pool
+from InstrumentControl.laser_control import laser
+from InstrumentControl.simulation import SimulatedLaser, SimulatedResourceManager
+
+wavelengths = np.linspace(1540, 1560, 201)
+dwell = 0.01
+
+
+def make_laser(laser_type, address):
+    rm = SimulatedResourceManager()
+    sim_laser = rm.register(SimulatedLaser(address, latency=0.002))
+    visa_pool.set_resource_manager(rm)
+    return laser(laser_type, wavelengths[0]), sim_laser
+
+
+def report(label, t_total, sim_laser, times):
+    # Deviation of every step from its place on the ideal schedule
+    schedule = times[0] + dwell * np.arange(len(times))
+    error = np.max(np.abs(np.asarray(times) - schedule))
+    print(
+        f"{label:>22}: {t_total:5.2f} s for {len(wavelengths)} steps "
+        f"(ideal {len(wavelengths) * dwell:.2f} s), "
+        f"max schedule error {error * 1e3:6.1f} ms, "
+        f"{sim_laser.num_writes} writes"
+    )
+
+
+tunable_laser, sim_laser = make_laser("ando", "GPIB0::24::INSTR")
+sim_laser.reset_counters()
+times = []
+t0 = time.perf_counter()
+for wavelength in wavelengths:
+    tunable_laser.set_wavelength(wavelength)
+    times.append(time.perf_counter())
+    time.sleep(dwell)
+report("set_wavelength loop", time.perf_counter() - t0, sim_laser, times)
+
+tunable_laser, sim_laser = make_laser("ando", "GPIB0::24::INSTR")
+sim_laser.reset_counters()
+t0 = time.perf_counter()
+times = tunable_laser.sweep_list(wavelengths, dwell)
+tunable_laser.wait_for_sweep()
+report("sweep_list, host loop", time.perf_counter() - t0, sim_laser, times)
+
+tunable_laser, sim_laser = make_laser("agilent", "GPIB0::10::INSTR")
+sim_laser.reset_counters()
+t0 = time.perf_counter()
+times = tunable_laser.sweep_list(wavelengths, dwell)
+report("sweep_list, hardware", time.perf_counter() - t0, sim_laser, times)
+assert sim_laser.num_sweeps == 1 and sim_laser.wavelength == wavelengths[-1]
@@ -0,0 +1,76 @@
+"""
+Measures moves of a simulated SMC100 (2 mm/s, 2 ms per call): the blocking
+actuator.move, which polls every 0.1 s, Motion handles with faster polling, and
+a TiSapphire-like scan where the OSA trace of the previous point is downloaded
+while the motor moves to the next one.
+"""
+import contextlib
+import io
+import time
+import numpy as np
+
+from InstrumentControl import visa_pool
+from InstrumentControl.Newport_control import actuator
+from InstrumentControl.OSA_control import OSA
+from InstrumentControl.simulation import (
+    SimulatedOSA,
+    SimulatedResourceManager,
+    SimulatedSMC100,
+)
+
+distance = 0.25  # mm, 125 ms at 2 mm/s
+num_moves = 10
+
+rm = SimulatedResourceManager()
+rm.register(SimulatedOSA(sweep_duration=0.05, bytes_per_second=200e3))
+visa_pool.set_resource_manager(rm)
+osa = OSA(1549, 1551, sample=1001)
+
+smc = SimulatedSMC100(velocity=2, latency=0.002)
+with contextlib.redirect_stdout(io.StringIO()):
+    act = actuator("", 1, SMC=smc)
+    act.initialize(10, -10)
+
+
+def report(label, t_total, num_calls):
+    t_move = distance / smc.velocity
+    print(
+        f"{label:>28}: {t_total / num_moves * 1e3:6.1f} ms/move "
+        f"(motion {t_move * 1e3:.0f} ms), "
+        f"{num_calls / num_moves:5.1f} SMC calls/move"
+    )
+
+
+smc.num_calls = 0
+t0 = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    for i in range(num_moves):
+        act.move(distance)
+report("blocking move", time.perf_counter() - t0, smc.num_calls)
+
+for poll_interval in (0.02, 0.005):
+    smc.num_calls = 0
+    t0 = time.perf_counter()
+    for i in range(num_moves):
+        act.move_async(distance, poll_interval).wait()
+    label = f"Motion, {poll_interval * 1e3:.0f} ms polls"
+    report(label, time.perf_counter() - t0, smc.num_calls)
+
+smc.num_calls = 0
+t0 = time.perf_counter()
+for i in range(num_moves):
+    act.move_async(distance, 0.005).wait()
+    osa.sweep()
+report("move, then sweep + download", time.perf_counter() - t0, smc.num_calls)
+
+smc.num_calls = 0
+t0 = time.perf_counter()
+for i in range(num_moves):
+    motion = act.move_async(distance, 0.005)
+    if i > 0:
+        osa.get_spectrum()  # trace of the previous point
+    motion.wait()
+    osa.sweep(download=False)
+osa.get_spectrum()
+report("download during move", time.perf_counter() - t0, smc.num_calls)
+assert np.isclose(act.get_position(), smc.position())
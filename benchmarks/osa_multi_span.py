@@ -0,0 +1,66 @@
+"""
+Compares capturing pump, signal and idler windows by creating an OSA for every
+window, with a single OSA.acquire call into traces A-C, on a simulated OSA with
+5 ms per write and 20 ms sweeps.
+"""
+import time
+import numpy as np
+
+from InstrumentControl import visa_pool
+from InstrumentControl.OSA_control import OSA
+from InstrumentControl.simulation import SimulatedOSA, SimulatedResourceManager
+
+requests = [
+    ((1540, 1545), 0.1, "A"),
+    ((1548, 1552), 0.05, "B"),
+    ((1540, 1545), 0.05, "C"),
+    ((1555, 1560), 0.1, "D"),
+]
+
+
+def setup():
+    rm = SimulatedResourceManager()
+    sim_osa = rm.register(
+        SimulatedOSA(peak_wavelength=1550, latency=0.005, sweep_duration=0.02)
+    )
+    visa_pool.set_resource_manager(rm)
+    return sim_osa
+
+
+sim_osa = setup()
+t0 = time.perf_counter()
+spectra = []
+for (wavelength_start, wavelength_end), resolution, trace in requests:
+    osa = OSA(wavelength_start, wavelength_end, resolution=resolution, sample=501)
+    osa.forget_settings()
+    spectra.append(osa.powers)
+duration = time.perf_counter() - t0
+print(
+    f"OSA per window: {duration * 1e3:6.1f} ms, {sim_osa.num_writes} writes, "
+    f"{sim_osa.num_sweeps} sweeps"
+)
+
+sim_osa = setup()
+osa = OSA(1548, 1552, resolution=0.05, sample=501, sweep=False)
+sim_osa.reset_counters()
+t0 = time.perf_counter()
+result = osa.acquire(requests)
+duration = time.perf_counter() - t0
+print(
+    f"OSA.acquire:    {duration * 1e3:6.1f} ms, {sim_osa.num_writes} writes, "
+    f"{sim_osa.num_sweeps} sweeps"
+)
+print("sweep order:", [requests[i][2] for i in np.argsort(result["order"])])
+for row in result:
+    print(
+        f"  {row['trace']} {row['wavelength_start']:.0f}-{row['wavelength_end']:.0f} nm: "
+        f"configure {row['configure_time'] * 1e3:5.1f} ms, "
+        f"sweep {row['sweep_time'] * 1e3:5.1f} ms, "
+        f"download {row['download_time'] * 1e3:5.1f} ms, {row['sample']} points"
+    )
+# The laser line at 1550 nm is only in the window of trace B
+peaks = [np.max(powers) for powers in result["powers"]]
+assert np.argmax(peaks) == 1 and peaks[1] > -15
+for row in result:
+    assert row["wavelengths"][0] == row["wavelength_start"]
+    assert row["wavelengths"][-1] == row["wavelength_end"]
@@ -0,0 +1,61 @@
+"""
+Creates OSA objects on the same simulated OSA (5 ms per write) the way
+laser.adjust_wavelength and TiSapphire.set_wavelength do, with the settings
+cache cleared before every OSA (every setting written, as before the cache) and
+with the cache kept. Also re-targets the span of one OSA, and creates an OSA
+without the sweep at construction.
+"""
+import time
+import numpy as np
+
+from InstrumentControl import visa_pool
+from InstrumentControl.OSA_control import OSA
+from InstrumentControl.simulation import SimulatedOSA, SimulatedResourceManager
+
+targets = np.linspace(1549, 1551, 10)
+
+
+def setup():
+    rm = SimulatedResourceManager()
+    sim_osa = rm.register(SimulatedOSA(latency=0.005))
+    visa_pool.set_resource_manager(rm)
+    return sim_osa
+
+
+def construct(forget):
+    sim_osa = setup()
+    t0 = time.perf_counter()
+    for target in targets:
+        osa = OSA(target - 0.5, target + 0.5, resolution=0.05, sample=101)
+        if forget:
+            osa.forget_settings()
+    duration = (time.perf_counter() - t0) / len(targets)
+    return duration, sim_osa.num_writes / len(targets), osa
+
+
+for label, forget in (("cache cleared", True), ("cache kept", False)):
+    duration, writes, osa = construct(forget)
+    print(f"OSA(), {label:>13}: {duration * 1e3:6.1f} ms, {writes:4.1f} writes")
+
+sim_osa = setup()
+osa = OSA(1549, 1551, resolution=0.05, sample=101)
+sim_osa.reset_counters()
+t0 = time.perf_counter()
+osa.set_span(1549.5, 1551)
+osa.set_res(0.05)
+osa.set_sample(101)
+osa.set_sens("SMID")
+print(
+    f"re-target start wavelength: {(time.perf_counter() - t0) * 1e3:5.1f} ms, "
+    f"{sim_osa.num_writes} write"
+)
+assert sim_osa.num_writes == 1
+
+sim_osa.reset_counters()
+t0 = time.perf_counter()
+osa = OSA(1549.5, 1551, resolution=0.05, sample=101, sweep=False)
+print(
+    f"OSA(sweep=False) with the same settings: "
+    f"{(time.perf_counter() - t0) * 1e3:5.1f} ms, {sim_osa.num_writes} writes"
+)
+assert sim_osa.num_writes == 0
@@ -0,0 +1,42 @@
+"""
+Compares the old fixed 100 ms SWEEP? polling with the backoff polling and the
+service request wait, on a simulated OSA with different sweep durations.
+Reports the time from starting a sweep until the end of the sweep is detected.
+"""
+import time
+
+from InstrumentControl import visa_pool
+from InstrumentControl.OSA_control import OSA
+from InstrumentControl.simulation import SimulatedOSA, SimulatedResourceManager
+
+num_sweeps = 10
+
+
+def fixed_poll(osa):
+    t0 = time.perf_counter()
+    osa.device.write(osa.sweeptype)
+    stat = 1
+    while stat != 0:
+        stat = int(osa.device.query("SWEEP?")[:1])
+        time.sleep(0.1)
+    return time.perf_counter() - t0
+
+
+def wait(osa):
+    osa.sweep()
+    return osa.sweep_latency
+
+
+for sweep_duration in (0.01, 0.05, 0.25):
+    for sweep_wait in ("fixed", "poll", "srq"):
+        rm = SimulatedResourceManager()
+        sim = rm.register(SimulatedOSA(sweep_duration=sweep_duration))
+        visa_pool.set_resource_manager(rm)
+        osa = OSA(1549.5, 1550.5, sweep_wait="poll" if sweep_wait == "fixed" else sweep_wait)
+        sweep = fixed_poll if sweep_wait == "fixed" else wait
+        latency = sum(sweep(osa) for i in range(num_sweeps)) / num_sweeps
+        print(
+            f"{sweep_duration * 1e3:4.0f} ms sweep, {sweep_wait:>5}: "
+            f"{latency * 1e3:6.1f} ms until detected, "
+            f"{(latency - sweep_duration) * 1e3:5.1f} ms dead time"
+        )
@@ -0,0 +1,31 @@
+"""
+Compares the 'ascii' and 'compact' OSA trace transfer modes on a simulated GPIB bus.
+Reports bytes moved and download + parse time per sweep.
+"""
+import time
+
+from InstrumentControl import visa_pool
+from InstrumentControl.OSA_control import OSA
+from InstrumentControl.simulation import SimulatedOSA, SimulatedResourceManager
+
+num_sweeps = 20
+bytes_per_second = None  # e.g. 500e3 to include GPIB transfer time
+
+for sample in (1001, 10001):
+    for transfer in ("ascii", "compact"):
+        rm = SimulatedResourceManager()
+        sim = rm.register(SimulatedOSA(bytes_per_second=bytes_per_second))
+        visa_pool.set_resource_manager(rm)
+        osa = OSA(1549.5, 1550.5, resolution=0.01, sample=sample, transfer=transfer)
+        sim.reset_counters()
+        t_total = 0
+        for i in range(num_sweeps):
+            osa.device.write(osa.sweeptype)
+            t0 = time.perf_counter()
+            osa.get_spectrum()
+            t_total += time.perf_counter() - t0
+        print(
+            f"{sample:>6} points, {transfer:>7}: "
+            f"{sim.bytes_read / num_sweeps / 1e3:8.1f} kB/sweep, "
+            f"{t_total / num_sweeps * 1e3:7.2f} ms/sweep"
+        )
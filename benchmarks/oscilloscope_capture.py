@@ -0,0 +1,60 @@
+"""
+Compares reading 1 and 4 channels with saveWaveform against batched captures
+on a simulated oscilloscope, counting the commands sent per acquisition.
+"""
+import time
+
+from InstrumentControl import visa_pool
+from InstrumentControl.instrument_class import oscilloscope
+from InstrumentControl.simulation import SimulatedOscilloscope, SimulatedResourceManager
+
+num_acquisitions = 10
+write_latency = 0.005
+
+rm = SimulatedResourceManager()
+rm.register(SimulatedOscilloscope(num_points=100000, latency=write_latency))
+visa_pool.set_resource_manager(rm)
+scope = oscilloscope()
+scope.capture([1, 2, 3, 4])  # fills the preamble cache
+
+
+def one_channel():
+    scope.singleAcq()
+    scope.query("*OPC?")
+    return scope.saveWaveform(1)
+
+
+def four_channels_separately():
+    scope.singleAcq()
+    scope.query("*OPC?")
+    return [scope.saveWaveform(channel) for channel in (1, 2, 3, 4)]
+
+
+def four_channels_batched():
+    return scope.capture([1, 2, 3, 4])
+
+
+def four_channels_combined():
+    return scope.capture([1, 2, 3, 4], combined=True)
+
+
+for acquire in (
+    one_channel,
+    four_channels_separately,
+    four_channels_batched,
+    four_channels_combined,
+):
+    start = scope.round_trips
+    t0 = time.perf_counter()
+    for i in range(num_acquisitions):
+        acquire()
+    t_acquisition = (time.perf_counter() - t0) / num_acquisitions
+    round_trips = (scope.round_trips - start) / num_acquisitions
+    print(
+        f"{acquire.__name__:>24}: {round_trips:4.1f} round trips, "
+        f"{t_acquisition * 1e3:7.2f} ms/acquisition"
+    )
+
+scope.set_vertical_scale(2, 0.5)
+scope.capture([1, 2, 3, 4])
+print(f"after changing CH2 scale: {scope.acquisition_round_trips} round trips")
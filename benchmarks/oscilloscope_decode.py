@@ -0,0 +1,59 @@
+"""
+Compares the per-sample Python loop that oscilloscope.saveWaveform used to scale
+waveforms with the vectorized decoding, on a simulated oscilloscope.
+"""
+import time
+import numpy as np
+
+from InstrumentControl import visa_pool
+from InstrumentControl.instrument_class import oscilloscope, parse_block
+from InstrumentControl.simulation import SimulatedOscilloscope, SimulatedResourceManager
+
+
+def loop_scale(samples, scale):
+    voltage = np.zeros(len(samples))
+    time_val = np.zeros(len(samples))
+    for i in range(len(samples)):
+        time_val[i] = scale["x_origin"] + (i * scale["x_increment"])
+        voltage[i] = ((samples[i] - scale["y_reference"]) * scale["y_increment"]) + scale[
+            "y_origin"
+        ]
+    return time_val, voltage
+
+
+for num_points in (10000, 100000, 1000000):
+    rm = SimulatedResourceManager()
+    rm.register(SimulatedOscilloscope(num_points=num_points))
+    visa_pool.set_resource_manager(rm)
+    scope = oscilloscope()
+
+    t0 = time.perf_counter()
+    samples, scale = scope.saveWaveform(1, raw=True)
+    t_raw = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    time_val, voltage = scope.saveWaveform(1)
+    t_vectorized = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    time_loop, voltage_loop = loop_scale(samples, scale)
+    t_loop = time.perf_counter() - t0 + t_raw
+    time_val, voltage = scope.scale_waveform(samples, scale)
+    assert np.allclose(voltage, voltage_loop) and np.allclose(time_val, time_loop)
+    print(
+        f"{num_points:>8} points: raw {t_raw * 1e3:8.2f} ms, "
+        f"vectorized {t_vectorized * 1e3:8.2f} ms, loop {t_loop * 1e3:9.2f} ms"
+    )
+
+# A block whose last byte is the termination character must not leave the real
+# termination character unread
+simulated = SimulatedOscilloscope(num_points=1000)
+samples = simulated.samples
+simulated.samples = lambda channel: np.append(samples(channel)[:-1], np.int16(0x0A00))
+rm = SimulatedResourceManager()
+rm.register(simulated)
+visa_pool.set_resource_manager(rm)
+scope = oscilloscope()
+scope.write(":data:encdg sribinary")
+scope.write("CURVe?")
+samples = np.frombuffer(parse_block(scope.read_blocks()), dtype="<i2")
+assert samples[-1] == 0x0A00 and len(samples) == 1000
+assert simulated._reply[simulated._position :] == b""
@@ -0,0 +1,41 @@
+"""
+Runs laser.adjust_wavelength on a simulated laser and OSA with different numbers
+of samples per alignment sweep, comparing argmax with sub-sample peak finding.
+Reports the number of sweeps, time per alignment and the final wavelength error.
+"""
+import time
+import numpy as np
+
+from InstrumentControl import visa_pool
+from InstrumentControl.laser_control import laser
+from InstrumentControl.simulation import (
+    SimulatedLaser,
+    SimulatedOSA,
+    SimulatedResourceManager,
+)
+
+targets = np.linspace(1540, 1560, 5)
+offset = 0.0637  # error of the laser before alignment, in nm
+
+for sample in (10001, 1001, 201):
+    for peak_method in ("argmax", "parabolic"):
+        rm = SimulatedResourceManager()
+        osa = rm.register(SimulatedOSA(bytes_per_second=200e3))
+        sim_laser = rm.register(SimulatedLaser(offset=offset, osa=osa))
+        visa_pool.set_resource_manager(rm)
+        tunable_laser = laser("ando", targets[0])
+        errors = []
+        t0 = time.perf_counter()
+        for target in targets:
+            tunable_laser.set_wavelength(target)
+            tunable_laser.adjust_wavelength(
+                res=0.01, sample=sample, peak_method=peak_method, settle_time=0
+            )
+            errors.append(sim_laser.emitted_wavelength() - target)
+        t_alignment = (time.perf_counter() - t0) / len(targets)
+        print(
+            f"{sample:>6} samples, {peak_method:>9}: "
+            f"{osa.num_sweeps / len(targets):4.1f} sweeps, "
+            f"{t_alignment * 1e3:7.1f} ms/alignment, "
+            f"max error {np.max(np.abs(errors)) * 1e3:5.2f} pm"
+        )
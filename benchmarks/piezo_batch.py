@@ -0,0 +1,45 @@
+"""
+Compares updating all six piezo axes with six set_duty calls, each its own write
+followed by a settle, with one set_duties call writing each message separately
+(the default) and with batch_writes, on a simulated controller whose writes take
+1 ms.
+"""
+import time
+import numpy as np
+
+from InstrumentControl.instrument_class import piezo
+from InstrumentControl.simulation import SimulatedPiezo
+
+rng = np.random.default_rng(0)
+configurations = rng.uniform(0, 1, (10, 2, 3))
+
+sim_piezo = SimulatedPiezo(write_time=0.001)
+stage = piezo(ser=sim_piezo)
+t0 = time.perf_counter()
+for configuration in configurations:
+    for stage_no in (1, 2):
+        for i, dim in enumerate("XYZ"):
+            stage.set_duty(stage_no, dim, configuration[stage_no - 1, i])
+t_single = (time.perf_counter() - t0) / len(configurations)
+assert np.allclose(sim_piezo.duty, np.floor(configurations[-1].ravel() * 255) / 255)
+
+print(f"     6 x set_duty: {t_single * 1e3:6.1f} ms per update of both stages")
+for batch_writes in (False, True):
+    sim_piezo = SimulatedPiezo(write_time=0.001)
+    stage = piezo(ser=sim_piezo)
+    stage.batch_writes = batch_writes
+    sim_piezo.num_writes = 0
+    t0 = time.perf_counter()
+    for configuration in configurations:
+        stage.set_duties(configuration)
+    t_batch = (time.perf_counter() - t0) / len(configurations)
+    writes = 1 if batch_writes else 6
+    assert sim_piezo.num_writes == writes * len(configurations)
+    assert np.allclose(
+        sim_piezo.duty, np.floor(configurations[-1].ravel() * 255) / 255
+    )
+    assert np.array_equal(stage.stage2, configurations[-1][1])
+    label = "batched" if batch_writes else "separate"
+    print(
+        f"set_duties, {label:>8}: {t_batch * 1e3:6.1f} ms per update of both stages"
+    )
@@ -0,0 +1,58 @@
+"""
+Compares monitoring a simulated PM100 (1 ms per round trip, 1 averaged sample of
+0.3 ms) with a PM.read loop and with PM.stream, free running and at a fixed
+interval, and reports readings per second and the jitter of the reading times.
+"""
+import time
+import numpy as np
+
+from InstrumentControl import visa_pool
+from InstrumentControl.instrument_class import PM
+from InstrumentControl.simulation import SimulatedPowerMeter, SimulatedResourceManager
+
+duration = 2
+
+rm = SimulatedResourceManager()
+rm.register(SimulatedPowerMeter(latency=0.001, sample_time=0.0003, noise=0.01))
+visa_pool.set_resource_manager(rm)
+power_meter = PM()
+power_meter.set_averages(1)
+
+times = []
+t0 = time.perf_counter()
+while time.perf_counter() - t0 < duration:
+    power_meter.read()
+    times.append(time.perf_counter())
+times = np.array(times)
+print(
+    f"        PM.read loop: {(len(times) - 1) / (times[-1] - times[0]):7.1f} "
+    f"readings/s, jitter {np.std(np.diff(times)) * 1e3:5.2f} ms"
+)
+
+for interval in (0, 0.005):
+    received = []
+    stream = power_meter.stream(
+        interval=interval, callback=lambda t, w: received.append(t)
+    )
+    time.sleep(duration)
+    stream.stop()
+    assert len(received) == stream.count
+    label = "free running" if interval == 0 else f"{interval * 1e3:.0f} ms interval"
+    print(
+        f"PM.stream, {label:>14}: {stream.rate():7.1f} readings/s, "
+        f"jitter {stream.jitter() * 1e3:5.2f} ms"
+    )
+
+centers, watts, counts = stream.averaged(0.1)
+assert np.allclose(watts[counts >= 10], 1e-3, rtol=0.01)
+times, watts = stream.decimated(10)
+assert len(times) == stream.count // 10
+
+# Iterating over a running stream yields every new reading in order
+stream = power_meter.stream()
+readings = []
+for timestamp, watts in stream:
+    readings.append(timestamp)
+    if len(readings) == 100:
+        stream.stop()
+assert np.all(np.diff(readings) > 0)
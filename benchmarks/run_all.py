@@ -0,0 +1,71 @@
+"""
+Runs the benchmarks on the simulated instruments, grouped in suites, each in its
+own process. Exits with an error if any benchmark fails.
+
+    python benchmarks/run_all.py                 # all suites
+    python benchmarks/run_all.py sweep alignment  # only some suites
+
+The benchmarks measure timing. The behaviour of the instrument classes is tested
+on the simulated instruments by the tests in tests/, run with python -m pytest.
+"""
+import os
+import subprocess
+import sys
+import time
+
+suites = {
+    "sweep": [
+        "osa_sweep_wait",
+        "osa_transfer",
+        "osa_settings_cache",
+        "osa_multi_span",
+        "laser_sweep",
+        "transmission_scan",
+        "scan_engine",
+        "async_scan",
+        "edfa_power_scan",
+    ],
+    "alignment": [
+        "peak_alignment",
+        "adaptive_alignment",
+        "laser_calibration",
+        "tisapphire_calibration",
+        "newport_motion",
+        "piezo_batch",
+        "piezo_optimize",
+    ],
+    "acquisition": [
+        "oscilloscope_decode",
+        "oscilloscope_capture",
+        "pm_stream",
+        "signal_generator_status",
+        "spectrum_store",
+        "spectrum_dataset",
+        "session_pool",
+        "simulated_bench",
+        "tracing",
+    ],
+}
+
+folder = os.path.dirname(os.path.abspath(__file__))
+environment = dict(os.environ)
+environment["PYTHONPATH"] = os.pathsep.join(
+    [os.path.dirname(folder), environment.get("PYTHONPATH", "")]
+)
+
+failed = []
+for suite in sys.argv[1:] or list(suites):
+    print(f"===== {suite} =====")
+    for name in suites[suite]:
+        print(f"--- {name}")
+        t0 = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, os.path.join(folder, name + ".py")], env=environment
+        )
+        print(f"--- {name}: {time.perf_counter() - t0:.1f} s")
+        if result.returncode != 0:
+            failed.append(name)
+
+if failed:
+    print("Failed:", ", ".join(failed))
+    sys.exit(1)
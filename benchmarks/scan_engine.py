@@ -0,0 +1,40 @@
+"""
+Runs a laser + OSA scan with the scan engine on simulated instruments, with and
+without overlapping the move to the next setpoint with the trace download.
+"""
+import numpy as np
+
+from InstrumentControl import visa_pool
+from InstrumentControl.laser_control import laser
+from InstrumentControl.OSA_control import OSA
+from InstrumentControl.scan import MemorySink, Scan, osa_detector
+from InstrumentControl.simulation import (
+    SimulatedOSA,
+    SimulatedResourceManager,
+    SimulatedSession,
+)
+
+wavelengths = np.linspace(1549.5, 1550.5, 10)
+
+for overlap in (False, True):
+    rm = SimulatedResourceManager()
+    rm.register(SimulatedOSA(sweep_duration=0.1, bytes_per_second=200e3))
+    laser_session = rm.register(SimulatedSession("GPIB0::24::INSTR"))
+    visa_pool.set_resource_manager(rm)
+    tunable_laser = laser("ando", wavelengths[0])
+    laser_session.latency = 0.1
+    osa = OSA(1549, 1551, sample=5001, transfer="compact")
+
+    sink = MemorySink()
+    scan = Scan(
+        wavelengths,
+        [tunable_laser.set_wavelength],
+        [osa_detector(osa)],
+        sinks=[sink],
+        overlap=overlap,
+    )
+    for point in scan:
+        pass
+    assert scan.num_points == len(wavelengths)
+    assert sink.stack("osa").shape == (len(wavelengths), 2, 5001)
+    print(f"overlap={overlap!s:>5}: {scan.points_per_minute:6.1f} points/min")
@@ -0,0 +1,42 @@
+"""
+Compares reopening the OSA session on every scan step with the pooled session and
+with a shared OSA instance, on a simulated GPIB bus with a slow open.
+Reports open calls, writes and time per loop step.
+"""
+import time
+
+from InstrumentControl import visa_pool
+from InstrumentControl.OSA_control import OSA
+from InstrumentControl.simulation import SimulatedOSA, SimulatedResourceManager
+
+num_steps = 20
+open_latency = 0.05
+write_latency = 0.002
+
+
+def reopen():
+    visa_pool.close_all()
+    OSA(977.5, 982.5, resolution=0.05, sample=1001)
+
+
+def pooled_session():
+    OSA(977.5, 982.5, resolution=0.05, sample=1001)
+
+
+def shared_instrument():
+    osa = visa_pool.shared_instrument(OSA, 977.5, 982.5, resolution=0.05, sample=1001)
+    osa.sweep()
+
+
+for step in (reopen, pooled_session, shared_instrument):
+    rm = SimulatedResourceManager(open_latency=open_latency)
+    sim = rm.register(SimulatedOSA(peak_wavelength=980, latency=write_latency))
+    visa_pool.set_resource_manager(rm)
+    t0 = time.perf_counter()
+    for i in range(num_steps):
+        step()
+    t_step = (time.perf_counter() - t0) / num_steps
+    print(
+        f"{step.__name__:>17}: {rm.num_opens:3d} opens, "
+        f"{sim.num_writes / num_steps:4.1f} writes/step, {t_step * 1e3:7.2f} ms/step"
+    )
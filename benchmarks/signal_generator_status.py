@@ -0,0 +1,51 @@
+"""
+Compares the old check_RATE_led loop (100 IS 4 queries with a 10 ms sleep after
+each, np.append per sample) with monitor_RATE_led, on a simulated DG535 taking
+2 ms per query, for a LED blinking with a 30 % duty cycle and a LED that is off.
+"""
+import time
+import numpy as np
+
+from InstrumentControl import visa_pool
+from InstrumentControl.instrument_class import SignalGenerator
+from InstrumentControl.simulation import (
+    SimulatedResourceManager,
+    SimulatedSignalGenerator,
+)
+
+
+def old_check_RATE_led(generator):
+    stat_array = np.array([])
+    for indx in range(100):
+        status = int(generator.device.query("IS 4"))
+        time.sleep(0.01)
+        stat_array = np.append(stat_array, status)
+    return np.sum(stat_array)
+
+
+for duty_cycle in (0.3, 0):
+    rm = SimulatedResourceManager()
+    rm.register(
+        SimulatedSignalGenerator(
+            rate_duty_cycle=duty_cycle, blink_period=0.097, latency=0.002
+        )
+    )
+    visa_pool.set_resource_manager(rm)
+    generator = SignalGenerator()
+
+    t0 = time.perf_counter()
+    check = old_check_RATE_led(generator)
+    print(
+        f"LED duty cycle {duty_cycle:.1f}, old loop:            "
+        f"{time.perf_counter() - t0:5.3f} s, {check:3.0f} % on"
+    )
+    for interval, early_exit in ((0.01, 0), (0, 0), (0.01, 10)):
+        t0 = time.perf_counter()
+        stats = generator.monitor_RATE_led(100, interval, early_exit)
+        t = time.perf_counter() - t0
+        print(
+            f"LED duty cycle {duty_cycle:.1f}, {interval * 1e3:2.0f} ms, "
+            f"early_exit={early_exit:2d}: {t:5.3f} s, "
+            f"{stats['duty_cycle'] * 100:3.0f} % on, "
+            f"{len(stats['samples']):3d} samples"
+        )
@@ -0,0 +1,66 @@
+"""
+Runs the instrument classes against a SimulatedBench with 1 ms latency: a
+thorlabs laser sweep on the simulated Kinesis stage, an OSA acquisition of the
+laser line, a PM transmission scan and an oscilloscope capture. Checks that two
+runs with the same seed give the same results.
+"""
+import contextlib
+import io
+import time
+import numpy as np
+
+from InstrumentControl.instrument_class import PM, oscilloscope
+from InstrumentControl.laser_control import laser
+from InstrumentControl.OSA_control import OSA
+from InstrumentControl.simulation import SimulatedBench
+from InstrumentControl.transmission import transmission_spectrum
+
+wavelengths = np.linspace(1520, 1580, 31)
+
+
+def notch(wavelength):
+    return 1 - 0.9 / (1 + ((wavelength - 1550) / 2) ** 2)
+
+
+def run():
+    bench = SimulatedBench(latency=0.001, transmission=notch).install()
+    timings = {}
+    t0 = time.perf_counter()
+    thorlabs = laser("thorlabs", wavelengths[0], motor=bench.kinesis)
+    errors = []
+    for wavelength in wavelengths:
+        thorlabs.set_wavelength(wavelength)
+        errors.append(bench.kinesis.emitted_wavelength() - wavelength)
+    timings["thorlabs sweep"] = time.perf_counter() - t0
+    assert np.max(np.abs(errors)) < 0.01, errors
+
+    thorlabs.set_wavelength(1550)
+    t0 = time.perf_counter()
+    osa = OSA(1545, 1555, resolution=0.05, sample=1001)
+    timings["OSA sweep"] = time.perf_counter() - t0
+    peak = osa.wavelengths[np.argmax(osa.powers)]
+    assert abs(peak - bench.kinesis.emitted_wavelength()) < 0.02
+
+    t0 = time.perf_counter()
+    tunable_laser = laser("ando", wavelengths[0])
+    # The simulated laser tunes instantly
+    spectrum = transmission_spectrum(
+        tunable_laser, PM(), wavelengths, settle_time=0
+    )
+    timings["transmission scan"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    scope = oscilloscope()
+    waveform = scope.capture([1, 2])
+    timings["scope capture"] = time.perf_counter() - t0
+    return timings, np.asarray(osa.powers), spectrum.dBm, np.asarray(waveform[1])
+
+
+with contextlib.redirect_stdout(io.StringIO()):
+    timings, *first = run()
+    _, *second = run()
+for a, b in zip(first, second):
+    assert np.array_equal(a, b)
+for label, duration in timings.items():
+    print(f"{label:>18}: {duration * 1e3:7.1f} ms")
+print("two runs gave identical spectra and waveforms")
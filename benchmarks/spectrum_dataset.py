@@ -0,0 +1,43 @@
+"""
+Compares loading and masking a folder of CSV sweeps file by file with opening it
+as a SpectrumDataset, for scans with an increasing number of sweeps.
+"""
+import glob
+import os
+import tempfile
+import time
+import numpy as np
+
+from InstrumentControl.simulation import SimulatedOSA
+from InstrumentControl.spectrum_dataset import SpectrumDataset
+
+sim = SimulatedOSA(peak_wavelength=980)
+sim.wavelength_start, sim.wavelength_end, sim.sample = 977.5, 982.5, 1001
+
+for num_sweeps in (100, 1000):
+    with tempfile.TemporaryDirectory() as folder:
+        for i in range(num_sweeps):
+            wavelengths, powers = sim.spectrum()
+            res = np.column_stack((wavelengths, powers))
+            np.savetxt(os.path.join(folder, f"test_{i}.csv"), res, fmt="%f", delimiter=",")
+
+        t0 = time.perf_counter()
+        for name in glob.glob(os.path.join(folder, "*.csv")):
+            data = np.loadtxt(name, delimiter=",")
+            nan = np.where(data[:, 1] < -100)
+            data[nan, 1] = np.nan
+        t_loadtxt = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        SpectrumDataset(folder, noise_floor=-100)
+        t_convert = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        dataset = SpectrumDataset(folder, noise_floor=-100)
+        wavelengths, powers = dataset.sel(slice(0, 10), (979, 981))
+        t_open = time.perf_counter() - t0
+        assert powers.shape == (10, 401)
+        print(
+            f"{num_sweeps:>5} sweeps: loadtxt {t_loadtxt * 1e3:7.1f} ms, "
+            f"first open {t_convert * 1e3:7.1f} ms, "
+            f"open + select {t_open * 1e3:5.1f} ms"
+        )
@@ -0,0 +1,48 @@
+"""
+Compares saving and loading a scan as one CSV file per sweep with the HDF5
+spectrum store, using sweeps from a simulated OSA.
+"""
+import glob
+import os
+import tempfile
+import time
+import numpy as np
+
+from InstrumentControl import visa_pool
+from InstrumentControl.OSA_control import OSA
+from InstrumentControl.simulation import SimulatedOSA, SimulatedResourceManager
+from InstrumentControl.spectrum_store import SpectrumStore
+
+num_sweeps = 200
+
+rm = SimulatedResourceManager()
+rm.register(SimulatedOSA(peak_wavelength=980))
+visa_pool.set_resource_manager(rm)
+osa = OSA(977.5, 982.5, resolution=0.05, sample=1001)
+
+with tempfile.TemporaryDirectory() as folder:
+    os.makedirs(os.path.join(folder, "csv"))
+    os.makedirs(os.path.join(folder, "hdf5"))
+    for format in ("csv", "hdf5"):
+        t_save = 0
+        for i in range(num_sweeps):
+            osa.sweep()
+            name = f"test_{i}" if format == "csv" else "scan"
+            t0 = time.perf_counter()
+            osa.save(os.path.join(folder, format, name), format=format)
+            t_save += time.perf_counter() - t0
+        files = glob.glob(os.path.join(folder, format, "*"))
+        size = sum(os.path.getsize(file) for file in files)
+
+        t0 = time.perf_counter()
+        if format == "csv":
+            powers = np.stack([np.loadtxt(file, delimiter=",")[:, 1] for file in files])
+        else:
+            with SpectrumStore(files[0], mode="r") as store:
+                powers = store.powers[:]
+        t_load = time.perf_counter() - t0
+        assert powers.shape == (num_sweeps, 1001)
+        print(
+            f"{format:>4}: save {t_save / num_sweeps * 1e3:5.2f} ms/sweep, "
+            f"load {t_load * 1e3:7.1f} ms, {size / 1e6:5.2f} MB"
+        )
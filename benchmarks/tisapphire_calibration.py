@@ -0,0 +1,61 @@
+"""
+Compares TiSapphire.set_wavelength with the fixed response of 1 nm per -0.08297 mm
+(a calibration of degree 0, which is never fitted), starting from an empty motor
+calibration, and with the calibration reloaded from its file, as it would be the
+next time the laser is used. The simulated SMC100 has backlash and drives a Ti:Sapphire whose response
+is not linear.
+"""
+import contextlib
+import io
+import os
+import tempfile
+import time
+import numpy as np
+
+from InstrumentControl import visa_pool
+from InstrumentControl.calibration import MotorCalibration
+from InstrumentControl.laser_control import TiSapphire
+from InstrumentControl.simulation import (
+    SimulatedOSA,
+    SimulatedResourceManager,
+    SimulatedSMC100,
+)
+
+
+def wavelength(position):
+    return 975 - position / 0.08297 + 0.8 * position**2
+
+
+rng = np.random.default_rng(0)
+targets = rng.uniform(965, 985, 20)
+calibration_file = os.path.join(tempfile.mkdtemp(), "TiSa_calibration.csv")
+
+
+def run(calibration_file, label, degree=2):
+    rm = SimulatedResourceManager()
+    osa = rm.register(SimulatedOSA(peak_wavelength=975))
+    smc = SimulatedSMC100(velocity=100, backlash=0.004, wavelength=wavelength, osa=osa)
+    visa_pool.set_resource_manager(rm)
+    moves = []
+    sweeps = []
+    errors = []
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        tisa = TiSapphire(1, calibration_file=calibration_file, SMC=smc)
+        tisa.calibration = MotorCalibration(calibration_file, degree=degree)
+        for target in targets:
+            tisa.set_wavelength(target, error_tolerance=0.02, settle_time=0)
+            moves.append(tisa.tuning_stats["moves"])
+            sweeps.append(tisa.tuning_stats["sweeps"])
+            errors.append(smc.emitted_wavelength() - target)
+    t_retune = (time.perf_counter() - t0) / len(targets)
+    print(
+        f"{label:>24}: {np.mean(moves):4.2f} moves, {np.mean(sweeps):4.2f} sweeps, "
+        f"{t_retune * 1e3:6.1f} ms/retune, "
+        f"max error {np.max(np.abs(errors)) * 1e3:5.1f} pm"
+    )
+
+
+run(None, "fixed response", degree=0)
+run(calibration_file, "empty calibration")
+run(calibration_file, "reloaded calibration")
@@ -0,0 +1,65 @@
+"""
+Measures the overhead of tracing per session call, and prints the profile of a
+wavelength alignment and a transmission scan on simulated instruments.
+"""
+import time
+import numpy as np
+
+from InstrumentControl import tracing, visa_pool
+from InstrumentControl.instrument_class import PM
+from InstrumentControl.laser_control import laser
+from InstrumentControl.simulation import (
+    SimulatedLaser,
+    SimulatedOSA,
+    SimulatedPowerMeter,
+    SimulatedResourceManager,
+)
+from InstrumentControl.transmission import transmission_spectrum
+
+num_calls = 20000
+
+
+def setup():
+    rm = SimulatedResourceManager()
+    osa = rm.register(SimulatedOSA(sweep_duration=0.02, time_per_sample=20e-6))
+    sim_laser = rm.register(SimulatedLaser(offset=0.05, osa=osa))
+    rm.register(SimulatedPowerMeter(laser=sim_laser))
+    visa_pool.set_resource_manager(rm)
+    return sim_laser
+
+
+def query_time(session):
+    t0 = time.perf_counter()
+    for _ in range(num_calls):
+        session.query("WA:1550.000")
+    return (time.perf_counter() - t0) / num_calls
+
+
+setup()
+plain = query_time(visa_pool.open_resource("GPIB0::24::INSTR"))
+tracer = tracing.enable()
+traced = query_time(visa_pool.open_resource("GPIB0::24::INSTR"))
+assert tracer.count == num_calls
+print(
+    f"query: {plain * 1e6:5.2f} us, traced {traced * 1e6:5.2f} us, "
+    f"overhead {(traced - plain) * 1e6:5.2f} us/call"
+)
+
+tracer.clear()
+setup()
+tunable_laser = laser("ando", 1550)
+power_meter = PM()
+with tracer.step("alignment"):
+    tunable_laser.adjust_wavelength(settle_time=0.01)
+with tracer.step("transmission"):
+    transmission_spectrum(
+        tunable_laser, power_meter, np.linspace(1549, 1551, 51), settle_time=0.01
+    )
+tracing.disable()
+
+steps = set(tracer.records()["step"])
+assert steps == {"", "alignment", "transmission"}, steps
+print()
+tracer.print_summary(limit=12)
+print()
+print(tracer.folded().splitlines()[0])
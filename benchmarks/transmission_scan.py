@@ -0,0 +1,67 @@
+"""
+Compares measuring a transmission spectrum with a laser.set_wavelength +
+PM.read loop with transmission.transmission_spectrum, on a simulated laser
+(5 ms per write, 20 ms to tune) and PM100 (1 ms per write, 3 averaged samples
+of 3 ms). By default transmission_spectrum waits for the laser to reply to
+*OPC?, which it does once it has tuned. Without waiting, the readings are
+taken while the laser is still tuning.
+"""
+import time
+import numpy as np
+
+from InstrumentControl import visa_pool
+from InstrumentControl.instrument_class import PM
+from InstrumentControl.laser_control import laser
+from InstrumentControl.simulation import (
+    SimulatedLaser,
+    SimulatedPowerMeter,
+    SimulatedResourceManager,
+)
+from InstrumentControl.transmission import transmission_spectrum
+
+wavelengths = np.linspace(1549, 1551, 101)
+
+
+def notch(wavelength):
+    return 1 - 0.9 / (1 + ((wavelength - 1550) / 0.2) ** 2)
+
+
+def setup():
+    rm = SimulatedResourceManager()
+    sim_laser = rm.register(SimulatedLaser(latency=0.005, tuning_time=0.02))
+    sim_pm = rm.register(
+        SimulatedPowerMeter(transmission=notch, laser=sim_laser, latency=0.001)
+    )
+    visa_pool.set_resource_manager(rm)
+    tunable_laser = laser("ando", wavelengths[0])
+    power_meter = PM()
+    power_meter.set_averages(3)
+    return tunable_laser, power_meter, sim_pm
+
+
+expected = 10 * np.log10(1e-3 * notch(wavelengths) * 1e3)
+
+tunable_laser, power_meter, sim_pm = setup()
+t0 = time.perf_counter()
+powers = []
+for wavelength in wavelengths:
+    tunable_laser.set_wavelength(wavelength)
+    powers.append(power_meter.read())
+loop_points_per_second = len(wavelengths) / (time.perf_counter() - t0)
+assert np.allclose(powers, expected)
+print(f"set_wavelength + read loop: {loop_points_per_second:6.1f} points/s")
+
+tunable_laser, power_meter, sim_pm = setup()
+spectrum = transmission_spectrum(tunable_laser, power_meter, wavelengths)
+assert np.allclose(spectrum.dBm, expected)
+assert sim_pm.num_disturbed == 0
+assert spectrum.points_per_second > 2 * loop_points_per_second
+print(f"transmission_spectrum:      {spectrum.points_per_second:6.1f} points/s")
+
+tunable_laser, power_meter, sim_pm = setup()
+spectrum = transmission_spectrum(tunable_laser, power_meter, wavelengths, settle_time=0)
+assert sim_pm.num_disturbed == len(wavelengths)
+print(
+    f"transmission_spectrum, no settle: {sim_pm.num_disturbed} of "
+    f"{len(wavelengths)} readings taken while tuning"
+)
@@ -0,0 +1,14 @@
+import pytest
+
+from InstrumentControl import tracing, visa_pool
+from InstrumentControl.simulation import SimulatedResourceManager
+
+
+@pytest.fixture
+def resource_manager():
+    """Empty SimulatedResourceManager installed in visa_pool."""
+    resource_manager = SimulatedResourceManager()
+    visa_pool.set_resource_manager(resource_manager)
+    yield resource_manager
+    visa_pool.close_all()
+    tracing.disable()
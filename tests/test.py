@@ -2,9 +2,10 @@ import pyvisa as visa
 # from InstrumentControl.OSA_control import OSA
 from OSA_control_test import OSA
 from InstrumentControl.laser_control import laser, TiSapphire
+from InstrumentControl import visa_pool
 import numpy as np
 import matplotlib.pyplot as plt
-rm = visa.ResourceManager("C:/Windows/System32/visa32.dll")
+rm = visa_pool.get_resource_manager("C:/Windows/System32/visa32.dll")
 print(rm.list_resources())
 
 # TiSa = TiSapphire(3)
@@ -14,20 +15,17 @@ num_sweeps = int(wl_tot / del_wl)
 # |%%--%%| <44kq2ARlHO|xktV1QPeAQ>
 osa = OSA(978.5, 982.5, GPIB_num=19)
 # |%%--%%| <xktV1QPeAQ|cPEHpCSHBc>
+OSA_temp = visa_pool.shared_instrument(OSA, 977.5, 982.5, resolution=0.05, sample=1001)
 for i in range(num_sweeps):
     TiSa.delta_wl_nm(del_wl)
-    OSA_temp = OSA(977.5, 982.5, resolution=0.05, sample=1001)
+    OSA_temp.sweep()
     OSA_temp.save(f"test_data/test_{i}")
 TiSa.delta_wl_nm(-wl_tot)
-OSA(977.5, 982.5, resolution=0.05, sample=1001)
+OSA_temp.sweep()
 # |%%--%%| <cPEHpCSHBc|2NML2wCucO>
-import glob
+from InstrumentControl.spectrum_dataset import SpectrumDataset
 
-data_folder = "test_data/"
-names = glob.glob(data_folder + "*.csv")
-for idx, name in enumerate(names):
-    data = np.loadtxt(name, delimiter=",")
-    nan = np.where(data[:, 1] < -100)
-    data[nan, 1] = np.nan
-    plt.plot(data[:, 0], data[:, 1], label=f"{idx}")
+data = SpectrumDataset("test_data/", pattern="test_*.csv", noise_floor=-100)
+for idx in range(len(data)):
+    plt.plot(data.wavelengths, data[idx], label=f"{idx}")
 plt.legend()
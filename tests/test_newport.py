@@ -0,0 +1,25 @@
+import pytest
+
+from InstrumentControl.Newport_control import actuator
+from InstrumentControl.simulation import SimulatedSMC100
+
+
+def test_move_returns_position():
+    act = actuator(None, 1, SMC=SimulatedSMC100(velocity=10))
+    assert act.move(0.05) == pytest.approx(0.05)
+    assert act.home() == 0
+
+
+def test_poll_error_is_raised():
+    smc = SimulatedSMC100(velocity=10)
+    act = actuator(None, 1, SMC=smc)
+
+    def fail(address, errorCode, status, errString):
+        raise RuntimeError("controller not responding")
+
+    smc.TS = fail
+    with pytest.raises(RuntimeError):
+        act.move(0.05)
+    motion = act.move_async(0.05)
+    with pytest.raises(RuntimeError):
+        motion.wait()
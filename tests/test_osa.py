@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from InstrumentControl.OSA_control import OSA
+from InstrumentControl.simulation import SimulatedOSA
+
+
+def test_settings_are_written_once(resource_manager):
+    simulated = resource_manager.register(SimulatedOSA())
+    OSA(1549, 1551, resolution=0.1, sample=501)
+    simulated.reset_counters()
+    OSA(1549, 1551, resolution=0.1, sample=501)
+    # Only the sweep and the download
+    assert simulated.num_writes == 4
+
+
+def test_sweep_sets_own_settings(resource_manager):
+    simulated = resource_manager.register(SimulatedOSA())
+    first = OSA(1549, 1551, resolution=0.1, sample=501)
+    OSA(1540, 1560, resolution=1, sample=201)
+    first.sweep()
+    assert (simulated.wavelength_start, simulated.wavelength_end) == (1549, 1551)
+    assert len(first.powers) == 501
+    assert first.wavelengths[0] == 1549 and first.wavelengths[-1] == 1551
+
+
+def test_short_trace_raises(resource_manager):
+    simulated = resource_manager.register(SimulatedOSA())
+    osa = OSA(1549, 1551, sample=501, transfer="compact")
+    simulated.traces["A"]["LDAT"] = "501,-80.00,-80.00"
+    with pytest.raises(ValueError):
+        osa.get_spectrum()
+
+
+def test_acquire(resource_manager):
+    simulated = resource_manager.register(SimulatedOSA(peak_wavelength=1550))
+    osa = OSA(1549, 1551, resolution=0.1, sample=501)
+    result = osa.acquire(
+        [((1540, 1560), 1, "B", 201), ((1549.5, 1550.5), 0.05, "C", 101)]
+    )
+    assert result["sample"].tolist() == [201, 101]
+    assert sorted(result["order"]) == [0, 1]
+    for row in result:
+        wavelengths = row["wavelengths"][: row["sample"]]
+        powers = row["powers"][: row["sample"]]
+        assert wavelengths[0] == row["wavelength_start"]
+        assert abs(wavelengths[np.argmax(powers)] - 1550) <= row["resolution"]
+    osa.sweep()
+    assert (simulated.wavelength_start, simulated.sample) == (1549, 501)
+    assert len(osa.powers) == 501
+
+
+def test_acquire_needs_samples_of_every_request(resource_manager):
+    resource_manager.register(SimulatedOSA())
+    osa = OSA(1549, 1551, sweep=False)
+    with pytest.raises(ValueError):
+        osa.acquire([((1540, 1560), 1, "B", 201), ((1549, 1551), 0.1, "C")])
+    with pytest.raises(ValueError):
+        osa.acquire([((1540, 1560), 1, "E", 201)])
+    assert len(osa.acquire([])) == 0
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from InstrumentControl.instrument_class import oscilloscope, parse_block
+from InstrumentControl.simulation import SimulatedOscilloscope
+
+
+def with_samples(simulated, samples):
+    simulated.samples = lambda channel: samples + np.int16(channel)
+    return simulated
+
+
+def test_block_ending_in_termination_byte(resource_manager):
+    # 0x0A00 is sent as 00 0A in SRIBINARY, so the block ends in a 0x0A byte
+    samples = np.full(1000, 0x0A00 - 1, dtype=np.int16)
+    simulated = resource_manager.register(
+        with_samples(SimulatedOscilloscope(num_points=1000), samples)
+    )
+    scope = oscilloscope()
+    scope.write(":data:encdg sribinary")
+    scope.write("CURVe?")
+    data = np.frombuffer(parse_block(scope.read_blocks()), dtype="<i2")
+    assert np.array_equal(data, samples + 1)
+    assert simulated._reply[simulated._position :] == b""
+
+
+def test_termination_bytes_inside_the_data(resource_manager):
+    samples = np.arange(-5000, 5000, 7, dtype=np.int16) * 10
+    samples[::50] = 0x0A0A
+    resource_manager.register(
+        with_samples(SimulatedOscilloscope(num_points=len(samples)), samples)
+    )
+    scope = oscilloscope()
+    for channel in (1, 2):
+        data, scale = scope.saveWaveform(channel, raw=True)
+        assert np.array_equal(data, samples + channel)
+        assert scale["byte_order"] == "LSB"
+
+
+def test_incomplete_block_raises():
+    with pytest.raises(ValueError):
+        parse_block(b"#42000" + bytes(100))
+
+
+def test_combined_capture_on_fresh_scope(resource_manager):
+    samples = np.arange(1000, dtype=np.int16)
+    simulated = resource_manager.register(
+        with_samples(SimulatedOscilloscope(num_points=1000), samples)
+    )
+    # Left in ASCII encoding by another program
+    simulated.encoding = "ASCII"
+    scope = oscilloscope()
+    data, scales = scope.capture([1, 2], raw=True, combined=True)
+    assert simulated.encoding == "SRIBINARY"
+    assert np.array_equal(data, np.stack([samples + 1, samples + 2]))
+    assert [scale["byte_order"] for scale in scales] == ["LSB", "LSB"]
@@ -0,0 +1,34 @@
+import numpy as np
+import serial
+
+from InstrumentControl.instrument_class import piezo
+from InstrumentControl.simulation import SimulatedPiezo
+
+
+def test_messages_are_written_separately():
+    simulated = SimulatedPiezo()
+    stage = piezo(ser=simulated)
+    simulated.num_writes = 0
+    stage.set_duties([[0.5, 0.5, 0.5], [0.2, 0.2, 0.2]], sleep=False)
+    assert simulated.num_writes == 6
+    assert np.allclose(simulated.duty, [128 / 255] * 3 + [51 / 255] * 3, atol=0.01)
+
+
+def test_batched_messages(monkeypatch):
+    monkeypatch.setattr(piezo, "batch_writes", True)
+    # A loop:// port returns everything written to it
+    port = serial.serial_for_url("loop://", timeout=0.1)
+    stage = piezo(ser=port)
+    stage.read_buf()
+    stage.set_duties({(1, "X"): 0.5, (2, "Z"): 1, (1, "Y"): 0}, sleep=False)
+    assert port.read(64) == b"X1127Z2255Y10"
+    stage.set_stage(2, [0.2, 0.4, 0.6])
+    assert port.read(64) == b"X251Y2102Z2153"
+
+
+def test_nan_keeps_axis():
+    simulated = SimulatedPiezo()
+    stage = piezo(ser=simulated, stage1=[0.2, 0.4, 0.6])
+    stage.set_duties([[np.nan, 1, np.nan], [np.nan] * 3], sleep=False)
+    stage.set_duties({(1, "X"): np.nan, (2, "Y"): 0.5}, sleep=False)
+    assert np.allclose(stage.duty, [[0.2, 1, 0.6], [0, 0.5, 0]])
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from InstrumentControl.spectrum_dataset import SpectrumDataset
+from InstrumentControl.spectrum_store import SpectrumStore
+
+wavelengths = np.linspace(1549.5, 1550.5, 1001)
+
+
+def test_store_rejects_shifted_axis(tmp_path):
+    with SpectrumStore(str(tmp_path / "scan")) as store:
+        store.append(wavelengths, np.zeros(1001))
+        store.append(wavelengths.copy(), np.ones(1001))
+        # Shifted by 10 pm, less than the default rtol of np.allclose allows
+        with pytest.raises(ValueError):
+            store.append(wavelengths - 0.01, np.ones(1001))
+        assert len(store) == 2
+
+
+def test_dataset_rejects_shifted_csv_axis(tmp_path):
+    for i, shift in enumerate((0, 0, 0.01)):
+        np.savetxt(
+            tmp_path / f"test_{i}.csv",
+            np.column_stack((wavelengths + shift, np.zeros(1001))),
+            fmt="%f",
+            delimiter=",",
+        )
+    with pytest.raises(ValueError):
+        SpectrumDataset(str(tmp_path))
+
+
+def test_dataset_reads_store(tmp_path):
+    path = str(tmp_path / "scan.h5")
+    with SpectrumStore(path) as store:
+        for i in range(3):
+            store.append(wavelengths, np.full(1001, -50.0 - i))
+    data = SpectrumDataset(path, noise_floor=-51.5)
+    selected_wavelengths, powers = data.sel(slice(None), (1550, 1550.1))
+    assert powers.shape == (3, 101)
+    assert np.allclose(selected_wavelengths, wavelengths[500:601])
+    assert powers.mask[:, 0].tolist() == [False, False, True]
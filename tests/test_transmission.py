@@ -0,0 +1,33 @@
+import numpy as np
+
+from InstrumentControl.instrument_class import PM
+from InstrumentControl.laser_control import laser
+from InstrumentControl.simulation import SimulatedLaser, SimulatedPowerMeter
+from InstrumentControl.transmission import transmission_spectrum
+
+wavelengths = np.linspace(1549, 1551, 5)
+
+
+def notch(wavelength):
+    return 1 - 0.9 / (1 + ((wavelength - 1550) / 0.2) ** 2)
+
+
+def setup(resource_manager):
+    simulated = resource_manager.register(SimulatedLaser(tuning_time=0.02))
+    power_meter = resource_manager.register(
+        SimulatedPowerMeter(transmission=notch, laser=simulated, sample_time=0.001)
+    )
+    return laser("ando", wavelengths[0]), PM(), power_meter
+
+
+def test_waits_for_tuning(resource_manager):
+    tunable_laser, power_meter, simulated = setup(resource_manager)
+    spectrum = transmission_spectrum(tunable_laser, power_meter, wavelengths)
+    assert simulated.num_disturbed == 0
+    assert np.allclose(spectrum.watts, 1e-3 * notch(wavelengths))
+
+
+def test_no_settle_time_reads_while_tuning(resource_manager):
+    tunable_laser, power_meter, simulated = setup(resource_manager)
+    transmission_spectrum(tunable_laser, power_meter, wavelengths, settle_time=0)
+    assert simulated.num_disturbed == len(wavelengths)
@@ -0,0 +1,41 @@
+from InstrumentControl import tracing, visa_pool
+from InstrumentControl.OSA_control import OSA
+from InstrumentControl.simulation import SimulatedOSA
+
+
+def test_session_is_opened_once(resource_manager):
+    resource_manager.register(SimulatedOSA())
+    first = OSA(1549, 1551)
+    second = OSA(1549, 1551)
+    assert tracing.unwrap(first.device) is tracing.unwrap(second.device)
+    assert resource_manager.num_opens == 1
+
+
+def test_close_keeps_session_of_other_holders(resource_manager):
+    simulated = resource_manager.register(SimulatedOSA())
+    first = OSA(1549, 1551)
+    second = OSA(1549, 1551)
+    first.close()
+    assert not simulated.closed
+    second.sweep()
+    second.close()
+    assert simulated.closed
+    OSA(1549, 1551)
+    assert resource_manager.num_opens == 2
+
+
+def test_closed_session_drops_shared_instrument(resource_manager):
+    simulated = resource_manager.register(SimulatedOSA())
+    osa = visa_pool.shared_instrument(OSA, 1549, 1551)
+    assert visa_pool.shared_instrument(OSA, 1549, 1551) is osa
+    osa.close()
+    assert simulated.closed
+    assert visa_pool.shared_instrument(OSA, 1549, 1551) is not osa
+
+
+def test_close_all(resource_manager):
+    simulated = resource_manager.register(SimulatedOSA())
+    OSA(1549, 1551)
+    OSA(1549, 1551)
+    visa_pool.close_all()
+    assert simulated.closed